@@ -4,24 +4,35 @@ ScopeStack Template Converter - Web Interface
 Flask-based web UI for easy template conversion
 """
 
-from flask import Flask, render_template, request, send_file, jsonify, session, Response, redirect
+from flask import Flask, render_template, request, send_file, jsonify, session, Response, redirect, g, has_request_context
+from werkzeug.local import LocalProxy
 from werkzeug.utils import secure_filename
 from typing import Dict, List, Optional
 from functools import wraps
 import os
 import tempfile
+import threading
 import json
 import requests
 from pathlib import Path
 from datetime import datetime
+from collections import OrderedDict
+from dataclasses import asdict
 
 from template_converter import TemplateConverter, MailMergeParser
 from merge_data_fetcher import MergeDataFetcher
 from auth_manager import AuthManager
-from mapping_database import MappingDatabase
+from mapping_artifact import compile_mappings
+from mapping_database import BULK_MODES, MappingShards
+from mapping_index import MATCH_MODES, SEARCH_FIELDS, SORT_FIELDS
+from mapping_ndjson import NDJSON_MEDIA_TYPE, import_ndjson, iter_ndjson_export
+from output_capture import capture_output
+from progress_channel import TERMINAL_STATUSES, progress_stream
 from template_manager import TemplateManager
 from session_manager import SessionManager
 from template_validator import TemplateValidator
+from structure_cache import StructureCache
+from structure_encoding import STRUCTURE_MEDIA_TYPE, encode_structure
 
 app = Flask(__name__)
 
@@ -52,7 +63,9 @@ ALLOWED_EXTENSIONS = {'docx'}
 
 # Global instances
 auth_manager = AuthManager()
-mapping_db = MappingDatabase()
+# Mapping databases per account; falls back to the global learned_mappings.db unless
+# MAPPING_GLOBAL_FALLBACK=false
+mapping_shards = MappingShards(use_fallback=os.environ.get('MAPPING_GLOBAL_FALLBACK', 'true').lower() != 'false')
 session_manager = SessionManager()
 
 
@@ -115,6 +128,54 @@ def get_session_account_info():
     return auth_manager.get_account_info_from_tokens(tokens)
 
 
+def session_account_key():
+    """
+    Identity of the signed-in account, for keying per-account caches
+    (the account slug, or the user's email without one; None when signed out).
+    """
+    account_info = get_session_account_info()
+    if not account_info:
+        return None
+    return account_info.get('account_slug') or account_info.get('account_id') or account_info.get('email')
+
+
+def current_mapping_db():
+    """
+    Mapping database of the signed-in account (the global one without an
+    account or outside a request). Looked up once per request.
+    """
+    if not has_request_context():
+        return mapping_shards.global_database()
+    if 'mapping_db' not in g:
+        account_info = get_session_account_info()
+        g.mapping_db = mapping_shards.for_account(account_info.get('account_slug') if account_info else None)
+    return g.mapping_db
+
+
+# Resolves to the current account's mapping database on each use
+mapping_db = LocalProxy(current_mapping_db)
+
+# (database revision, CompiledMappings) last handed to a TemplateConverter
+_compiled_mappings = (None, None)
+
+
+def current_compiled_mappings():
+    """
+    The current account's mappings compiled for TemplateConverter (see
+    mapping_artifact). The app already holds the database in memory, so
+    this compiles from it rather than reading the pickle artifact, and
+    only again once the database (or its fallback) has changed.
+    """
+    global _compiled_mappings
+
+    revision = mapping_db.revision()
+    cached_revision, compiled = _compiled_mappings
+    if cached_revision != revision:
+        compiled = compile_mappings(current_mapping_db())
+        _compiled_mappings = (revision, compiled)
+    return compiled
+
+
 # ==================== Session-based AI settings helpers ====================
 # These store AI settings per-user in Flask session instead of shared server files
 
@@ -155,6 +216,7 @@ class APIDebugLogger:
     def __init__(self, max_logs=100):
         self.logs = []
         self.max_logs = max_logs
+        self._lock = threading.Lock()  # shared by all request threads
 
     def log(self, method, url, headers=None, payload=None, response_status=None, response_body=None, error=None):
         """Add a log entry"""
@@ -171,11 +233,12 @@ class APIDebugLogger:
             'error': str(error) if error else None
         }
 
-        self.logs.insert(0, log_entry)  # Most recent first
+        with self._lock:
+            self.logs.insert(0, log_entry)  # Most recent first
 
-        # Keep only max_logs entries
-        if len(self.logs) > self.max_logs:
-            self.logs = self.logs[:self.max_logs]
+            # Keep only max_logs entries
+            if len(self.logs) > self.max_logs:
+                self.logs = self.logs[:self.max_logs]
 
     def _sanitize_headers(self, headers):
         """Remove sensitive data from headers"""
@@ -194,16 +257,148 @@ class APIDebugLogger:
 
     def get_logs(self, limit=None):
         """Get recent logs"""
-        if limit:
-            return self.logs[:limit]
-        return self.logs
+        with self._lock:
+            if limit:
+                return self.logs[:limit]
+            return list(self.logs)
 
     def clear(self):
         """Clear all logs"""
-        self.logs = []
+        with self._lock:
+            self.logs = []
 
 api_logger = APIDebugLogger(max_logs=100)
 
+# Live semantic match state per project (see /api/semantic-suggestions).
+# Saving a manual mapping pins it here so only the affected fields are re-ranked.
+MAX_MATCH_STATES = 8
+semantic_match_states = OrderedDict()  # (account, project_id) -> (SemanticMatcher, MatchState)
+semantic_match_lock = threading.Lock()  # guards semantic_match_states and the MatchStates in it
+
+
+def pin_in_match_states(v1_field, v2_field, project_id=None):
+    """
+    Pin a manual mapping in the signed-in account's live match state for
+    project_id. The account's states for other projects are dropped, so
+    they are rebuilt with the new manual mapping on their next use.
+
+    Returns the re-ranked suggestions for project_id (empty if no live state).
+    """
+    account = session_account_key()
+    key = (account, str(project_id)) if project_id is not None else None
+    with semantic_match_lock:
+        for other in [k for k in semantic_match_states if k[0] == account and k != key]:
+            del semantic_match_states[other]
+
+        cached = semantic_match_states.get(key) if key else None
+        if cached is None:
+            return []
+        matcher, state = cached
+        if v1_field not in state.v1_index:
+            return []
+        return [asdict(m) for m in matcher.pin_mapping(state, v1_field, v2_field)]
+
+
+def unpin_in_match_states(v1_field):
+    """Remove a manual mapping from the signed-in account's live match states"""
+    account = session_account_key()
+    with semantic_match_lock:
+        for (state_account, _), (matcher, state) in semantic_match_states.items():
+            if state_account == account:
+                matcher.unpin_mapping(state, v1_field)
+
+# Extracted merge data structures per project, so the data viewer can page
+# through one column at a time (see /api/merge-data-structure/<id>/subtree)
+structure_cache = StructureCache(ttl_seconds=600, max_entries=16)
+STRUCTURE_LOAD_BYTES = 4 * 1024 * 1024  # Larger merge data responses are parsed as a stream
+
+
+def load_project_structure(fetcher, project_id, version, template_only=True, refresh=False):
+    """
+    Get the extracted v1 or v2 structure for a project, from the cache when fresh.
+
+    Args:
+        fetcher: Authenticated MergeDataFetcher
+        project_id: ScopeStack project ID
+        version: 'v1' or 'v2'
+        template_only: Extract only [0] of each array
+        refresh: Re-fetch even if a cached structure exists
+
+    Returns:
+        StructureTable
+
+    Raises:
+        ValueError: If the merge data could not be fetched (nothing is cached)
+    """
+    from data_structure_extractor import DataStructureExtractor
+
+    def load():
+        fetch = fetcher.fetch_v1_merge_data if version == 'v1' else fetcher.fetch_v2_merge_data
+        # Payloads up to STRUCTURE_LOAD_BYTES are decoded whole (fast);
+        # larger ones are parsed as a stream and never held in memory whole
+        payload = fetch(project_id, stream=True, load_under=STRUCTURE_LOAD_BYTES)
+        if payload is None:
+            raise ValueError(f"Could not fetch {version.upper()} merge data for project {project_id}")
+        extractor = DataStructureExtractor(template_only=template_only)
+        if isinstance(payload, dict):
+            structure = extractor.extract_structure(payload, strip_prefix="data.attributes.content.")
+        else:
+            structure = extractor.extract_structure_from_events(payload, strip_prefix="data.attributes.content.")
+        api_logger.log(
+            method='GET',
+            url=f"ScopeStack API: {version.upper()} merge data for project {project_id}",
+            response_status=200,
+            response_body=f"[{len(structure)} fields extracted]"
+        )
+        return structure
+
+    # Merge data is fetched with the signed-in account's token, so one
+    # account's cached structure must never be served to another
+    key = (str(project_id), version, template_only, session_account_key())
+    return structure_cache.get_or_load(key, load, refresh=refresh)
+
+
+def wants_compact_structure():
+    """
+    Content negotiation for structure responses.
+
+    Clients that list STRUCTURE_MEDIA_TYPE above application/json in Accept
+    (or pass ?encoding=prefix) get the prefix-interned encoding from
+    structure_encoding; everyone else keeps plain JSON.
+    """
+    if request.args.get('encoding') == 'prefix':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', STRUCTURE_MEDIA_TYPE])
+    return best == STRUCTURE_MEDIA_TYPE
+
+
+def encode_structure_payload(structure, path=None, lazy=False, compact=False):
+    """
+    Serialize a structure (or one level of it) for a response.
+
+    Args:
+        structure: StructureTable
+        path: Node whose direct children to send (lazy/subtree responses)
+        lazy: Send only one level (path's children, or the root fields)
+        compact: Use the prefix-interned encoding
+    """
+    if not lazy:
+        return encode_structure(structure.values()) if compact else structure
+
+    records = structure.child_records(path)
+    if not compact:
+        return {record['path']: record for record in records}
+    return encode_structure(records, partial=True, parent_paths=lambda record_id: structure.paths[record_id])
+
+
+def structure_response(payload, compact):
+    """jsonify a structure response with the negotiated media type"""
+    response = jsonify(payload)
+    if compact:
+        response.mimetype = STRUCTURE_MEDIA_TYPE
+    response.headers['Vary'] = 'Accept'
+    return response
+
 # Routes that don't require ScopeStack authentication
 PUBLIC_ROUTES = {'/login', '/oauth/authorize', '/oauth/callback', '/api/auth/status'}
 
@@ -251,6 +446,12 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+@app.context_processor
+def inject_progress_statuses():
+    """Let the progress pages close their stream on the same statuses the server ends it on"""
+    return {'progress_terminal_statuses': list(TERMINAL_STATUSES)}
+
+
 @app.route('/')
 def home():
     """Homepage with tool cards"""
@@ -685,7 +886,7 @@ def convert_file():
         output_filepath = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
 
         # Perform conversion
-        converter = TemplateConverter(input_file, output_filepath)
+        converter = TemplateConverter(input_file, output_filepath, compiled=current_compiled_mappings())
         success = converter.convert()
 
         if not success:
@@ -908,7 +1109,10 @@ def test_project():
 
 @app.route('/api/learn-mappings', methods=['POST'])
 def learn_mappings():
-    """Learn field mappings by comparing v1 and v2 merge data values"""
+    """
+    Learn field mappings by comparing v1 and v2 merge data values, and save
+    the suggestions to the account's mapping database
+    """
     if not is_session_authenticated():
         return jsonify({'error': 'Not authenticated. Please login first.'}), 401
 
@@ -932,17 +1136,12 @@ def learn_mappings():
         fetcher.authenticate(token=token)
 
         # Learn mappings (suppress print output for web UI)
-        import io
-        import sys
-        old_stdout = sys.stdout
-        sys.stdout = log_capture = io.StringIO()
-
-        try:
-            learner = MappingLearner(fetcher)
-            results = learner.learn_mappings(project_id)
-        finally:
-            sys.stdout = old_stdout
-            log_output = log_capture.getvalue()
+        with capture_output() as log_capture:
+            try:
+                learner = MappingLearner(fetcher)
+                results = learner.learn_mappings(project_id)
+            finally:
+                log_output = log_capture.getvalue()
 
         if not results or not results.get('suggested_mappings'):
             return jsonify({
@@ -950,6 +1149,9 @@ def learn_mappings():
                 'debug_log': log_output
             }), 500
 
+        # Save the suggestions to the persistent database in one transaction
+        saved = mapping_db.bulk_upsert(results['suggested_mappings'], project_id=project_id, projects_analyzed=1)
+
         # Group by confidence for easier display
         high_conf = [s for s in results['suggested_mappings'] if s['confidence'] == 'high']
         medium_conf = [s for s in results['suggested_mappings'] if s['confidence'] == 'medium']
@@ -964,7 +1166,9 @@ def learn_mappings():
                 'total_mappings': len(results['suggested_mappings']),
                 'high_confidence': len(high_conf),
                 'medium_confidence': len(medium_conf),
-                'low_confidence': len(low_conf)
+                'low_confidence': len(low_conf),
+                'saved': saved['added'] + saved['merged'],
+                'invalid': saved['invalid']
             },
             'mappings': {
                 'high': high_conf[:50],  # Top 50 high confidence
@@ -1029,81 +1233,72 @@ def upload_for_learning():
         fetcher.authenticate(token=token)
 
         # Capture debug output
-        import io
-        import sys
-        old_stdout = sys.stdout
-        sys.stdout = log_capture = io.StringIO()
-
-        try:
-            print(f"🔍 Analyzing documents for project {project_id}...")
-            print("=" * 60)
-
-            # Step 1: Extract v1 fields from template
-            print("\n1️⃣ Extracting v1 fields from template...")
-            analyzer = DocumentAnalyzer()
-            v1_fields = analyzer.extract_v1_fields(v1_path)
-            print(f"   Found {len(v1_fields)} unique v1 fields")
-
-            # Step 2: Extract values from output document
-            print("\n2️⃣ Extracting values from output document...")
-            output_values = analyzer.extract_text_values(output_path)
-            print(f"   Found {len(output_values)} unique values")
-
-            # Step 3: Fetch merge data from API
-            print("\n3️⃣ Fetching v1 merge data from API...")
-            v1_merge_data = fetcher.fetch_v1_merge_data(project_id)
-            if not v1_merge_data:
-                raise Exception("Failed to fetch v1 merge data")
-            print("   ✓ v1 merge data received")
-
-            print("\n4️⃣ Fetching v2 merge data from API...")
-            v2_merge_data = fetcher.fetch_v2_merge_data(project_id)
-            if not v2_merge_data:
-                raise Exception("Failed to fetch v2 merge data")
-            print("   ✓ v2 merge data received")
-
-            # Step 4: Match everything together
-            print("\n5️⃣ Matching fields -> values -> v2 paths...")
-            confirmed_mappings = analyzer.match_fields_to_values(
-                v1_fields=v1_fields,
-                output_values=output_values,
-                v1_merge_data=v1_merge_data,
-                v2_merge_data=v2_merge_data
-            )
-            print(f"   ✓ Found {len(confirmed_mappings)} confirmed mappings")
+        with capture_output() as log_capture:
+            try:
+                print(f"🔍 Analyzing documents for project {project_id}...")
+                print("=" * 60)
+
+                # Step 1: Extract v1 fields from template
+                print("\n1️⃣ Extracting v1 fields from template...")
+                analyzer = DocumentAnalyzer()
+                v1_fields = analyzer.extract_v1_fields(v1_path)
+                print(f"   Found {len(v1_fields)} unique v1 fields")
+
+                # Step 2: Extract values from output document
+                print("\n2️⃣ Extracting values from output document...")
+                output_values = analyzer.extract_text_values(output_path)
+                print(f"   Found {len(output_values)} unique values")
+
+                # Step 3: Fetch merge data from API
+                # Raw bodies: both matching passes below share one value index per
+                # payload through value_index_cache, keyed by the payload hash
+                print("\n3️⃣ Fetching v1 merge data from API...")
+                v1_merge_data = fetcher.fetch_v1_merge_data(project_id, raw=True)
+                if not v1_merge_data:
+                    raise Exception("Failed to fetch v1 merge data")
+                print("   ✓ v1 merge data received")
+
+                print("\n4️⃣ Fetching v2 merge data from API...")
+                v2_merge_data = fetcher.fetch_v2_merge_data(project_id, raw=True)
+                if not v2_merge_data:
+                    raise Exception("Failed to fetch v2 merge data")
+                print("   ✓ v2 merge data received")
+
+                # Step 4: Match everything together
+                print("\n5️⃣ Matching fields -> values -> v2 paths...")
+                confirmed_mappings = analyzer.match_fields_to_values(
+                    v1_fields=v1_fields,
+                    output_values=output_values,
+                    v1_merge_data=v1_merge_data,
+                    v2_merge_data=v2_merge_data,
+                    project_id=project_id
+                )
+                print(f"   ✓ Found {len(confirmed_mappings)} confirmed mappings")
 
-            # Also run standard value-matching as a supplement
-            print("\n6️⃣ Running supplemental value-matching analysis...")
-            learner = MappingLearner(fetcher)
-            learner.v1_value_map = learner.extract_values_with_paths(
-                v1_merge_data,
-                strip_prefix="data.attributes.content."
-            )
-            learner.v2_value_map = learner.extract_values_with_paths(
-                v2_merge_data,
-                strip_prefix="data.attributes.content."
-            )
-            matches = learner.find_matching_values()
-            supplemental_mappings = learner.suggest_mappings(matches)
-            print(f"   ✓ Found {len(supplemental_mappings)} supplemental mappings")
+                # Also run standard value-matching as a supplement
+                print("\n6️⃣ Running supplemental value-matching analysis...")
+                learner = MappingLearner(fetcher)
+                learner.load_value_indexes(project_id, v1_merge_data, v2_merge_data)
+                matches = learner.find_matching_values()
+                supplemental_mappings = learner.suggest_mappings(matches)
+                print(f"   ✓ Found {len(supplemental_mappings)} supplemental mappings")
 
-            # Combine mappings (prioritize confirmed ones)
-            all_mappings = confirmed_mappings + supplemental_mappings
+                # Combine mappings (prioritize confirmed ones)
+                all_mappings = confirmed_mappings + supplemental_mappings
 
-            # Remove duplicates (keep confirmed versions)
-            seen = set()
-            unique_mappings = []
-            for mapping in all_mappings:
-                key = (mapping['v1_field'], mapping['v2_field'])
-                if key not in seen:
-                    seen.add(key)
-                    unique_mappings.append(mapping)
+                # Remove duplicates (keep confirmed versions)
+                seen = set()
+                unique_mappings = []
+                for mapping in all_mappings:
+                    key = (mapping['v1_field'], mapping['v2_field'])
+                    if key not in seen:
+                        seen.add(key)
+                        unique_mappings.append(mapping)
 
-            print(f"\n✅ Total unique mappings: {len(unique_mappings)}")
+                print(f"\n✅ Total unique mappings: {len(unique_mappings)}")
 
-        finally:
-            sys.stdout = old_stdout
-            log_output = log_capture.getvalue()
+            finally:
+                log_output = log_capture.getvalue()
 
         if not unique_mappings:
             return jsonify({
@@ -1113,10 +1308,7 @@ def upload_for_learning():
 
         # Save discovered mappings to persistent database
         print("\n7️⃣ Saving to persistent database...")
-        mapping_db.import_mappings(
-            mappings=unique_mappings,
-            project_id=project_id
-        )
+        mapping_db.bulk_upsert(unique_mappings, project_id=project_id, projects_analyzed=1)
 
         # Get statistics
         stats = mapping_db.get_statistics()
@@ -1555,7 +1747,7 @@ def create_or_update_template():
                         app.config['UPLOAD_FOLDER'],
                         f'v2_recovered_{template_id}.docx'
                     )
-                    converter = TemplateConverter(v1_download_path, reconverted_path)
+                    converter = TemplateConverter(v1_download_path, reconverted_path, compiled=current_compiled_mappings())
 
                     if converter.convert():
                         print(f"✓ Reconversion successful")
@@ -1760,74 +1952,69 @@ def convert_and_upload_workflow():
         from document_analyzer import DocumentAnalyzer
 
         # Capture output
-        import io
-        import sys
-        old_stdout = sys.stdout
-        sys.stdout = log_capture = io.StringIO()
-
-        try:
-            # Step 1: Download v1 template
-            print(f"1️⃣ Downloading v1 template {v1_template_id}...")
-            manager = TemplateManager()
-            manager.authenticate(token=token)
-
-            details = manager.get_template_details(v1_template_id)
-            v1_filename = details['data']['attributes']['merge-template-filename']
-            v1_path = os.path.join(app.config['UPLOAD_FOLDER'], f"v1_{v1_filename}")
-            manager.download_template(v1_template_id, v1_path)
-            print(f"   ✓ Downloaded: {v1_filename}")
-
-            # Step 2: Learn mappings
-            print(f"\n2️⃣ Learning mappings from project {project_id}...")
-            fetcher = MergeDataFetcher()
-            fetcher.authenticate(token=token)
-            learner = MappingLearner(fetcher)
-            results = learner.learn_mappings(project_id)
-
-            if not results or not results.get('suggested_mappings'):
-                raise Exception("Could not learn mappings from project")
-
-            print(f"   ✓ Learned {len(results['suggested_mappings'])} mappings")
+        with capture_output() as log_capture:
+            try:
+                # Step 1: Download v1 template
+                print(f"1️⃣ Downloading v1 template {v1_template_id}...")
+                manager = TemplateManager()
+                manager.authenticate(token=token)
+
+                details = manager.get_template_details(v1_template_id)
+                v1_filename = details['data']['attributes']['merge-template-filename']
+                v1_path = os.path.join(app.config['UPLOAD_FOLDER'], f"v1_{v1_filename}")
+                manager.download_template(v1_template_id, v1_path)
+                print(f"   ✓ Downloaded: {v1_filename}")
+
+                # Step 2: Learn mappings
+                print(f"\n2️⃣ Learning mappings from project {project_id}...")
+                fetcher = MergeDataFetcher()
+                fetcher.authenticate(token=token)
+                learner = MappingLearner(fetcher)
+                results = learner.learn_mappings(project_id)
 
-            # Save to database
-            mapping_db.import_mappings(
-                mappings=results['suggested_mappings'],
-                project_id=project_id
-            )
+                if not results or not results.get('suggested_mappings'):
+                    raise Exception("Could not learn mappings from project")
 
-            # Step 3: Convert template
-            print(f"\n3️⃣ Converting template to v2 format...")
-            converted_filename = v1_filename.replace('.docx', '_v2.docx')
-            converted_path = os.path.join(app.config['UPLOAD_FOLDER'], converted_filename)
+                print(f"   ✓ Learned {len(results['suggested_mappings'])} mappings")
 
-            converter = TemplateConverter(v1_path, converted_path)
-            converter.convert()
-            print(f"   ✓ Converted to: {converted_filename}")
+                # Save to database
+                mapping_db.import_mappings(
+                    mappings=results['suggested_mappings'],
+                    project_id=project_id
+                )
 
-            # Step 4: Create and upload new template
-            print(f"\n4️⃣ Uploading as new template: {new_template_name}...")
-            create_result = manager.create_template(
-                name=new_template_name,
-                filename=converted_filename,
-                template_format='v2',
-                format_type='tag_template',
-                include_formatting=True,
-                active=False  # Start as inactive for testing
-            )
+                # Step 3: Convert template
+                print(f"\n3️⃣ Converting template to v2 format...")
+                converted_filename = v1_filename.replace('.docx', '_v2.docx')
+                converted_path = os.path.join(app.config['UPLOAD_FOLDER'], converted_filename)
+
+                converter = TemplateConverter(v1_path, converted_path, compiled=current_compiled_mappings())
+                converter.convert()
+                print(f"   ✓ Converted to: {converted_filename}")
+
+                # Step 4: Create and upload new template
+                print(f"\n4️⃣ Uploading as new template: {new_template_name}...")
+                create_result = manager.create_template(
+                    name=new_template_name,
+                    filename=converted_filename,
+                    template_format='v2',
+                    format_type='tag_template',
+                    include_formatting=True,
+                    active=False  # Start as inactive for testing
+                )
 
-            new_template_id = create_result['data']['id']
-            manager.upload_template_file(new_template_id, converted_path)
-            print(f"   ✓ Uploaded as template ID: {new_template_id}")
+                new_template_id = create_result['data']['id']
+                manager.upload_template_file(new_template_id, converted_path)
+                print(f"   ✓ Uploaded as template ID: {new_template_id}")
 
-            # Cleanup
-            os.remove(v1_path)
-            os.remove(converted_path)
+                # Cleanup
+                os.remove(v1_path)
+                os.remove(converted_path)
 
-            print("\n✅ Complete workflow finished successfully!")
+                print("\n✅ Complete workflow finished successfully!")
 
-        finally:
-            sys.stdout = old_stdout
-            log_output = log_capture.getvalue()
+            finally:
+                log_output = log_capture.getvalue()
 
         return jsonify({
             'success': True,
@@ -1888,25 +2075,20 @@ def analyze_for_review():
             results = learner.learn_mappings(project_id, template_path)  # Pass template_path for loop detection
 
             if results and results.get('suggested_mappings'):
-                # Apply path coherence scoring to learned mappings
+                # Apply path coherence scoring to learned mappings, every field in one batch
+                field_candidates = {}
                 for mapping in results['suggested_mappings']:
-                    v1_field = mapping['v1_field']
+                    field_candidates.setdefault(mapping['v1_field'], []).append((mapping['v2_field'], 'value_match'))
+                rankings = scorer.rank_all_v2_candidates(field_candidates, v1_structure)
 
-                    # Get all possible v2 candidates for this field
-                    candidates = [(mapping['v2_field'], 'value_match')]
-
-                    # Score with coherence
-                    ranked = scorer.rank_v2_candidates(
-                        v1_field=v1_field,
-                        v2_candidates=candidates,
-                        v1_structure=v1_structure,
-                        current_v2_context=[]
-                    )
+                for mapping in results['suggested_mappings']:
+                    v1_field = mapping['v1_field']
 
                     # Determine coherence score and confidence
-                    if ranked:
-                        best = ranked[0]
-                        coherence_score = best['coherence_score']
+                    scores = [r['coherence_score'] for r in rankings.get(v1_field, [])
+                              if r['v2_path'] == mapping['v2_field']]
+                    if scores:
+                        coherence_score = scores[0]
                     else:
                         coherence_score = 0.3  # Default minimum
 
@@ -1942,10 +2124,19 @@ def analyze_for_review():
 
         # Use existing mappings from database for fields not learned
         db_mappings = mapping_db.get_all_mappings()
+        suggested_fields = {m['v1_field'] for m in suggested_mappings}
+        db_fields = [field for field in field_structure['simple']
+                     if field not in suggested_fields and field in db_mappings]
+
+        # Apply structural coherence scoring for DB mappings too, in one batch
+        db_rankings = scorer.rank_all_v2_candidates(
+            {field: [(db_mappings[field]['v2_field'], 'database')] for field in db_fields},
+            v1_structure
+        )
 
         for field in field_structure['simple']:
             # Check if we already have a suggestion
-            if any(m['v1_field'] == field for m in suggested_mappings):
+            if field in suggested_fields:
                 continue
 
             # Look up in database
@@ -1964,15 +2155,7 @@ def analyze_for_review():
                     confidence = 'low'
                     coherence_score = 0.4  # Lower confidence
 
-                # Apply structural coherence scoring for DB mappings too
-                candidates = [(v2_field, 'database')]
-                ranked = scorer.rank_v2_candidates(
-                    v1_field=field,
-                    v2_candidates=candidates,
-                    v1_structure=v1_structure,
-                    current_v2_context=[]
-                )
-
+                ranked = db_rankings[field]
                 if ranked and ranked[0]['coherence_score'] > coherence_score:
                     # Use higher score if structural analysis is better
                     coherence_score = (coherence_score + ranked[0]['coherence_score']) / 2
@@ -1985,6 +2168,7 @@ def analyze_for_review():
                     'match_reason': 'database',
                     'original_value': None
                 })
+                suggested_fields.add(field)
 
         # Get merge data if project ID was provided
         v1_merge_data = None
@@ -2025,7 +2209,6 @@ def learn_and_improve():
 
     This replaces the manual 3-step process with an automated flow.
     """
-    import threading
     import uuid
     from learn_mappings import MappingLearner
     from template_converter import TemplateConverter
@@ -2074,7 +2257,7 @@ def learn_and_improve():
         converted_filename = f'v2_converted_{os.path.basename(template_path)}'
         converted_path = os.path.join(app.config['UPLOAD_FOLDER'], converted_filename)
 
-        converter = TemplateConverter(template_path, converted_path)
+        converter = TemplateConverter(template_path, converted_path, compiled=current_compiled_mappings())
 
         # Convert suggested_mappings to learned_field_mappings format
         # Filter out loop mappings, only include field mappings
@@ -2458,7 +2641,8 @@ def learn_and_improve():
 def get_improvement_progress(session_id):
     """
     Get current progress for an improvement session.
-    UI polls this endpoint every 2 seconds to show real-time progress.
+    The UI polls this endpoint every 2 seconds when it can't use the
+    event stream below.
     """
     try:
         from session_manager import SessionManager
@@ -2474,6 +2658,24 @@ def get_improvement_progress(session_id):
         }), 500
 
 
+@app.route('/api/improvement-progress/<session_id>/stream', methods=['GET'])
+def stream_improvement_progress(session_id):
+    """
+    Server-Sent Events stream of an improvement session's progress.
+
+    Each event's data is the /api/improvement-progress JSON, sent when it
+    changes (see progress_channel.progress_stream()). The stream ends after
+    the session completes or fails.
+    """
+    from session_manager import SessionManager
+    session_mgr = SessionManager()
+
+    return Response(progress_stream(session_id, session_mgr.get_progress), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Don't let nginx buffer events
+    })
+
+
 @app.route('/api/convert-with-overrides', methods=['POST'])
 def convert_with_overrides():
     """
@@ -2511,7 +2713,7 @@ def convert_with_overrides():
                 FIELD_MAPPINGS[v1_field] = v2_field
 
         # Perform conversion
-        converter = TemplateConverter(template_path, output_path)
+        converter = TemplateConverter(template_path, output_path, compiled=current_compiled_mappings())
         converter.convert()
 
         # Restore original mappings
@@ -2896,8 +3098,7 @@ def ai_improve_conversion():
             manager.download_template(v2_template_id, v2_template_path)
 
         # Get initial mappings from database
-        from mapping_database import MappingDatabase
-        mapping_db = MappingDatabase()
+        mapping_db = current_mapping_db()
         db_mappings_dict = mapping_db.get_all_mappings()
 
         # Convert dict format to list format for AI converter
@@ -3269,13 +3470,12 @@ def ai_recursive_improve():
         from ai_converter import AIConverter
         from template_manager import TemplateManager
         from template_converter import TemplateConverter
-        from mapping_database import MappingDatabase
 
         ai_converter = AIConverter(provider=provider, api_key=api_key)
         token = get_session_access_token()
         manager = TemplateManager()
         manager.authenticate(token=token)
-        mapping_db = MappingDatabase()
+        mapping_db = current_mapping_db()
 
         # Session handling
         previous_iterations_count = 0
@@ -3442,7 +3642,7 @@ def ai_recursive_improve():
                         f'v2_reconverted_iter{iteration+1}.docx'
                     )
 
-                    converter = TemplateConverter(v1_for_reconvert, reconverted_path)
+                    converter = TemplateConverter(v1_for_reconvert, reconverted_path, compiled=current_compiled_mappings())
                     if not converter.convert():
                         print("❌ Reconversion failed")
                         iteration_history.append({
@@ -3776,13 +3976,12 @@ def ai_continue_improvement():
         from ai_converter import AIConverter
         from template_manager import TemplateManager
         from template_converter import TemplateConverter
-        from mapping_database import MappingDatabase
 
         ai_converter = AIConverter(provider=provider, api_key=api_key)
         token = get_session_access_token()
         manager = TemplateManager()
         manager.authenticate(token=token)
-        mapping_db = MappingDatabase()
+        mapping_db = current_mapping_db()
 
         # Resume existing session
         iteration_history = session_data.get('iterations', []).copy()
@@ -4315,6 +4514,43 @@ def upload_with_versioning():
         }), 500
 
 
+# (database revision, learned mappings, manual mappings) sent with every structure response
+_structure_mappings = (None, [], [])
+
+
+def structure_mappings():
+    """
+    Learned and manual mapping lists for the data viewer.
+
+    Rebuilt only when the mapping database (or account) has changed since
+    the last call, instead of converting every mapping on every structure
+    request.
+    """
+    global _structure_mappings
+
+    version, learned_mappings, manual_mappings = _structure_mappings
+    if version == mapping_db.revision():
+        return learned_mappings, manual_mappings
+
+    version = mapping_db.revision()
+    learned_mappings, manual_mappings = [], []
+    for v1_field, mapping_info in list(mapping_db.get_all_mappings().items()):
+        mapping = {
+            'v1_field': v1_field,
+            'v2_field': mapping_info['v2_field'],
+            'confidence': mapping_info.get('confidence_score', 1) / 10.0,  # Convert score to 0-1 range
+            'source': mapping_info.get('source', 'database')
+        }
+        # Manual mappings: source 'manual' or confidence 1.0
+        if mapping['source'] == 'manual' or mapping['confidence'] >= 1.0:
+            manual_mappings.append(mapping)
+        else:
+            learned_mappings.append(mapping)
+
+    _structure_mappings = (version, learned_mappings, manual_mappings)
+    return learned_mappings, manual_mappings
+
+
 @app.route('/api/merge-data-structure/<project_id>')
 def get_merge_data_structure(project_id):
     """
@@ -4322,20 +4558,28 @@ def get_merge_data_structure(project_id):
 
     Query params:
         view: 'v1', 'v2', or 'both' (default: 'both')
+        full_data: 'true' to extract every array item instead of [0] only
+        lazy: 'true' to return only the root fields of each structure; deeper
+              columns are then loaded through /api/merge-data-structure/<id>/subtree
+        refresh: 'true' to re-fetch merge data instead of using the server cache
+
+    Structures are sent in the compact prefix-interned encoding when the
+    client asks for it (Accept: application/vnd.scopestack.structure+json,
+    see structure_encoding).
 
     Returns:
         {
             'success': true,
-            'v1_structure': {...},  # Hierarchical field structure (if view includes v1)
-            'v2_structure': {...},  # Hierarchical field structure (if view includes v2)
+            'v1_structure': {...},  # Flat field table, records linked by id/parent_id/child_ids (if view includes v1)
+            'v2_structure': {...},  # Flat field table, records linked by id/parent_id/child_ids (if view includes v2)
+            'v1_field_count': int,  # Total fields, also in lazy mode
+            'v2_field_count': int,
+            'lazy': bool,
             'suggested_mappings': [...],  # From learning system
             'manual_mappings': [...]  # User-created mappings
         }
     """
     try:
-        # Import the data structure extractor
-        from data_structure_extractor import DataStructureExtractor
-
         # Get view parameter (v1, v2, or both)
         view = request.args.get('view', 'both').lower()
         if view not in ['v1', 'v2', 'both']:
@@ -4343,6 +4587,8 @@ def get_merge_data_structure(project_id):
 
         # Get full_data parameter (false = template only, true = all array items)
         full_data = request.args.get('full_data', 'false').lower() == 'true'
+        lazy = request.args.get('lazy', 'false').lower() == 'true'
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
 
         # Check authentication
         if not is_session_authenticated():
@@ -4354,25 +4600,13 @@ def get_merge_data_structure(project_id):
         fetcher.authenticate(token=token)
 
         # template_only=True means only extract [0], template_only=False means extract all items
-        extractor = DataStructureExtractor(template_only=not full_data)
         v1_structure = None
         v2_structure = None
 
         # Only fetch V1 if needed
         if view in ['v1', 'both']:
             try:
-                v1_data = fetcher.fetch_v1_merge_data(project_id)
-                v1_structure = extractor.extract_structure(
-                    v1_data,
-                    strip_prefix="data.attributes.content."
-                )
-                # Log the V1 fetch for debug console
-                api_logger.log(
-                    method='GET',
-                    url=f"ScopeStack API: V1 merge data for project {project_id}",
-                    response_status=200,
-                    response_body=f"[{len(v1_structure)} fields extracted]"
-                )
+                v1_structure = load_project_structure(fetcher, project_id, 'v1', not full_data, refresh)
             except Exception as e:
                 api_logger.log(
                     method='GET',
@@ -4384,18 +4618,7 @@ def get_merge_data_structure(project_id):
         # Only fetch V2 if needed
         if view in ['v2', 'both']:
             try:
-                v2_data = fetcher.fetch_v2_merge_data(project_id)
-                v2_structure = extractor.extract_structure(
-                    v2_data,
-                    strip_prefix="data.attributes.content."
-                )
-                # Log the V2 fetch for debug console
-                api_logger.log(
-                    method='GET',
-                    url=f"ScopeStack API: V2 merge data for project {project_id}",
-                    response_status=200,
-                    response_body=f"[{len(v2_structure)} fields extracted]"
-                )
+                v2_structure = load_project_structure(fetcher, project_id, 'v2', not full_data, refresh)
             except Exception as e:
                 api_logger.log(
                     method='GET',
@@ -4404,30 +4627,8 @@ def get_merge_data_structure(project_id):
                 )
                 return jsonify({'error': f'Failed to fetch v2 merge data: {str(e)}'}), 500
 
-        # Get all mappings from learning system database
-        all_db_mappings = mapping_db.get_all_mappings()
-
-        # Convert database format to list format for frontend
-        suggested_mappings = []
-        for v1_field, mapping_info in all_db_mappings.items():
-            suggested_mappings.append({
-                'v1_field': v1_field,
-                'v2_field': mapping_info['v2_field'],
-                'confidence': mapping_info.get('confidence_score', 1) / 10.0,  # Convert score to 0-1 range
-                'source': mapping_info.get('source', 'database')
-            })
-
-        # Filter for manual mappings (confidence = 1.0, source = 'manual')
-        manual_mappings = [
-            m for m in suggested_mappings
-            if m.get('source') == 'manual' or m.get('confidence') >= 1.0
-        ]
-
-        # Separate learned mappings (exclude manual ones)
-        learned_mappings = [
-            m for m in suggested_mappings
-            if m.get('source') != 'manual' and m.get('confidence') < 1.0
-        ]
+        # Mappings from the learning system database, converted once per database change
+        learned_mappings, manual_mappings = structure_mappings()
 
         response = {
             'success': True,
@@ -4437,15 +4638,18 @@ def get_merge_data_structure(project_id):
             'manual_mappings': manual_mappings
         }
 
+        response['lazy'] = lazy
+        compact = wants_compact_structure()
+
         if v1_structure is not None:
-            response['v1_structure'] = v1_structure
+            response['v1_structure'] = encode_structure_payload(v1_structure, lazy=lazy, compact=compact)
             response['v1_field_count'] = len(v1_structure)
 
         if v2_structure is not None:
-            response['v2_structure'] = v2_structure
+            response['v2_structure'] = encode_structure_payload(v2_structure, lazy=lazy, compact=compact)
             response['v2_field_count'] = len(v2_structure)
 
-        return jsonify(response)
+        return structure_response(response, compact)
 
     except Exception as e:
         import traceback
@@ -4455,6 +4659,241 @@ def get_merge_data_structure(project_id):
         }), 500
 
 
+@app.route('/api/merge-data-structure/<project_id>/subtree')
+def get_merge_data_subtree(project_id):
+    """
+    Get the direct children of one node of a project's structure.
+
+    Served from the server-side structure cache, so expanding a column in
+    the data viewer is a small response and doesn't re-fetch merge data.
+
+    Query params:
+        version: 'v1' or 'v2' (default: 'v2')
+        path: Field path of the node to expand (empty for the root fields)
+        full_data: 'true' for the all-array-items structure
+
+    Returns:
+        {
+            'success': true,
+            'version': 'v1' | 'v2',
+            'path': str,
+            'records': {path: record, ...}  # Same record format as the full structure
+                                            # (or a partial compact payload, as negotiated)
+        }
+    """
+    try:
+        version = request.args.get('version', 'v2').lower()
+        if version not in ['v1', 'v2']:
+            return jsonify({'error': "version must be 'v1' or 'v2'"}), 400
+
+        path = request.args.get('path', '') or None
+        full_data = request.args.get('full_data', 'false').lower() == 'true'
+
+        if not is_session_authenticated():
+            return jsonify({'error': 'Not authenticated'}), 401
+
+        fetcher = MergeDataFetcher()
+        fetcher.authenticate(token=get_session_access_token())
+
+        structure = load_project_structure(fetcher, project_id, version, not full_data)
+        if path is not None and path not in structure:
+            return jsonify({'error': f'Field not found: {path}'}), 404
+
+        compact = wants_compact_structure()
+        return structure_response({
+            'success': True,
+            'project_id': project_id,
+            'version': version,
+            'path': path or '',
+            'records': encode_structure_payload(structure, path, lazy=True, compact=compact)
+        }, compact)
+
+    except Exception as e:
+        import traceback
+        return jsonify({
+            'error': f'Failed to extract merge data structure: {str(e)}',
+            'traceback': traceback.format_exc()
+        }), 500
+
+
+@app.route('/api/structure-diff/<project_id>')
+def get_structure_diff(project_id):
+    """
+    Diff a project's v1 and v2 structures by subtree hash.
+
+    Identical subtrees are paired without any field scoring; the rest (the
+    residual) is what changed between the versions. The data viewer uses
+    v1_changed / v2_changed for its changed-only view.
+
+    Query params:
+        full_data: 'true' to diff the all-array-items structures
+        match: 'true' to also score the residual fields with SemanticMatcher
+        min_confidence: Minimum confidence for scored matches (default: 0.5)
+
+    Returns:
+        {
+            'success': true,
+            'stats': {'v1_fields', 'v2_fields', 'paired_fields', 'v1_residual', 'v2_residual'},
+            'subtree_pairs': [{'v1_path', 'v2_path', 'status': 'unchanged' | 'moved', 'fields'}, ...],
+            'v1_residual': [path, ...],
+            'v2_residual': [path, ...],
+            'v1_changed': [path, ...],   # Residual and moved fields plus their ancestors
+            'v2_changed': [path, ...],
+            'matches': [{'v1_path', 'v2_path', 'confidence', 'match_type', 'reasons'}, ...]  # With match=true
+        }
+    """
+    try:
+        from structure_diff import diff_structures
+
+        if not is_session_authenticated():
+            return jsonify({'error': 'Not authenticated'}), 401
+
+        full_data = request.args.get('full_data', 'false').lower() == 'true'
+        match = request.args.get('match', 'false').lower() == 'true'
+        try:
+            min_confidence = float(request.args.get('min_confidence', 0.5))
+        except ValueError:
+            return jsonify({'error': 'min_confidence must be a number'}), 400
+
+        fetcher = MergeDataFetcher()
+        fetcher.authenticate(token=get_session_access_token())
+
+        v1_structure = load_project_structure(fetcher, project_id, 'v1', not full_data)
+        v2_structure = load_project_structure(fetcher, project_id, 'v2', not full_data)
+
+        matches = None
+        if match:
+            from semantic_matcher import SemanticMatcher
+            from schema_index_cache import SchemaIndexCache
+
+            matcher = SemanticMatcher(index_cache=SchemaIndexCache())
+            diff, matches = matcher.match_with_diff(v1_structure, v2_structure, min_confidence=min_confidence)
+        else:
+            diff = diff_structures(v1_structure, v2_structure)
+
+        result = {
+            'success': True,
+            'project_id': project_id,
+            'stats': {
+                'v1_fields': len(v1_structure),
+                'v2_fields': len(v2_structure),
+                'paired_fields': len(diff.pairs),
+                'v1_residual': len(diff.v1_residual),
+                'v2_residual': len(diff.v2_residual),
+            },
+            'subtree_pairs': [
+                {
+                    'v1_path': v1_path,
+                    'v2_path': v2_path,
+                    'status': 'unchanged' if v1_path == v2_path else 'moved',
+                    'fields': 1 + sum(1 for _ in v1_structure.descendant_paths(v1_path)),
+                }
+                for v1_path, v2_path in diff.subtree_pairs
+            ],
+            'v1_residual': diff.v1_residual,
+            'v2_residual': diff.v2_residual,
+            'v1_changed': sorted(diff.v1_changed),
+            'v2_changed': sorted(diff.v2_changed),
+        }
+        if matches is not None:
+            result['matches'] = [asdict(m) for m in matches]
+
+        return jsonify(result)
+
+    except Exception as e:
+        import traceback
+        return jsonify({
+            'error': f'Failed to diff merge data structures: {str(e)}',
+            'traceback': traceback.format_exc()
+        }), 500
+
+
+@app.route('/api/semantic-suggestions/<project_id>')
+def get_semantic_suggestions(project_id):
+    """
+    Get the best semantic V2 match for every V1 field of a project.
+
+    The match state is kept per project, so later calls (and pinning manual
+    mappings through /api/save-manual-mapping) don't recompute every match.
+
+    Query params:
+        refresh: 'true' to rebuild the match state from fresh merge data
+        min_confidence: Minimum confidence for a suggestion (default: 0.5)
+
+    Returns:
+        {
+            'success': true,
+            'suggestions': [{'v1_path', 'v2_path', 'confidence', 'match_type', 'reasons'}, ...],
+            'pinned_count': int
+        }
+    """
+    try:
+        from semantic_matcher import SemanticMatcher
+        from schema_index_cache import SchemaIndexCache
+
+        if not is_session_authenticated():
+            return jsonify({'error': 'Not authenticated'}), 401
+
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        try:
+            min_confidence = float(request.args.get('min_confidence', 0.5))
+        except ValueError:
+            return jsonify({'error': 'min_confidence must be a number'}), 400
+
+        state_key = (session_account_key(), str(project_id))
+        with semantic_match_lock:
+            cached = semantic_match_states.get(state_key)
+            if cached and not refresh and cached[1].min_confidence == min_confidence:
+                semantic_match_states.move_to_end(state_key)
+                suggestions = [asdict(m) for m in cached[1].results()]
+                pinned_count = len(cached[1].pinned)
+            else:
+                cached = None
+
+        if cached is None:
+            # Build outside the lock; fetching and ranking can take seconds
+            fetcher = MergeDataFetcher()
+            fetcher.authenticate(token=get_session_access_token())
+
+            v1_structure = load_project_structure(fetcher, project_id, 'v1', refresh=refresh)
+            v2_structure = load_project_structure(fetcher, project_id, 'v2', refresh=refresh)
+
+            pinned = {
+                v1_field: info['v2_field']
+                for v1_field, info in mapping_db.get_all_mappings().items()
+                if info.get('source') == 'manual'
+            }
+
+            matcher = SemanticMatcher(index_cache=SchemaIndexCache())
+            state = matcher.build_match_state(
+                v1_structure, v2_structure,
+                min_confidence=min_confidence,
+                pinned=pinned
+            )
+
+            with semantic_match_lock:
+                semantic_match_states[state_key] = (matcher, state)
+                semantic_match_states.move_to_end(state_key)
+                while len(semantic_match_states) > MAX_MATCH_STATES:
+                    semantic_match_states.popitem(last=False)
+                suggestions = [asdict(m) for m in state.results()]
+                pinned_count = len(state.pinned)
+
+        return jsonify({
+            'success': True,
+            'project_id': project_id,
+            'suggestions': suggestions,
+            'pinned_count': pinned_count
+        })
+
+    except Exception as e:
+        import traceback
+        return jsonify({
+            'error': f'Failed to compute semantic suggestions: {str(e)}',
+            'traceback': traceback.format_exc()
+        }), 500
+
+
 @app.route('/api/save-manual-mapping', methods=['POST'])
 def save_manual_mapping():
     """
@@ -4507,6 +4946,9 @@ def save_manual_mapping():
         # Get the saved mapping back
         saved_mapping = mapping_db.get_mapping(v1_field)
 
+        # Re-rank only the suggestions this mapping affects
+        updated_suggestions = pin_in_match_states(v1_field, v2_field, project_id)
+
         # Log the mapping save for debug console
         api_logger.log(
             method='POST',
@@ -4526,7 +4968,8 @@ def save_manual_mapping():
                 'source': 'manual',
                 'project_id': project_id,
                 'times_seen': saved_mapping.get('times_seen', 1) if saved_mapping else 1
-            }
+            },
+            'updated_suggestions': updated_suggestions
         })
 
     except Exception as e:
@@ -4588,10 +5031,18 @@ def save_array_mapping():
             project_id=project_id
         )
 
+        # Live match states index arrays by path without the [] suffix
+        updated_suggestions = pin_in_match_states(
+            v1_array[:-2] if v1_array.endswith('[]') else v1_array,
+            v2_array[:-2] if v2_array.endswith('[]') else v2_array,
+            project_id
+        )
+
         return jsonify({
             'success': True,
             'message': f'Array mapping saved: {v1_array} → {v2_array}',
-            'mapping': saved_mapping
+            'mapping': saved_mapping,
+            'updated_suggestions': updated_suggestions
         })
 
     except Exception as e:
@@ -4636,6 +5087,8 @@ def delete_mapping(v1_field):
         deleted = mapping_db.delete_mapping(v1_field)
 
         if deleted:
+            unpin_in_match_states(v1_field)
+
             # Log the deletion for debug console
             api_logger.log(
                 method='DELETE',
@@ -4911,8 +5364,17 @@ def search_projects():
 def export_mappings():
     """
     Export all mappings as a JSON file download.
+
+    Query param:
+        format: 'json' (default) or 'ndjson' (one mapping per line, streamed;
+                see mapping_ndjson.py)
     """
     try:
+        if request.args.get('format') == 'ndjson':
+            return Response(iter_ndjson_export(current_mapping_db()), mimetype=NDJSON_MEDIA_TYPE, headers={
+                'Content-Disposition': 'attachment; filename=learned_mappings_export.ndjson'
+            })
+
         # Get all field mappings
         all_mappings = mapping_db.get_all_mappings()
 
@@ -4942,13 +5404,22 @@ def export_mappings():
 @app.route('/api/mappings/import', methods=['POST'])
 def import_mappings():
     """
-    Import mappings from a JSON file.
+    Import mappings from a JSON file, or from NDJSON (Content-Type
+    application/x-ndjson or ?format=ndjson), which is read from the request
+    stream line by line and written in batches.
 
     Query param:
-        mode: 'merge' (default) or 'replace'
+        mode: 'skip' (default; keep existing mappings), 'merge' (add the
+              imported counts and scores to existing mappings) or 'replace'
     """
     try:
-        mode = request.args.get('mode', 'merge')
+        mode = request.args.get('mode', 'skip')
+        if mode not in BULK_MODES:
+            return jsonify({'error': f'Unknown mode: {mode}'}), 400
+
+        if request.mimetype == NDJSON_MEDIA_TYPE or request.args.get('format') == 'ndjson':
+            result = import_ndjson(current_mapping_db(), request.stream, mode=mode)
+            return jsonify(import_response(result))
 
         # Get JSON data from request
         data = request.get_json()
@@ -4956,53 +5427,13 @@ def import_mappings():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        mappings = data.get('mappings', {})
-        array_mappings = data.get('array_mappings', {})
-
-        imported_count = 0
-        skipped_count = 0
-
-        # If replace mode, clear existing mappings first
-        if mode == 'replace':
-            # Clear existing mappings by loading and replacing
-            mapping_db.data['mappings'] = {}
-            mapping_db.data['array_mappings'] = {}
-
-        # Import field mappings
-        for v1_field, mapping_info in mappings.items():
-            existing = mapping_db.get_mapping(v1_field)
-
-            if existing and mode == 'merge':
-                # Skip if already exists in merge mode
-                skipped_count += 1
-                continue
-
-            # Add mapping directly to database
-            mapping_db.data['mappings'][v1_field] = mapping_info
-            imported_count += 1
-
-        # Import array mappings
-        for v1_array, mapping_info in array_mappings.items():
-            existing = mapping_db.get_array_mapping(v1_array)
-
-            if existing and mode == 'merge':
-                skipped_count += 1
-                continue
-
-            if 'array_mappings' not in mapping_db.data:
-                mapping_db.data['array_mappings'] = {}
-            mapping_db.data['array_mappings'][v1_array] = mapping_info
-            imported_count += 1
-
-        # Save database
-        mapping_db._save_database()
-
-        return jsonify({
-            'success': True,
-            'message': f'Imported {imported_count} mappings, skipped {skipped_count} existing',
-            'imported': imported_count,
-            'skipped': skipped_count
-        })
+        # Validated and written in one transaction
+        result = mapping_db.bulk_upsert(
+            mappings=data.get('mappings', {}),
+            array_mappings=data.get('array_mappings', {}),
+            mode=mode
+        )
+        return jsonify(import_response(result))
 
     except Exception as e:
         import traceback
@@ -5012,24 +5443,83 @@ def import_mappings():
         }), 500
 
 
+def import_response(result: Dict) -> Dict:
+    """Response body for a bulk_upsert() or import_ndjson() result"""
+    imported_count = result['added'] + result['merged']
+    skipped_count = result['skipped'] + result['invalid']
+    message = f'Imported {imported_count} mappings ({result["merged"]} merged into existing), skipped {skipped_count}'
+    if result['invalid']:
+        message += f' ({result["invalid"]} invalid)'
+
+    return {
+        'success': True,
+        'message': message,
+        'imported': imported_count,
+        'skipped': skipped_count,
+        'result': result
+    }
+
+
 @app.route('/api/mappings', methods=['GET'])
 def get_all_mappings():
     """
-    Get all stored mappings for the mappings modal.
+    Get one page of stored mappings for the mappings modal.
+
+    Searching, filtering and ordering use the database's sorted indexes
+    (see mapping_index), so a page costs the same at any database size.
+
+    Query params:
+        q: Text to search for in v1/v2 fields
+        match: 'substring' (default) or 'prefix'
+        field: 'both' (default), 'v1' or 'v2'
+        source: Only mappings with this source ('learned', 'manual', ...)
+        min_confidence: Only mappings with at least this confidence (0-1)
+        sort: 'v1_field' (default), 'v2_field' or 'confidence'
+        order: 'asc' (default) or 'desc'
+        page: 1-based page number (default 1)
+        per_page: Mappings per page (default 100, max 1000)
 
     Returns:
         {
             'success': true,
-            'mappings': [...],
-            'array_mappings': [...],
-            'count': total
+            'mappings': [...],        # The requested page
+            'array_mappings': [...],  # All array mappings (not paged)
+            'total': int,             # Mappings matching the filters
+            'page': int,
+            'per_page': int,
+            'pages': int,
+            'count': total + array mappings
         }
     """
     try:
-        # Get all field mappings
-        all_mappings = mapping_db.get_all_mappings()
+        match = request.args.get('match', 'substring')
+        field = request.args.get('field', 'both')
+        sort = request.args.get('sort', 'v1_field')
+        if match not in MATCH_MODES or field not in SEARCH_FIELDS or sort not in SORT_FIELDS:
+            return jsonify({'error': 'Invalid match, field or sort parameter'}), 400
+
+        try:
+            page = max(1, int(request.args.get('page', 1)))
+            per_page = min(1000, max(1, int(request.args.get('per_page', 100))))
+            min_confidence = request.args.get('min_confidence')
+            min_score = float(min_confidence) * 10 if min_confidence not in (None, '') else None
+        except ValueError:
+            return jsonify({'error': 'page, per_page and min_confidence must be numbers'}), 400
+
+        result = mapping_db.query_mappings(
+            search=request.args.get('q', '').strip() or None,
+            match=match,
+            field=field,
+            source=request.args.get('source') or None,
+            min_score=min_score,
+            sort=sort,
+            descending=request.args.get('order', 'asc') == 'desc',
+            offset=(page - 1) * per_page,
+            limit=per_page
+        )
+
         mappings_list = []
-        for v1_field, mapping_info in all_mappings.items():
+        for v1_field, mapping_info in result['mappings']:
             mappings_list.append({
                 'v1_field': v1_field,
                 'v2_field': mapping_info['v2_field'],
@@ -5056,7 +5546,11 @@ def get_all_mappings():
             'success': True,
             'mappings': mappings_list,
             'array_mappings': array_mappings_list,
-            'count': len(mappings_list) + len(array_mappings_list)
+            'total': result['total'],
+            'page': page,
+            'per_page': per_page,
+            'pages': max(1, -(-result['total'] // per_page)),
+            'count': result['total'] + len(array_mappings_list)
         })
 
     except Exception as e:
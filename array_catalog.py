@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Array Catalog
+=============
+
+Catalog of the object arrays in a v2 merge data payload, for loop matching.
+
+MappingLearner.learn_loop_mappings() looks for the v2 array that best fits
+each Sablon :each loop in a template. Walking the whole payload once per
+loop (every item of every array) is wasteful: the candidates are the same
+for every loop. The catalog lists each array of objects once - its path,
+the union of keys across all of its items and its total item count - so
+loop matching only scores catalog entries.
+
+A catalog is built once per learn_loop_mappings() call and shared by all
+of its loops. Catalogs aren't cached across payloads: the key unions and
+item counts depend on every item, and hashing a whole payload costs about
+as much as building its catalog.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List
+
+
+@dataclass(frozen=True)
+class ArrayEntry:
+    """One array of objects in a payload"""
+    path: str                 # Without array indexes, e.g. 'project.phases.services'
+    keys: FrozenSet[str]      # Union of keys across every item
+    lower_keys: tuple         # Lowercased keys, for fuzzy matching
+    item_count: int           # Items across every occurrence of the array
+
+
+def unwrap(v2_merge_data: Dict) -> Dict:
+    """The merge data content, without the data.attributes.content wrapper"""
+    attributes = v2_merge_data.get('data', {}).get('attributes') if isinstance(v2_merge_data, dict) else None
+    if isinstance(attributes, dict) and 'content' in attributes:
+        return attributes['content']
+    return v2_merge_data
+
+
+def build_array_catalog(data: Dict) -> List[ArrayEntry]:
+    """
+    List every array of objects in a payload, in document order.
+
+    Nested arrays that occur under several parent items (e.g. the services
+    of every phase) are one entry, with keys and counts merged.
+
+    Args:
+        data: Merge data content (see unwrap())
+
+    Returns:
+        ArrayEntry list, each path once, in the order first seen
+    """
+    keys: Dict[str, set] = {}
+    counts: Dict[str, int] = {}
+
+    def walk(obj, path):
+        if isinstance(obj, dict):
+            for key, value in obj.items():
+                current_path = f"{path}.{key}" if path else key
+                # An array of objects (judged by its first item)
+                if isinstance(value, list) and value and isinstance(value[0], dict):
+                    if current_path not in keys:
+                        keys[current_path] = set()
+                        counts[current_path] = 0
+                    for item in value:
+                        if isinstance(item, dict):
+                            keys[current_path].update(item)
+                            counts[current_path] += 1
+                if isinstance(value, (dict, list)):
+                    walk(value, current_path)
+        elif isinstance(obj, list):
+            for item in obj:
+                if isinstance(item, (dict, list)):
+                    walk(item, path)
+
+    walk(data, "")
+
+    return [
+        ArrayEntry(path, frozenset(keys[path]), tuple(k.lower() for k in keys[path]), counts[path])
+        for path in keys
+    ]
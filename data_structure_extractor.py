@@ -4,8 +4,152 @@ Data Structure Extractor
 Extracts hierarchical structure from merge data JSON for visualization and analysis
 """
 
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Union, Iterable, Iterator, Optional, Tuple
+from collections.abc import Mapping
+import hashlib
 import json
+import random
+import re
+
+SAMPLE_SEED = 0  # Union-mode sample reservoirs are reproducible from run to run
+
+
+class StructureTable(dict):
+    """
+    Flat structure table: field path -> record.
+
+    Every field is stored exactly once. Records carry their own 'id', their
+    parent's 'parent_id' and the ids of their direct children ('child_ids'),
+    so the nesting can be rebuilt without keeping each subtree twice.
+    Nested views are derived on demand: record['children'] returns a lazy
+    mapping of all descendants (see StructureRecord).
+    """
+
+    INDEX_PATTERN = re.compile(r'\[\d+\]')
+
+    def __init__(self):
+        super().__init__()
+        self.paths: List[str] = []  # id -> path
+        self.root_ids: List[int] = []  # ids of top-level records
+        self._hashes: Optional[List[str]] = None
+
+    def add(self, path: str, info: Dict, parent_id: Optional[int] = None) -> int:
+        """Add a record and link it to its parent. Returns the new record id."""
+        record_id = len(self.paths)
+        record = StructureRecord(self, info)
+        self._hashes = None
+        record['id'] = record_id
+        record['parent_id'] = parent_id
+        record['child_ids'] = []
+
+        self.paths.append(path)
+        self[path] = record
+        if parent_id is not None:
+            self.record(parent_id)['child_ids'].append(record_id)
+        else:
+            self.root_ids.append(record_id)
+
+        return record_id
+
+    def record(self, record_id: int) -> 'StructureRecord':
+        """Look up a record by id"""
+        return self[self.paths[record_id]]
+
+    def child_records(self, path: Optional[str] = None) -> List['StructureRecord']:
+        """Direct children of a field (top-level records when path is None)"""
+        ids = self.root_ids if path is None else self[path]['child_ids']
+        return [self.record(record_id) for record_id in ids]
+
+    def subtree_hashes(self) -> List[str]:
+        """
+        Content hash of every record's subtree, indexed by record id.
+
+        A hash covers the record's type and the relative names, types and
+        shapes of everything below it - not the record's own name, position
+        or sample values - so identical subtrees hash the same wherever they
+        sit (e.g. v1 'locations' and v2 'project.project_locations').
+        Array indexes are folded to '[]', so template and full extractions of
+        the same shape agree. Computed bottom-up in one pass and cached.
+        """
+        if self._hashes is None:
+            hashes = [''] * len(self.paths)
+            # Children always have larger ids than their parents
+            for record_id in range(len(self.paths) - 1, -1, -1):
+                record = self.record(record_id)
+                path = self.paths[record_id]
+                digest = hashlib.blake2b(digest_size=12)
+                digest.update(f"{record.get('type', 'unknown')}|{record.get('item_type', '')}".encode('utf-8'))
+
+                entries = sorted({
+                    (self.INDEX_PATTERN.sub('[]', self.paths[child_id][len(path):]), hashes[child_id])
+                    for child_id in record['child_ids']
+                })
+                for suffix, child_hash in entries:
+                    digest.update(f"\n{suffix}={child_hash}".encode('utf-8'))
+
+                hashes[record_id] = digest.hexdigest()
+            self._hashes = hashes
+        return self._hashes
+
+    def descendant_paths(self, path: str) -> Iterator[str]:
+        """Paths of every descendant of a field, in extraction (pre-order) order"""
+        stack = list(reversed(self[path]['child_ids']))
+        while stack:
+            record = self.record(stack.pop())
+            yield self.paths[record['id']]
+            stack.extend(reversed(record['child_ids']))
+
+    def is_descendant(self, path: str, ancestor_id: int) -> bool:
+        """Check whether path lives somewhere below the record ancestor_id"""
+        record = self.get(path)
+        parent_id = record['parent_id'] if record is not None else None
+        while parent_id is not None:
+            if parent_id == ancestor_id:
+                return True
+            parent_id = self.record(parent_id)['parent_id']
+        return False
+
+
+class StructureRecord(dict):
+    """
+    A single field record in a StructureTable.
+
+    Serializes as a plain dict. The 'children' key is not stored; reading
+    record['children'] derives a descendants view from the table instead.
+    """
+
+    __slots__ = ('_table',)
+
+    def __init__(self, table: StructureTable, info: Dict):
+        super().__init__(info)
+        self._table = table
+
+    def __missing__(self, key):
+        if key == 'children':
+            return ChildrenView(self._table, self['id'])
+        raise KeyError(key)
+
+
+class ChildrenView(Mapping):
+    """Lazy mapping of every descendant of a record: path -> record"""
+
+    def __init__(self, table: StructureTable, record_id: int):
+        self._table = table
+        self._record_id = record_id
+
+    def __iter__(self):
+        return self._table.descendant_paths(self._table.paths[self._record_id])
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __getitem__(self, path):
+        if self._table.is_descendant(path, self._record_id):
+            return self._table[path]
+        raise KeyError(path)
+
+    def __contains__(self, path):
+        return self._table.is_descendant(path, self._record_id)
 
 
 class DataStructureExtractor:
@@ -21,75 +165,146 @@ class DataStructureExtractor:
     Modes:
     - template_only=True: Only extract [0] as a template (faster, smaller payload)
     - template_only=False: Extract all array items (accurate sample values)
+    - union=True: Merge all array items into one [0] schema per array, with
+      occurrence counts, optional/nullable flags, observed types and a
+      fixed-size reservoir of sample values per field (bounded memory,
+      whatever the array lengths)
     """
 
-    def __init__(self, template_only: bool = True):
+    def __init__(self, template_only: bool = True, union: bool = False, sample_size: int = 5):
         self.structures = {}
         self.template_only = template_only
+        self.union = union
+        self.sample_size = sample_size
+        self._rng = random.Random(SAMPLE_SEED)  # Reservoir sampling; reseeded per extraction
 
-    def extract_structure(self, merge_data: Dict, prefix: str = "", strip_prefix: str = "data.attributes.content.") -> Dict:
+    def extract_structure(self, merge_data: Dict, prefix: str = "", strip_prefix: str = "data.attributes.content.") -> StructureTable:
         """
-        Extract hierarchical structure from merge data.
+        Extract the structure of merge data as a flat table.
 
         Args:
             merge_data: Dictionary of merge data (nested JSON)
-            prefix: Current path prefix (used for recursion)
+            prefix: Path prefix for the top-level keys
             strip_prefix: Prefix to strip from final paths
 
         Returns:
-            Dictionary mapping field paths to their metadata:
+            StructureTable mapping field paths to their metadata:
             {
                 'field_path': {
+                    'path': 'field_path',
                     'type': 'string' | 'number' | 'boolean' | 'array' | 'object',
                     'sample_value': <first value found>,
                     'is_array': bool,
                     'array_count': int (if array),
-                    'children': {...} (if object or array)
+                    'item_type': str (if array),
+                    'id': int,
+                    'parent_id': int | None,
+                    'child_ids': [int, ...]
                 }
             }
+            record['children'] gives a lazy view of all descendants.
+
+            In union mode, records also carry 'occurrences', 'optional',
+            'nullable', 'observed_types' ({type: count}) and 'samples', and
+            arrays carry 'total_items'; 'array_count' is the longest
+            occurrence of the array.
         """
-        structure = {}
+        table = StructureTable()
 
         # Handle None or empty data
         if merge_data is None:
-            return structure
+            return table
 
         # If merge_data is not a dict, wrap it
         if not isinstance(merge_data, dict):
-            return {
-                prefix or 'root': {
-                    'type': self._infer_type(merge_data),
-                    'sample_value': self._get_sample_value(merge_data),
-                    'is_array': False
-                }
-            }
+            path = prefix or 'root'
+            table.add(path, {
+                'path': path,
+                'type': self._infer_type(merge_data),
+                'sample_value': self._get_sample_value(merge_data),
+                'is_array': False
+            })
+            return table
+
+        if self.union:
+            stats = {}
+            self._rng = random.Random(SAMPLE_SEED)
+            self._merge_object(table, stats, merge_data, prefix, None)
+            self._finalize_union(table, stats)
+        else:
+            self._extract_object(table, merge_data, prefix, None)
 
-        # Recursively process each key-value pair
-        for key, value in merge_data.items():
-            # Build the full path
-            if prefix:
-                path = f"{prefix}.{key}"
-            else:
-                path = key
+        # Strip unwanted prefix if specified
+        if strip_prefix:
+            table = self._strip_prefix(table, strip_prefix)
+
+        return table
 
-            # Extract structure for this field
-            field_info = self._extract_field_info(path, value)
+    def extract_structure_from_events(self, events: Optional[Iterable[Tuple[str, Any]]], prefix: str = "",
+                                      strip_prefix: str = "data.attributes.content.") -> StructureTable:
+        """
+        Extract the structure from a stream of JSON parse events.
 
-            # Add to structure
-            structure[path] = field_info
+        Produces the same table as extract_structure(), but consumes events
+        from json_stream.iter_events() (e.g. straight off an HTTP response), so
+        the merge data itself is never held in memory. In template mode the
+        array items after [0] are only counted, never decoded into records.
 
-            # If has children, merge them in
-            if 'children' in field_info and field_info['children']:
-                structure.update(field_info['children'])
+        Args:
+            events: (event, value) tuples, or None (treated like missing data)
+            prefix: Prefix to add to all paths
+            strip_prefix: Prefix to strip from final paths
+
+        Returns:
+            StructureTable (see extract_structure)
+        """
+        table = StructureTable()
+        if events is None:
+            return table
+
+        events = iter(events)
+        event, value = next(events, ('null', None))
+
+        if event == 'null':
+            return table
+
+        # Non-object documents are wrapped, as in extract_structure()
+        if event != 'start_map':
+            path = prefix or 'root'
+            if event == 'start_array':
+                value_type = 'array'
+                sample = f"[{self._count_items(events)} items]"
+            else:
+                value_type = self._infer_type(value)
+                sample = self._get_sample_value(value)
+            table.add(path, {
+                'path': path,
+                'type': value_type,
+                'sample_value': sample,
+                'is_array': False
+            })
+            return table
+
+        stats = {} if self.union else None
+        self._rng = random.Random(SAMPLE_SEED)
+        self._extract_events(table, events, prefix, stats)
+        if self.union:
+            self._finalize_union(table, stats)
 
-        # Strip unwanted prefix if specified
         if strip_prefix:
-            structure = self._strip_prefix(structure, strip_prefix)
+            table = self._strip_prefix(table, strip_prefix)
+
+        return table
 
-        return structure
+    def _extract_object(self, table: StructureTable, obj: Dict, prefix: str, parent_id: Optional[int]):
+        """Add every key of an object to the table"""
+        for key, value in obj.items():
+            # Build the full path
+            path = f"{prefix}.{key}" if prefix else key
+            self._extract_field(table, path, value, parent_id)
 
-    def _extract_field_info(self, path: str, value: Any) -> Dict:
-        """Extract metadata for a single field"""
+    def _extract_field(self, table: StructureTable, path: str, value: Any, parent_id: Optional[int]):
+        """Add a single field (and everything below it) to the table"""
         info = {
             'path': path,
             'type': self._infer_type(value),
@@ -104,49 +319,293 @@ class DataStructureExtractor:
             if len(value) > 0:
                 first_item = value[0]
                 info['item_type'] = self._infer_type(first_item) if not isinstance(first_item, (dict, list)) else ('object' if isinstance(first_item, dict) else 'array')
-
-                all_children = {}
-
-                if self.template_only:
-                    # Template mode: only extract [0] as a template (faster, smaller payload)
-                    item_path = f"{path}[0]"
-                    if isinstance(first_item, dict):
-                        all_children = self.extract_structure(first_item, item_path, strip_prefix="")
-                    elif isinstance(first_item, list):
-                        item_info = self._extract_field_info(item_path, first_item)
-                        all_children[item_path] = item_info
-                        if item_info.get('children'):
-                            all_children.update(item_info['children'])
-                else:
-                    # Full mode: extract ALL items for accurate sample values
-                    for index, item in enumerate(value):
-                        item_path = f"{path}[{index}]"
-
-                        if isinstance(item, dict):
-                            item_children = self.extract_structure(item, item_path, strip_prefix="")
-                            all_children.update(item_children)
-                        elif isinstance(item, list):
-                            item_info = self._extract_field_info(item_path, item)
-                            all_children[item_path] = item_info
-                            if item_info.get('children'):
-                                all_children.update(item_info['children'])
-
-                info['children'] = all_children
             else:
                 # Empty array
                 info['item_type'] = 'unknown'
-                info['children'] = {}
+
+            record_id = table.add(path, info, parent_id)
+
+            # Template mode: only extract [0] as a template (faster, smaller payload)
+            # Full mode: extract ALL items for accurate sample values
+            items = value[:1] if self.template_only else value
+            for index, item in enumerate(items):
+                item_path = f"{path}[{index}]"
+                if isinstance(item, dict):
+                    self._extract_object(table, item, item_path, record_id)
+                elif isinstance(item, list):
+                    self._extract_field(table, item_path, item, record_id)
 
         # Handle objects
         elif isinstance(value, dict):
             # Nested object - extract child structure
-            info['children'] = self.extract_structure(value, path, strip_prefix="")
+            record_id = table.add(path, info, parent_id)
+            self._extract_object(table, value, path, record_id)
 
         else:
             # Primitive value
-            info['children'] = {}
+            table.add(path, info, parent_id)
+
+    # ==================== Union Mode ====================
+
+    def _merge_object(self, table: StructureTable, stats: Dict, obj: Dict, prefix: str, parent_id: Optional[int]):
+        """Merge every key of an object into the union table"""
+        for key, value in obj.items():
+            path = f"{prefix}.{key}" if prefix else key
+            self._merge_field(table, stats, path, value, parent_id)
+
+    def _merge_field(self, table: StructureTable, stats: Dict, path: str, value: Any, parent_id: Optional[int]):
+        """
+        Merge one occurrence of a field into the union table.
+
+        Array items all merge into the same '[0]' paths, so the table only
+        grows with the number of distinct fields, never with array length.
+        """
+        record, stat, _ = self._union_record(
+            table, stats, path, self._infer_type(value), self._get_sample_value(value), parent_id
+        )
+        record_id = record['id']
+
+        if isinstance(value, list):
+            record['array_count'] = max(record['array_count'], len(value))
+            stat['items'] += len(value)
+            if value and record['item_type'] == 'unknown':
+                first_item = value[0]
+                record['item_type'] = self._infer_type(first_item) if not isinstance(first_item, (dict, list)) else ('object' if isinstance(first_item, dict) else 'array')
+
+            item_path = f"{path}[0]"
+            for item in value:
+                if isinstance(item, dict):
+                    stat['objects'] += 1
+                    self._merge_object(table, stats, item, item_path, record_id)
+                elif isinstance(item, list):
+                    self._merge_field(table, stats, item_path, item, record_id)
+
+        elif isinstance(value, dict):
+            stat['objects'] += 1
+            self._merge_object(table, stats, value, path, record_id)
+
+    def _union_record(self, table: StructureTable, stats: Dict, path: str, value_type: str,
+                      sample: Any, parent_id: Optional[int]):
+        """
+        Get or create the union record for one occurrence of a field and count it.
+
+        Returns:
+            (record, stats entry, defines) - defines is True when this occurrence
+            set the record's type and sample (first sighting, or first non-null)
+        """
+        record = table.get(path)
+        defines = False
+
+        if record is None:
+            info = {
+                'path': path,
+                'type': value_type,
+                'sample_value': sample,
+                'is_array': value_type == 'array'
+            }
+            table.add(path, info, parent_id)
+            record = table[path]
+            stats[path] = {
+                'occurrences': 0, 'types': {}, 'nullable': False,
+                'samples': [], 'seen': 0, 'objects': 0, 'items': 0
+            }
+            defines = True
+        elif record['type'] == 'null' and value_type != 'null':
+            # First non-null occurrence defines the field
+            record['type'] = value_type
+            record['sample_value'] = sample
+            record['is_array'] = value_type == 'array'
+            defines = True
+
+        if value_type == 'array' and 'array_count' not in record:
+            record['array_count'] = 0
+            record['item_type'] = 'unknown'
+
+        stat = stats[path]
+        stat['occurrences'] += 1
+        stat['types'][value_type] = stat['types'].get(value_type, 0) + 1
+
+        if value_type == 'null':
+            stat['nullable'] = True
+        elif value_type not in ('object', 'array'):
+            self._add_sample(stat, sample)
+
+        return record, stat, defines
+
+    def _add_sample(self, stat: Dict, sample: Any):
+        """Reservoir sampling (Algorithm R): keep a uniform sample of fixed size"""
+        stat['seen'] += 1
+        if len(stat['samples']) < self.sample_size:
+            if sample not in stat['samples']:
+                stat['samples'].append(sample)
+            return
+        slot = self._rng.randrange(stat['seen'])
+        if slot < self.sample_size and sample not in stat['samples']:
+            stat['samples'][slot] = sample
+
+    def _finalize_union(self, table: StructureTable, stats: Dict):
+        """Write the collected statistics onto the union records"""
+        for path, record in table.items():
+            stat = stats[path]
+            parent_id = record['parent_id']
+
+            # A field is optional if some object it could appear in lacks it
+            if parent_id is None:
+                containers = 1
+            else:
+                containers = stats[table.paths[parent_id]]['objects']
+
+            record['occurrences'] = stat['occurrences']
+            record['optional'] = containers > 0 and stat['occurrences'] < containers
+            record['nullable'] = stat['nullable']
+            record['observed_types'] = stat['types']
+            record['samples'] = stat['samples']
+            if record['is_array']:
+                record['total_items'] = stat['items']
+
+    # ==================== Streaming ====================
+
+    EVENT_TYPES = {
+        'start_map': 'object',
+        'start_array': 'array',
+        'string': 'string',
+        'number': 'number',
+        'boolean': 'boolean',
+        'null': 'null',
+    }
+
+    def _extract_events(self, table: StructureTable, events: Iterator[Tuple[str, Any]], prefix: str,
+                        stats: Optional[Dict]):
+        """
+        Build the table from the events inside the root object.
+
+        Mirrors _extract_field() (or _merge_field() when stats is given for
+        union mode). Container records are added when they open, so the table
+        keeps the same pre-order; their counts and samples are filled in when
+        they close.
+        """
+        union = stats is not None
+        skip_items = self.template_only and not union
+
+        # Open containers: [is_map, path, record_id, count, defines]
+        #   maps: path is the prefix for their keys, record_id the parent of
+        #   their fields (an array item's fields hang off the array record)
+        #   count is keys seen (maps) or items seen (arrays)
+        #   defines: this occurrence owns the record's sample_value
+        stack = [[True, prefix, None, 0, False]]
+        key = None
+        skip_depth = 0
+
+        for event, value in events:
+            if skip_depth:
+                # Inside an array item past [0] in template mode
+                if event == 'start_map' or event == 'start_array':
+                    skip_depth += 1
+                elif event == 'end_map' or event == 'end_array':
+                    skip_depth -= 1
+                continue
+
+            frame = stack[-1]
+
+            if event == 'map_key':
+                key = value
+                frame[3] += 1
+                continue
+
+            if event == 'end_map':
+                stack.pop()
+                if frame[4]:
+                    table.record(frame[2])['sample_value'] = f"{{{frame[3]} fields}}"
+                if not stack:
+                    return
+                continue
+
+            if event == 'end_array':
+                stack.pop()
+                record = table.record(frame[2])
+                count = frame[3]
+                if union:
+                    record['array_count'] = max(record['array_count'], count)
+                    stats[frame[1]]['items'] += count
+                else:
+                    record['array_count'] = count
+                if frame[4]:
+                    record['sample_value'] = f"[{count} items]"
+                continue
+
+            value_type = self.EVENT_TYPES[event]
+            is_container = event == 'start_map' or event == 'start_array'
+
+            if frame[0]:
+                # Object member
+                path = f"{frame[1]}.{key}" if frame[1] else key
+                sample = None if is_container else self._get_sample_value(value)
+                record_id, defines = self._open_event_record(table, stats, path, value_type, sample, frame[2])
+
+                if event == 'start_map':
+                    if union:
+                        stats[path]['objects'] += 1
+                    stack.append([True, path, record_id, 0, defines])
+                elif event == 'start_array':
+                    stack.append([False, path, record_id, 0, defines])
+                continue
+
+            # Array item
+            index = frame[3]
+            frame[3] += 1
+            array_record = table.record(frame[2])
+            if index == 0 and array_record['item_type'] == 'unknown':
+                array_record['item_type'] = value_type
+
+            if not is_container:
+                continue
+            if skip_items and index > 0:
+                skip_depth = 1
+                continue
+
+            item_path = f"{frame[1]}[0]" if union else f"{frame[1]}[{index}]"
+            if event == 'start_map':
+                if union:
+                    stats[frame[1]]['objects'] += 1
+                stack.append([True, item_path, frame[2], 0, False])
+            else:
+                record_id, defines = self._open_event_record(table, stats, item_path, 'array', None, frame[2])
+                stack.append([False, item_path, record_id, 0, defines])
 
-        return info
+    def _open_event_record(self, table: StructureTable, stats: Optional[Dict], path: str, value_type: str,
+                           sample: Any, parent_id: Optional[int]):
+        """Add (or, in union mode, merge) the record for one streamed field. Returns (id, defines)."""
+        if stats is not None:
+            record, _, defines = self._union_record(table, stats, path, value_type, sample, parent_id)
+            return record['id'], defines
+
+        info = {
+            'path': path,
+            'type': value_type,
+            'sample_value': sample,
+            'is_array': value_type == 'array'
+        }
+        if value_type == 'array':
+            info['array_count'] = 0
+            info['item_type'] = 'unknown'
+        return table.add(path, info, parent_id), True
+
+    def _count_items(self, events: Iterator[Tuple[str, Any]]) -> int:
+        """Count the items of an array whose start_array was just consumed"""
+        count = 0
+        depth = 0
+        for event, _ in events:
+            if event == 'start_map' or event == 'start_array':
+                if depth == 0:
+                    count += 1
+                depth += 1
+            elif event == 'end_map' or event == 'end_array':
+                if depth == 0:
+                    break
+                depth -= 1
+            elif depth == 0 and event != 'map_key':
+                count += 1
+        return count
 
     def _infer_type(self, value: Any) -> str:
         """Infer the type of a value"""
@@ -187,27 +646,28 @@ class DataStructureExtractor:
         else:
             return str(value)[:max_length]
 
-    def _strip_prefix(self, structure: Dict, prefix: str) -> Dict:
+    def _strip_prefix(self, structure: StructureTable, prefix: str) -> StructureTable:
         """Strip a prefix from all paths in the structure"""
         if not prefix:
             return structure
 
-        result = {}
+        result = StructureTable()
+        new_ids = {}  # old id -> new id
+
+        # Parents always precede their children, so one pass is enough
         for path, info in structure.items():
             # Only keep fields that start with the prefix
-            if path.startswith(prefix):
-                new_path = path[len(prefix):]
-                # Skip if new_path is empty (means it was exactly the prefix)
-                if new_path:
-                    # Create a copy of info to avoid modifying the original
-                    new_info = info.copy()
-                    new_info['path'] = new_path
-
-                    # Recursively strip prefix from children
-                    if 'children' in new_info and new_info['children']:
-                        new_info['children'] = self._strip_prefix(new_info['children'], prefix)
-
-                    result[new_path] = new_info
+            # (skipping the field that is exactly the prefix)
+            if not path.startswith(prefix) or len(path) == len(prefix):
+                continue
+
+            new_path = path[len(prefix):]
+            new_info = {
+                k: v for k, v in info.items()
+                if k not in ('id', 'parent_id', 'child_ids')
+            }
+            new_info['path'] = new_path
+            new_ids[info['id']] = result.add(new_path, new_info, new_ids.get(info['parent_id']))
 
         return result
 
@@ -215,7 +675,10 @@ class DataStructureExtractor:
         """
         Build a hierarchical tree structure from flat field paths.
 
-        Useful for tree UI rendering.
+        Useful for tree UI rendering. Runs in one pass over the structure:
+        nodes are indexed by path, so each field finds its parent with a
+        dict lookup instead of scanning sibling lists. Array items hang off
+        their array node (the index is dropped from the node name).
 
         Returns:
             {
@@ -237,77 +700,62 @@ class DataStructureExtractor:
             'type': 'object',
             'children': []
         }
+        nodes = {'': root}  # path -> tree node
 
-        # Sort paths to ensure parents come before children
-        sorted_paths = sorted(structure.keys(), key=lambda x: (x.count('.'), x))
-
-        for path in sorted_paths:
-            info = structure[path]
-            self._add_to_tree(root, path, info)
+        for path, info in structure.items():
+            node = self._tree_node(nodes, path)
+
+            # Fill in the field (replaces any placeholder intermediate node)
+            children = node.pop('children', None)
+            node['path'] = info.get('path', path)
+            node['type'] = info['type']
+            node['sample_value'] = info.get('sample_value')
+            node['is_array'] = info.get('is_array', False)
+            if info.get('array_count'):
+                node['array_count'] = info['array_count']
+            if children:
+                node['children'] = children
 
         return root
 
-    def _add_to_tree(self, tree: Dict, path: str, info: Dict):
-        """Add a field to the tree structure"""
-        parts = path.split('.')
-        current = tree
-
-        # Navigate to the correct parent
-        for i, part in enumerate(parts[:-1]):
-            # Remove array index notation if present
-            clean_part = part.split('[')[0]
-
-            # Find or create child
-            child = None
-            for c in current.get('children', []):
-                if c['name'] == clean_part:
-                    child = c
-                    break
+    def _tree_node(self, nodes: Dict[str, Dict], path: str) -> Dict:
+        """Find or create the tree node for a path (creating missing parents)"""
+        node = nodes.get(path)
+        if node is not None:
+            return node
 
-            if child is None:
-                # Create intermediate node
-                child = {
-                    'name': clean_part,
-                    'path': '.'.join(parts[:i+1]),
-                    'type': 'object',
-                    'children': []
-                }
-                if 'children' not in current:
-                    current['children'] = []
-                current['children'].append(child)
-
-            current = child
-
-        # Add the final leaf
-        leaf_name = parts[-1].split('[')[0]
-        leaf = {
-            'name': leaf_name,
-            'path': info.get('path', path),
-            'type': info['type'],
-            'sample_value': info.get('sample_value'),
-            'is_array': info.get('is_array', False)
+        parent = nodes[''] if not path else self._tree_node(nodes, self._tree_parent_path(path))
+        node = {
+            'name': path.split('.')[-1].split('[')[0],
+            'path': path,
+            'type': 'object',
+            'children': []
         }
+        parent.setdefault('children', []).append(node)
+        nodes[path] = node
+        return node
+
+    def _tree_parent_path(self, path: str) -> str:
+        """
+        Path of the tree node a field hangs off.
+
+        Examples:
+            'project.name' -> 'project'
+            'items[0].id' -> 'items'
+            'sentences[0]' -> 'sentences'
+            'name' -> ''
+        """
+        if path.endswith(']'):
+            parent = path[:path.rindex('[')]
+        elif '.' in path:
+            parent = path.rsplit('.', 1)[0]
+        else:
+            return ''
 
-        if info.get('array_count'):
-            leaf['array_count'] = info['array_count']
-
-        if info.get('children'):
-            leaf['children'] = []
-            # Add children from structure
-            for child_path, child_info in info['children'].items():
-                if child_path.startswith(path):
-                    child_leaf = {
-                        'name': child_path.split('.')[-1].split('[')[0],
-                        'path': child_info.get('path', child_path),
-                        'type': child_info['type'],
-                        'sample_value': child_info.get('sample_value'),
-                        'is_array': child_info.get('is_array', False)
-                    }
-                    leaf['children'].append(child_leaf)
-
-        if 'children' not in current:
-            current['children'] = []
-        current['children'].append(leaf)
+        # Array items are not nodes of their own - step up to the array
+        while parent.endswith(']'):
+            parent = parent[:parent.rindex('[')]
+        return parent
 
 
 def main():
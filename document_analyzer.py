@@ -13,6 +13,76 @@ import xml.etree.ElementTree as ET
 from typing import Dict, List, Set, Tuple
 from pathlib import Path
 
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_P = f'{W_NS}p'
+W_T = f'{W_NS}t'
+W_TC = f'{W_NS}tc'
+W_TAB = f'{W_NS}tab'
+W_BR = f'{W_NS}br'
+
+# Numbers in running text, with or without thousands separators
+NUMBER_IN_TEXT = re.compile(r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+\.?\d*')
+XML_CHUNK_SIZE = 64 * 1024
+
+
+class _TextCollector:
+    """
+    XMLParser target that hands document text to a callback as it streams.
+
+    Calls add() with every text run, with the joined runs of each paragraph
+    that has more than one, and with the joined paragraphs of each table
+    cell that has more than one. Only the open paragraphs and cells are
+    kept in memory.
+    """
+
+    def __init__(self, add):
+        self.add = add
+        self.in_text = False
+        self.text = []        # Pieces of the current w:t
+        self.runs = []        # Texts of the current paragraph
+        self.paragraphs = []  # Outer paragraphs' runs (text boxes nest paragraphs)
+        self.cells = []       # Paragraph texts per open table cell
+
+    def start(self, tag, attrib):
+        if tag == W_T:
+            self.in_text = True
+        elif tag == W_P:
+            self.paragraphs.append(self.runs)
+            self.runs = []
+        elif tag == W_TC:
+            self.cells.append([])
+        elif tag == W_TAB or tag == W_BR:
+            self.runs.append(' ')
+
+    def data(self, data):
+        if self.in_text:
+            self.text.append(data)
+
+    def end(self, tag):
+        if tag == W_T:
+            self.in_text = False
+            text = ''.join(self.text)
+            self.text = []
+            if text:
+                self.add(text)
+                self.runs.append(text)
+        elif tag == W_P:
+            runs = self.runs
+            paragraph = ''.join(runs)
+            # A single run was already added on its own
+            if sum(1 for run in runs if run != ' ') > 1:
+                self.add(paragraph)
+            if self.cells:
+                self.cells[-1].append(paragraph)
+            self.runs = self.paragraphs.pop()
+        elif tag == W_TC:
+            cell = self.cells.pop()
+            if len(cell) > 1:
+                self.add(' '.join(cell))
+
+    def close(self):
+        return None
+
 
 class DocumentAnalyzer:
     """Extract fields and values from Word documents for mapping learning"""
@@ -80,6 +150,12 @@ class DocumentAnalyzer:
         """
         Extract all text content from an output document
 
+        The document XML is streamed through the parser (see _TextCollector),
+        so no element tree is built and memory stays flat however long the
+        document is. Besides each text run, the runs of every paragraph and
+        the paragraphs of every table cell are joined, so values Word split
+        across runs (e.g. '$12,' + '345') are found too.
+
         Args:
             docx_path: Path to the output document
             min_length: Minimum string length to consider (avoid single chars)
@@ -88,35 +164,39 @@ class DocumentAnalyzer:
             Set of unique text values found in the document
         """
         values = set()
+        seen = set()
+
+        def add(text):
+            text = text.strip()
+
+            # Filter out very short strings and common formatting
+            if len(text) < min_length or text in seen:
+                return
+            seen.add(text)
+            if self._is_formatting_text(text):
+                return
+            values.add(text)
+
+            # Also extract numbers if present
+            for num in NUMBER_IN_TEXT.findall(text):
+                num = num.replace(',', '')
+                if len(num) >= 2:  # Avoid single digits
+                    try:
+                        # Try to convert to appropriate type
+                        if '.' in num:
+                            values.add(float(num))
+                        else:
+                            values.add(int(num))
+                    except ValueError:
+                        pass
 
         try:
             with zipfile.ZipFile(docx_path, 'r') as zip_ref:
-                xml_content = zip_ref.read('word/document.xml')
-
-            # Parse XML
-            root = ET.fromstring(xml_content)
-
-            # Find all text elements
-            for text_elem in root.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t'):
-                if text_elem.text:
-                    text = text_elem.text.strip()
-
-                    # Filter out very short strings and common formatting
-                    if len(text) >= min_length and not self._is_formatting_text(text):
-                        values.add(text)
-
-                        # Also extract numbers if present
-                        numbers = re.findall(r'\d+\.?\d*', text)
-                        for num in numbers:
-                            if len(num) >= 2:  # Avoid single digits
-                                try:
-                                    # Try to convert to appropriate type
-                                    if '.' in num:
-                                        values.add(float(num))
-                                    else:
-                                        values.add(int(num))
-                                except ValueError:
-                                    pass
+                with zip_ref.open('word/document.xml') as xml_file:
+                    parser = ET.XMLParser(target=_TextCollector(add))
+                    for chunk in iter(lambda: xml_file.read(XML_CHUNK_SIZE), b''):
+                        parser.feed(chunk)
+                    parser.close()
 
         except Exception as e:
             print(f"Error extracting text values: {e}")
@@ -155,7 +235,8 @@ class DocumentAnalyzer:
         v1_fields: List[str],
         output_values: Set,
         v1_merge_data: Dict,
-        v2_merge_data: Dict
+        v2_merge_data: Dict,
+        project_id: str = None
     ) -> List[Dict]:
         """
         Match v1 template fields to actual values in output, then find v2 paths
@@ -166,67 +247,65 @@ class DocumentAnalyzer:
         3. Find where that value appears in v2 merge data
         4. Return the mapping: v1_field -> value -> v2_path
 
+        Values are compared in canonical form (see value_index), so '$1,234'
+        in the document matches 1234 in the merge data.
+
         Args:
             v1_fields: List of field names from v1 template
             output_values: Set of values extracted from output document
-            v1_merge_data: v1 API merge data
-            v2_merge_data: v2 API merge data
+            v1_merge_data: v1 API merge data (loaded JSON or raw response bytes)
+            v2_merge_data: v2 API merge data (loaded JSON or raw response bytes)
+            project_id: ScopeStack project ID, for the shared value index cache
 
         Returns:
             List of mappings with confidence scores
         """
         mappings = []
 
-        # Extract paths and values from both merge data versions
-        from learn_mappings import MappingLearner
-        learner = MappingLearner(fetcher=None)
+        # Value indexes for both merge data versions (shared with MappingLearner)
+        from value_index import canonical_value, value_index_cache
+
+        v1_index = value_index_cache.get_or_build(project_id, 'v1', v1_merge_data)
+        v2_index = value_index_cache.get_or_build(project_id, 'v2', v2_merge_data)
 
-        v1_value_map = learner.extract_values_with_paths(
-            v1_merge_data,
-            strip_prefix="data.attributes.content."
-        )
+        output_keys = {canonical_value(value) for value in output_values}
+        output_keys.discard(None)
 
-        v2_value_map = learner.extract_values_with_paths(
-            v2_merge_data,
-            strip_prefix="data.attributes.content."
-        )
+        # Field name -> values at paths ending in that name, checked against
+        # the document's values: only the field's own values are visited
+        suffix_index = v1_index.suffix_index()
 
         # For each v1 field
         for v1_field in v1_fields:
-            # Find values for this field in v1 merge data
-            v1_paths_for_field = [path for path in v1_value_map.values() if v1_field in path]
+            field_values = suffix_index.get(v1_field)
+            if not field_values:
+                continue
 
-            # Check if any of those paths have values that appear in output
-            for value, v1_paths in v1_value_map.items():
+            for key, v1_paths in field_values.items():
                 # Skip if this value isn't in output document
-                if value not in output_values:
+                if key not in output_keys:
                     continue
 
-                # Check if any of these paths match our field
-                matching_paths = [p for p in v1_paths if p == v1_field or p.endswith(f'.{v1_field}')]
-
-                if not matching_paths:
+                # This value matches! Now find it in v2 merge data
+                v2_paths = v2_index.paths.get(key)
+                if not v2_paths:
                     continue
 
-                # This value matches! Now find it in v2 merge data
-                if value in v2_value_map:
-                    v2_paths = v2_value_map[value]
-
-                    # Calculate confidence
-                    confidence = 'high' if len(v2_paths) == 1 else 'medium'
-
-                    # Pick best v2 path (shortest is usually most direct)
-                    v2_path = min(v2_paths, key=len)
-
-                    mappings.append({
-                        'v1_field': v1_field,
-                        'v2_field': v2_path,
-                        'value': value,
-                        'confidence': confidence,
-                        'confirmed_in_output': True,  # Key indicator!
-                        'v1_paths': matching_paths,
-                        'v2_paths': v2_paths
-                    })
+                # Calculate confidence
+                confidence = 'high' if len(v2_paths) == 1 else 'medium'
+
+                # Pick best v2 path (shortest is usually most direct)
+                v2_path = min(v2_paths, key=len)
+
+                mappings.append({
+                    'v1_field': v1_field,
+                    'v2_field': v2_path,
+                    'value': v1_index.values[key],
+                    'confidence': confidence,
+                    'confirmed_in_output': True,  # Key indicator!
+                    'v1_paths': v1_paths,
+                    'v2_paths': v2_paths
+                })
 
         return mappings
 
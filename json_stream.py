@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+JSON Stream
+===========
+
+Incremental, event-based JSON reader (stdlib only).
+
+Merge data payloads can be tens of megabytes, and response.json() builds the
+whole document before anything else can run. iter_events() instead turns a
+stream of byte (or text) chunks into a flat sequence of parse events, so
+consumers such as DataStructureExtractor.extract_structure_from_events() and
+ValueIndex.from_events() can build their own, much smaller, results without
+the full tree ever being materialized.
+
+Events are (event, value) tuples, in document order:
+
+    ('start_map', None)     ('map_key', 'name')      ('end_map', None)
+    ('start_array', None)   ('end_array', None)
+    ('string', 'text')      ('number', 42)           ('boolean', True)
+    ('null', None)
+
+Strings and numbers decode exactly as json.loads() would (ints stay ints,
+anything with a fraction or exponent is a float).
+
+Usage:
+    with open('merge_data.json', 'rb') as f:
+        for event, value in iter_events(iter(lambda: f.read(65536), b'')):
+            ...
+"""
+
+import codecs
+import json
+import re
+from json.decoder import scanstring
+from typing import Any, Iterable, Iterator, Tuple, Union
+
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?')
+LITERALS = (
+    ('true', 'boolean', True),
+    ('false', 'boolean', False),
+    ('null', 'null', None),
+)
+
+# Parser states: what the next significant character may be
+_VALUE = 0           # any value (top level, after ':' or after ',' in an array)
+_VALUE_OR_END = 1    # right after '['
+_KEY_OR_END = 2      # right after '{'
+_KEY = 3             # after ',' in an object
+_COLON = 4
+_COMMA_OR_END = 5
+_DONE = 6            # top-level value complete
+
+
+def iter_events(chunks: Iterable[Union[bytes, str]], encoding: str = 'utf-8') -> Iterator[Tuple[str, Any]]:
+    """
+    Parse a JSON document incrementally.
+
+    Args:
+        chunks: Iterable of bytes or str pieces of one JSON document
+                (e.g. response.iter_content(), or file reads)
+        encoding: Encoding used to decode byte chunks
+
+    Yields:
+        (event, value) tuples (see module docstring)
+
+    Raises:
+        json.JSONDecodeError: If the document is malformed or truncated
+    """
+    chunks = iter(chunks)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    buf = ''
+    pos = 0
+    eof = False
+    stack = []  # True for objects, False for arrays
+    state = _VALUE
+
+    size = 0
+    skip_whitespace = WHITESPACE.match
+
+    while True:
+        if pos >= size:
+            if eof:
+                break
+            buf, pos, eof = _read_more(chunks, decoder, buf, pos)
+            size = len(buf)
+            continue
+
+        char = buf[pos]
+        if char in ' \t\n\r':
+            pos = skip_whitespace(buf, pos).end()
+            continue
+
+        if char == '"':
+            if state not in (_VALUE, _VALUE_OR_END, _KEY_OR_END, _KEY):
+                raise json.JSONDecodeError("Unexpected string", buf, pos)
+            try:
+                text, end = scanstring(buf, pos + 1)
+            except json.JSONDecodeError:
+                # Most likely the closing quote has not arrived yet
+                if eof:
+                    raise
+                buf, pos, eof = _read_more(chunks, decoder, buf, pos)
+                size = len(buf)
+                continue
+            pos = end
+            if state in (_KEY_OR_END, _KEY):
+                yield 'map_key', text
+                state = _COLON
+            else:
+                yield 'string', text
+                state = _COMMA_OR_END if stack else _DONE
+
+        elif char == ':':
+            if state != _COLON:
+                raise json.JSONDecodeError("Unexpected ':'", buf, pos)
+            pos += 1
+            state = _VALUE
+
+        elif char == ',':
+            if state != _COMMA_OR_END:
+                raise json.JSONDecodeError("Unexpected ','", buf, pos)
+            pos += 1
+            state = _KEY if stack[-1] else _VALUE
+
+        elif char == '{' or char == '[':
+            if state not in (_VALUE, _VALUE_OR_END):
+                raise json.JSONDecodeError(f"Unexpected '{char}'", buf, pos)
+            pos += 1
+            is_map = char == '{'
+            stack.append(is_map)
+            yield ('start_map' if is_map else 'start_array'), None
+            state = _KEY_OR_END if is_map else _VALUE_OR_END
+
+        elif char == '}' or char == ']':
+            is_map = char == '}'
+            allowed = _KEY_OR_END if is_map else _VALUE_OR_END
+            if state not in (allowed, _COMMA_OR_END) or stack[-1] != is_map:
+                raise json.JSONDecodeError(f"Unexpected '{char}'", buf, pos)
+            pos += 1
+            stack.pop()
+            yield ('end_map' if is_map else 'end_array'), None
+            state = _COMMA_OR_END if stack else _DONE
+
+        else:
+            if state not in (_VALUE, _VALUE_OR_END):
+                raise json.JSONDecodeError("Expecting value" if state != _DONE else "Extra data", buf, pos)
+
+            match = NUMBER.match(buf, pos)
+            if match:
+                if size - match.end() < 3 and not eof:
+                    # The number may continue in the next chunk ('1' + '.5e-3')
+                    buf, pos, eof = _read_more(chunks, decoder, buf, pos)
+                    size = len(buf)
+                    continue
+                number = match.group()
+                yield 'number', float(number) if match.group(1) or match.group(2) else int(number)
+                pos = match.end()
+            else:
+                for literal, event, value in LITERALS:
+                    if buf.startswith(literal, pos):
+                        yield event, value
+                        pos += len(literal)
+                        break
+                else:
+                    if size - pos < 5 and not eof:
+                        buf, pos, eof = _read_more(chunks, decoder, buf, pos)
+                        size = len(buf)
+                        continue
+                    raise json.JSONDecodeError("Expecting value", buf, pos)
+
+            state = _COMMA_OR_END if stack else _DONE
+
+    if state != _DONE:
+        raise json.JSONDecodeError("Unexpected end of data", buf, pos)
+
+
+def _read_more(chunks, decoder, buf: str, pos: int) -> Tuple[str, int, bool]:
+    """Drop consumed text and append the next chunk. Returns (buf, pos, eof)."""
+    try:
+        chunk = next(chunks)
+    except StopIteration:
+        return buf[pos:] + decoder.decode(b'', final=True), 0, True
+
+    if isinstance(chunk, str):
+        return buf[pos:] + chunk, 0, False
+    return buf[pos:] + decoder.decode(chunk), 0, False
+
+
+def iter_file_events(path, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    """Parse a JSON file incrementally (see iter_events)"""
+    with open(path, 'rb') as f:
+        yield from iter_events(iter(lambda: f.read(chunk_size), b''))
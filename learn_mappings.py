@@ -14,92 +14,81 @@ This tool:
 
 Usage:
     python3 learn_mappings.py --project 123456
+    python3 learn_mappings.py --projects 123456 123457 123458 --workers 4
+    python3 learn_mappings.py --from-recent 25
 """
 
 from merge_data_fetcher import MergeDataFetcher
 from auth_manager import AuthManager
+from value_index import ValueIndex, value_index_cache
+from array_catalog import ArrayEntry, build_array_catalog, unwrap
 import json
 import sys
+import time
 import zipfile
 import re
-from typing import Dict, List, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Union
 
 
 class MappingLearner:
     """Learn field mappings by comparing v1 and v2 merge data values"""
 
-    def __init__(self, fetcher: MergeDataFetcher):
-        self.fetcher = fetcher
-        self.v1_value_map = {}  # value -> list of v1 paths
-        self.v2_value_map = {}  # value -> list of v2 paths
-
-    def extract_values_with_paths(self, data: Dict, prefix: str = "", strip_prefix: str = None) -> Dict[Any, List[str]]:
+    def __init__(self, fetcher: MergeDataFetcher, log: Callable[..., None] = print):
         """
-        Extract all values from nested data structure along with their paths
-        Returns: {value: [list of paths where this value appears]}
-
         Args:
-            data: The data structure to extract from
-            prefix: Starting prefix for paths
-            strip_prefix: Optional prefix to strip from paths (e.g., "data.attributes.content.")
+            fetcher: Authenticated MergeDataFetcher
+            log: Called like print() with the learning steps (e.g. a no-op to run quietly)
         """
-        value_map = {}
-
-        def extract(obj, path=""):
-            if isinstance(obj, dict):
-                for key, value in obj.items():
-                    current_path = f"{path}.{key}" if path else key
-
-                    # Store the value and its path (only for leaf values)
-                    if not isinstance(value, (dict, list)):
-                        if value not in value_map:
-                            value_map[value] = []
-
-                        # Strip the wrapper prefix if specified
-                        final_path = current_path
-                        if strip_prefix and current_path.startswith(strip_prefix):
-                            final_path = current_path[len(strip_prefix):]
-
-                        value_map[value].append(final_path)
+        self.fetcher = fetcher
+        self.log = log
+        self.v1_index = ValueIndex()  # canonical value -> list of v1 paths
+        self.v2_index = ValueIndex()  # canonical value -> list of v2 paths
 
-                    # Recurse for nested structures
-                    if isinstance(value, (dict, list)):
-                        extract(value, current_path)
+    def load_value_indexes(self, project_id: Optional[str], v1_payload: Union[bytes, Dict],
+                           v2_payload: Union[bytes, Dict]):
+        """
+        Set the v1/v2 value indexes from merge data payloads.
 
-            elif isinstance(obj, list):
-                for idx, item in enumerate(obj):
-                    # For arrays, we use [0] notation for the first item
-                    if isinstance(item, (dict, list)):
-                        extract(item, path)
+        Indexes come from the shared value_index_cache, so a payload that
+        another learning path has already indexed is not walked again.
 
-        extract(data, prefix)
-        return value_map
+        Args:
+            project_id: The ScopeStack project ID
+            v1_payload: v1 merge data (raw response bytes or loaded JSON)
+            v2_payload: v2 merge data (raw response bytes or loaded JSON)
+        """
+        self.v1_index = value_index_cache.get_or_build(project_id, 'v1', v1_payload)
+        self.v2_index = value_index_cache.get_or_build(project_id, 'v2', v2_payload)
 
     def find_matching_values(self) -> Dict[str, Dict]:
         """
         Find values that appear in both v1 and v2 data
         Returns: {value: {'v1_paths': [...], 'v2_paths': [...]}}
+
+        Values are compared in canonical form (see value_index), and each
+        match is reported under the value as it first appears in v1.
         """
         matches = {}
+        v1_paths = self.v1_index.paths
+        v2_paths = self.v2_index.paths
 
-        # Find values that exist in both v1 and v2
-        common_values = set(self.v1_value_map.keys()) & set(self.v2_value_map.keys())
+        # Find values that exist in both v1 and v2 (None, empty strings and
+        # booleans are never indexed)
+        common_values = v1_paths.keys() & v2_paths.keys()
 
-        # Filter out None, empty strings, and very common values
+        # Filter out very short strings
         filtered_values = [
             v for v in common_values
-            if v is not None
-            and v != ''
-            and not isinstance(v, bool)  # Booleans are too common
-            and (isinstance(v, str) and len(v) > 2 or isinstance(v, (int, float)))  # Meaningful values
+            if not isinstance(v, str) or len(v) > 2  # Meaningful values
         ]
 
-        for value in filtered_values:
-            matches[value] = {
-                'v1_paths': self.v1_value_map[value],
-                'v2_paths': self.v2_value_map[value],
-                'v1_count': len(self.v1_value_map[value]),
-                'v2_count': len(self.v2_value_map[value])
+        for key in filtered_values:
+            matches[self.v1_index.values[key]] = {
+                'v1_paths': v1_paths[key],
+                'v2_paths': v2_paths[key],
+                'v1_count': len(v1_paths[key]),
+                'v2_count': len(v2_paths[key])
             }
 
         return matches
@@ -114,55 +103,58 @@ class MappingLearner:
 
         Returns dict with discovered mappings including loop structures
         """
-        print(f"\n📚 Learning field mappings for project {project_id}...")
-        print("=" * 80)
-
-        # Fetch both versions of merge data
-        print("\n1️⃣  Fetching v1 merge data...")
-        v1_data = self.fetcher.fetch_v1_merge_data(project_id)
+        self.log(f"\n📚 Learning field mappings for project {project_id}...")
+        self.log("=" * 80)
+
+        # Fetch both versions of merge data. Payloads are kept as raw bytes:
+        # their hash keys the shared value index cache, and on a miss they
+        # are parsed as a stream. v2 is only loaded whole when loop detection
+        # needs to walk it.
+        self.log("\n1️⃣  Fetching v1 merge data...")
+        v1_data = self.fetcher.fetch_v1_merge_data(project_id, raw=True)
         if not v1_data:
-            print("❌ Failed to fetch v1 merge data")
-            print("   This project may not have valid v1 merge data or there's a server-side error.")
-            print("   Try a different project ID or check the project configuration in ScopeStack.")
+            self.log("❌ Failed to fetch v1 merge data")
+            self.log("   This project may not have valid v1 merge data or there's a server-side error.")
+            self.log("   Try a different project ID or check the project configuration in ScopeStack.")
             return {}
 
-        print("\n2️⃣  Fetching v2 merge data...")
-        v2_data = self.fetcher.fetch_v2_merge_data(project_id)
+        self.log("\n2️⃣  Fetching v2 merge data...")
+        v2_data = self.fetcher.fetch_v2_merge_data(project_id, raw=not template_path)
         if not v2_data:
-            print("❌ Failed to fetch v2 merge data")
-            print("   This project may not have valid v2 merge data or there's a server-side error.")
-            print("   Try a different project ID or check the project configuration in ScopeStack.")
+            self.log("❌ Failed to fetch v2 merge data")
+            self.log("   This project may not have valid v2 merge data or there's a server-side error.")
+            self.log("   Try a different project ID or check the project configuration in ScopeStack.")
             return {}
 
         # Extract values and paths from both datasets
         # The merge data has a wrapper structure: data.attributes.content
         # We need to strip this prefix to get the actual field paths
-        print("\n3️⃣  Extracting values from v1 data...")
-        self.v1_value_map = self.extract_values_with_paths(v1_data, strip_prefix="data.attributes.content.")
-        print(f"   Found {len(self.v1_value_map)} unique values")
+        self.log("\n3️⃣  Extracting values from v1 data...")
+        self.v1_index = value_index_cache.get_or_build(project_id, 'v1', v1_data)
+        self.log(f"   Found {len(self.v1_index)} unique values")
 
-        print("\n4️⃣  Extracting values from v2 data...")
-        self.v2_value_map = self.extract_values_with_paths(v2_data, strip_prefix="data.attributes.content.")
-        print(f"   Found {len(self.v2_value_map)} unique values")
+        self.log("\n4️⃣  Extracting values from v2 data...")
+        self.v2_index = value_index_cache.get_or_build(project_id, 'v2', v2_data)
+        self.log(f"   Found {len(self.v2_index)} unique values")
 
         # Find matching values
-        print("\n5️⃣  Finding matching values...")
+        self.log("\n5️⃣  Finding matching values...")
         matches = self.find_matching_values()
-        print(f"   Found {len(matches)} matching values")
+        self.log(f"   Found {len(matches)} matching values")
 
         # Suggest mappings
-        print("\n6️⃣  Generating suggested mappings...")
+        self.log("\n6️⃣  Generating suggested mappings...")
         suggested_mappings = self.suggest_mappings(matches)
 
         # NEW: Detect and learn loop structures if template provided
         loop_mappings = {}
         if template_path:
-            print("\n7️⃣  Detecting loop structures in template...")
+            self.log("\n7️⃣  Detecting loop structures in template...")
             loops = self.detect_loop_structures(template_path)
-            print(f"   Found {len(loops)} Sablon loop markers")
+            self.log(f"   Found {len(loops)} Sablon loop markers")
 
             if loops:
-                print("\n8️⃣  Learning loop-to-array mappings...")
+                self.log("\n8️⃣  Learning loop-to-array mappings...")
                 loop_mappings = self.learn_loop_mappings(loops, v2_data)
 
                 # Add loop mappings to suggested_mappings
@@ -251,7 +243,7 @@ class MappingLearner:
             with zipfile.ZipFile(template_path, 'r') as zip_ref:
                 xml_content = zip_ref.read('word/document.xml').decode('utf-8')
         except Exception as e:
-            print(f"⚠️  Could not read template for loop detection: {e}")
+            self.log(f"⚠️  Could not read template for loop detection: {e}")
             return loops
 
         # Find all :each markers
@@ -296,7 +288,8 @@ class MappingLearner:
 
         return fields
 
-    def _find_matching_array(self, nested_fields: List[str], v2_merge_data: Dict) -> Dict:
+    def _find_matching_array(self, nested_fields: List[str], v2_merge_data: Dict,
+                             catalog: Optional[List[ArrayEntry]] = None) -> Dict:
         """
         Find v2 array that best matches the nested fields from a Sablon loop.
 
@@ -304,47 +297,25 @@ class MappingLearner:
         nested_fields: ['location.name', 'location.address']
            → Look for v2 arrays containing fields like 'location_name', 'location_address'
 
+        Candidates come from the payload's array catalog (see array_catalog),
+        and each array is scored against the keys of all of its items.
+
         Returns: {'v2_path': 'project.project_locations', 'confidence': 0.85}
         """
+        if catalog is None:
+            catalog = build_array_catalog(unwrap(v2_merge_data))
+
         best_match = None
         best_score = 0
 
         # Extract field names without the loop variable prefix
         field_names = [f.split('.', 1)[1] if '.' in f else f for f in nested_fields]
 
-        # Search for arrays in v2 data
-        def find_arrays(obj, path=""):
-            nonlocal best_match, best_score
-
-            if isinstance(obj, dict):
-                for key, value in obj.items():
-                    current_path = f"{path}.{key}" if path else key
-
-                    # Check if this is an array
-                    if isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
-                        # This is an array of objects - check if it matches our fields
-                        score = self._calculate_array_match_score(field_names, value[0])
-
-                        if score > best_score:
-                            best_score = score
-                            best_match = current_path
-
-                    # Recurse
-                    if isinstance(value, (dict, list)):
-                        find_arrays(value, current_path)
-
-            elif isinstance(obj, list):
-                for item in obj:
-                    if isinstance(item, (dict, list)):
-                        find_arrays(item, path)
-
-        # Strip the wrapper prefix if it exists
-        data_content = v2_merge_data
-        if 'data' in v2_merge_data and 'attributes' in v2_merge_data['data']:
-            if 'content' in v2_merge_data['data']['attributes']:
-                data_content = v2_merge_data['data']['attributes']['content']
-
-        find_arrays(data_content)
+        for entry in catalog:
+            score = self._calculate_array_match_score(field_names, entry.keys, entry.lower_keys)
+            if score > best_score:
+                best_score = score
+                best_match = entry.path
 
         if best_match and best_match.startswith('data.attributes.content.'):
             best_match = best_match[len('data.attributes.content.'):]
@@ -354,16 +325,24 @@ class MappingLearner:
         else:
             return None
 
-    def _calculate_array_match_score(self, field_names: List[str], array_item: Dict) -> float:
+    def _calculate_array_match_score(self, field_names: List[str], array_item: Iterable[str],
+                                     lower_keys: Iterable[str] = None) -> float:
         """
         Calculate how well an array item matches the expected field names.
 
+        Args:
+            field_names: Field names used inside the loop
+            array_item: An array item, or the set of keys of the array's items
+            lower_keys: Lowercased keys, if already computed
+
         Returns a score from 0 to 1 based on field name similarity.
         """
         if not field_names or not array_item:
             return 0.0
 
-        array_keys = set(array_item.keys())
+        array_keys = array_item if isinstance(array_item, (set, frozenset)) else set(array_item)
+        if lower_keys is None:
+            lower_keys = [key.lower() for key in array_keys]
         matched = 0
 
         for field_name in field_names:
@@ -379,8 +358,9 @@ class MappingLearner:
                 continue
 
             # Fuzzy matching - check if field name is contained in any key
-            for key in array_keys:
-                if field_name.lower() in key.lower() or key.lower() in field_name.lower():
+            lower_name = field_name.lower()
+            for key in lower_keys:
+                if lower_name in key or key in lower_name:
                     matched += 0.5
                     break
 
@@ -399,23 +379,152 @@ class MappingLearner:
         """
         loop_mappings = {}
 
+        # Every loop is matched against the same candidate arrays
+        catalog = build_array_catalog(unwrap(v2_merge_data))
+
         for loop_info in loops:
             sablon_var = loop_info['sablon_var']
             nested_fields = loop_info['nested_fields']
 
             # Find v2 arrays that contain similar field names
-            best_match = self._find_matching_array(nested_fields, v2_merge_data)
+            best_match = self._find_matching_array(nested_fields, v2_merge_data, catalog)
 
             if best_match:
                 loop_mappings[sablon_var] = best_match['v2_path']
                 loop_mappings[f'{sablon_var}_confidence'] = best_match['confidence']
-                print(f"   ✓ {sablon_var} → {best_match['v2_path']} (confidence: {best_match['confidence']:.2f})")
+                self.log(f"   ✓ {sablon_var} → {best_match['v2_path']} (confidence: {best_match['confidence']:.2f})")
             else:
-                print(f"   ⚠️  No v2 array found for loop variable '{sablon_var}'")
+                self.log(f"   ⚠️  No v2 array found for loop variable '{sablon_var}'")
 
         return loop_mappings
 
 
+def learn_projects(fetcher_factory: Callable[[], MergeDataFetcher], project_ids: List[str],
+                   workers: int = 4, progress=None, log: Callable[..., None] = print) -> Dict:
+    """
+    Learn mappings from many projects concurrently.
+
+    Each project is fetched and learned by its own MappingLearner (with its
+    own fetcher, since a requests session shouldn't be shared across
+    threads) in a bounded thread pool. Fetching is network-bound, so
+    threads overlap the waits on ScopeStack; value extraction holds the GIL.
+
+    Args:
+        fetcher_factory: Returns a new authenticated MergeDataFetcher
+        project_ids: Projects to learn from
+        workers: Maximum number of projects in flight at once
+        progress: Optional callback(project_id, result) run as each project finishes
+        log: Passed to each MappingLearner (see MappingLearner.__init__)
+
+    Returns:
+        {
+            'projects': {project_id: {'seconds', 'mappings', 'error'}},
+            'votes': [...],  # See aggregate_votes()
+            'elapsed': float  # Wall-clock seconds for the whole batch
+        }
+    """
+    def learn_one(project_id):
+        start = time.perf_counter()
+        try:
+            results = MappingLearner(fetcher_factory(), log=log).learn_mappings(project_id)
+            error = None if results else 'no merge data'
+        except Exception as e:
+            results, error = {}, str(e)
+        return project_id, results, time.perf_counter() - start, error
+
+    learned = {}
+    projects = {}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(learn_one, project_id) for project_id in project_ids]
+        for future in as_completed(futures):
+            project_id, results, seconds, error = future.result()
+            suggestions = results.get('suggested_mappings', []) if results else []
+            if suggestions:
+                learned[project_id] = suggestions
+            projects[project_id] = {'seconds': seconds, 'mappings': len(suggestions), 'error': error}
+            if progress:
+                progress(project_id, projects[project_id])
+
+    return {
+        'projects': projects,
+        'votes': aggregate_votes(learned),
+        'elapsed': time.perf_counter() - start
+    }
+
+
+def aggregate_votes(suggestions_by_project: Dict[str, List[Dict]]) -> List[Dict]:
+    """
+    Count, per (v1_field, v2_field), how many projects suggested it.
+
+    A project votes at most once per pair, however many values backed it.
+
+    Args:
+        suggestions_by_project: {project_id: suggest_mappings() output}
+
+    Returns:
+        [{'v1_field', 'v2_field', 'votes', 'projects', 'sample_values', 'confidence'}, ...]
+        sorted by votes (descending), then v1_field - the order
+        MappingDatabase.add_votes() expects, so the most-voted v2 field
+        becomes the primary mapping
+    """
+    confidence_order = {'high': 0, 'medium': 1, 'low': 2}
+    votes = {}
+
+    for project_id, suggestions in suggestions_by_project.items():
+        for suggestion in suggestions:
+            key = (suggestion['v1_field'], suggestion['v2_field'])
+            vote = votes.get(key)
+            if vote is None:
+                vote = votes[key] = {
+                    'v1_field': key[0],
+                    'v2_field': key[1],
+                    'votes': 0,
+                    'projects': [],
+                    'sample_values': [],
+                    'confidence': suggestion.get('confidence', 'low')
+                }
+            if project_id not in vote['projects']:
+                vote['projects'].append(project_id)
+                vote['votes'] += 1
+            value = suggestion.get('value')
+            if value is not None and len(vote['sample_values']) < 5 and value not in vote['sample_values']:
+                vote['sample_values'].append(value)
+            # Keep the best confidence any project gave this pair
+            if confidence_order.get(suggestion.get('confidence'), 3) < confidence_order.get(vote['confidence'], 3):
+                vote['confidence'] = suggestion['confidence']
+
+    return sorted(votes.values(), key=lambda v: (-v['votes'], v['v1_field'], v['v2_field']))
+
+
+def print_batch_results(batch: Dict):
+    """Pretty print multi-project learning results and throughput"""
+    projects = batch['projects']
+    succeeded = [p for p in projects.values() if not p['error']]
+    busy = sum(p['seconds'] for p in projects.values())
+    elapsed = batch['elapsed']
+
+    print("\n" + "=" * 80)
+    print("📊 MULTI-PROJECT MAPPING DISCOVERY")
+    print("=" * 80)
+    print(f"\nProjects: {len(succeeded)}/{len(projects)} learned")
+    print(f"Wall time: {elapsed:.1f}s ({len(projects) / elapsed * 60 if elapsed else 0:.1f} projects/min)")
+    if projects:
+        print(f"Per project: {busy / len(projects):.1f}s average, "
+              f"{max(p['seconds'] for p in projects.values()):.1f}s slowest")
+        print(f"Concurrency achieved: {busy / elapsed if elapsed else 0:.1f}x")
+
+    votes = batch['votes']
+    print(f"\nDistinct (v1, v2) pairs: {len(votes)}")
+    print(f"Pairs seen in 2+ projects: {sum(1 for v in votes if v['votes'] >= 2)}")
+
+    if votes:
+        print("\nTop votes:")
+        for vote in votes[:20]:
+            print(f"  {vote['votes']:3d}  {vote['v1_field']} → {vote['v2_field']}")
+
+
 def print_results(results: Dict):
     """Pretty print the learning results"""
     print("\n" + "=" * 80)
@@ -478,8 +587,13 @@ def main():
     import argparse
 
     parser = argparse.ArgumentParser(description='Learn field mappings from v1 to v2 merge data')
-    parser.add_argument('--project', required=True, help='Project ID')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--project', help='Project ID')
+    source.add_argument('--projects', nargs='+', metavar='ID', help='Learn from several projects concurrently')
+    source.add_argument('--from-recent', type=int, metavar='N', help='Learn from the N most recent projects')
+    parser.add_argument('--workers', type=int, default=4, help='Projects fetched and learned at once (default: 4)')
     parser.add_argument('--export', help='Export results to JSON file')
+    parser.add_argument('--account', help='Save to this account\'s mapping shard instead of the global database')
 
     args = parser.parse_args()
 
@@ -499,6 +613,10 @@ def main():
     fetcher = MergeDataFetcher()
     fetcher.authenticate(token=token)
 
+    if args.projects or args.from_recent:
+        learn_many(args, fetcher, token)
+        return
+
     # Learn mappings
     learner = MappingLearner(fetcher)
     results = learner.learn_mappings(args.project)
@@ -525,5 +643,49 @@ def main():
     print("  3. Run this tool on additional projects to validate")
 
 
+def learn_many(args, fetcher: MergeDataFetcher, token: str):
+    """--projects / --from-recent: learn concurrently, then write the votes in one batch"""
+    from mapping_database import MappingShards
+
+    if args.from_recent:
+        project_ids = fetcher.get_recent_project_ids(args.from_recent)
+        if not project_ids:
+            print("❌ Could not list recent projects")
+            sys.exit(1)
+    else:
+        project_ids = list(dict.fromkeys(args.projects))
+
+    print(f"📚 Learning from {len(project_ids)} projects with {args.workers} workers...")
+
+    # Per-project step logs would interleave across threads; show one line per project instead
+    def quiet(*args, **kwargs):
+        pass
+
+    def new_fetcher():
+        worker_fetcher = MergeDataFetcher(log=quiet)
+        worker_fetcher.authenticate(token=token)
+        return worker_fetcher
+
+    def progress(project_id, result):
+        status = f"❌ {result['error']}" if result['error'] else f"✓ {result['mappings']} mappings"
+        print(f"   {project_id}: {status} ({result['seconds']:.1f}s)", flush=True)
+
+    batch = learn_projects(new_fetcher, project_ids, workers=args.workers, progress=progress, log=quiet)
+
+    print_batch_results(batch)
+
+    learned = sum(1 for p in batch['projects'].values() if not p['error'])
+    if batch['votes']:
+        start = time.perf_counter()
+        db = MappingShards().for_account(args.account)
+        db.add_votes(batch['votes'], projects_analyzed=learned)
+        print(f"\n💾 Saved {len(batch['votes'])} voted mappings in one write ({time.perf_counter() - start:.2f}s)")
+
+    if args.export:
+        export_mappings(batch, args.export)
+
+    print("\n✅ Mapping discovery complete!")
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Compiled Mapping Artifact
+=========================
+
+The mappings TemplateConverter needs, compiled from a MappingDatabase into
+one pickle file.
+
+A conversion otherwise starts from the hardcoded tables plus whatever
+learned mappings it is handed, which means loading (and for JSON, parsing)
+the whole mapping database first. The artifact holds the result instead:
+
+- field_mappings: FIELD_MAPPINGS with high-confidence learned mappings on
+  top, in the '=field' -> '{v2.path}' form the converter looks up
+- loop_mappings: Sablon loop variable -> v2 array path, from the
+  high-confidence array mappings
+- the LOOP_CONVERSIONS and CONDITIONAL_CONVERSIONS tables
+
+It is stamped with the database's saved state (see database_stamp()) and a
+fingerprint of the hardcoded tables, and load_compiled_mappings() only
+recompiles it when either has changed.
+"""
+
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from mapping_database import DEFAULT_DB_PATH, MappingDatabase, database_stamp
+from template_converter import CONDITIONAL_CONVERSIONS, FIELD_MAPPINGS, LOOP_CONVERSIONS
+
+ARTIFACT_FORMAT = 1  # Bump when CompiledMappings changes shape
+DEFAULT_ARTIFACT_PATH = "compiled_mappings.pickle"
+
+
+@dataclass(frozen=True)
+class CompiledMappings:
+    """Everything TemplateConverter looks mappings up in"""
+    stamp: tuple                         # (format, tables fingerprint, database stamp)
+    field_mappings: Dict[str, str]       # '=v1_field' -> '{v2.field}'
+    loop_mappings: Dict[str, str]        # Sablon loop variable -> v2 array path
+    loop_conversions: Dict[str, tuple]
+    conditional_conversions: Dict[str, tuple]
+    learned_count: int                   # Learned field mappings in field_mappings
+
+
+def tables_fingerprint() -> str:
+    """Hash of the hardcoded converter tables, so code changes invalidate artifacts"""
+    tables = repr((FIELD_MAPPINGS, LOOP_CONVERSIONS, CONDITIONAL_CONVERSIONS)).encode('utf-8')
+    return hashlib.blake2b(tables, digest_size=16).hexdigest()
+
+
+def artifact_stamp(db_path: str) -> tuple:
+    return (ARTIFACT_FORMAT, tables_fingerprint(), database_stamp(db_path))
+
+
+def compile_mappings(db: MappingDatabase, min_score: int = 2) -> CompiledMappings:
+    """
+    Compile a database's mappings for TemplateConverter.
+
+    Args:
+        db: Mapping database (loaded)
+        min_score: Minimum confidence score for a learned mapping to be used
+
+    Returns:
+        CompiledMappings; learned field mappings take priority over hardcoded ones
+    """
+    field_mappings = dict(FIELD_MAPPINGS)
+    learned = db.get_high_confidence_mappings(min_score=min_score)
+    for v1_field, mapping in learned.items():
+        key = v1_field if v1_field.startswith('=') else f'={v1_field}'
+        field_mappings[key] = f"{{{mapping['v2_field']}}}"
+
+    loop_mappings = {}
+    for v1_array, mapping in db.get_all_array_mappings().items():
+        if mapping.get("confidence_score", 0) >= min_score and mapping.get("v2_array"):
+            loop_mappings[v1_array[:-2] if v1_array.endswith('[]') else v1_array] = \
+                mapping["v2_array"][:-2] if mapping["v2_array"].endswith('[]') else mapping["v2_array"]
+
+    return CompiledMappings(
+        stamp=artifact_stamp(db.db_path),
+        field_mappings=field_mappings,
+        loop_mappings=loop_mappings,
+        loop_conversions=dict(LOOP_CONVERSIONS),
+        conditional_conversions=dict(CONDITIONAL_CONVERSIONS),
+        learned_count=len(learned),
+    )
+
+
+def write_artifact(compiled: CompiledMappings, artifact_path: str = DEFAULT_ARTIFACT_PATH):
+    """Write an artifact (aside and renamed into place, so readers never see half a file)"""
+    tmp_path = f"{artifact_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, artifact_path)
+
+
+def read_artifact(artifact_path: str = DEFAULT_ARTIFACT_PATH) -> Optional[CompiledMappings]:
+    """Read an artifact, or None if it is missing or unreadable"""
+    try:
+        with open(artifact_path, 'rb') as f:
+            compiled = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, AttributeError, EOFError, ImportError) as e:
+        print(f"⚠️ Ignoring unreadable mapping artifact {artifact_path}: {e}")
+        return None
+    return compiled if isinstance(compiled, CompiledMappings) else None
+
+
+def load_compiled_mappings(db_path: str = DEFAULT_DB_PATH,
+                           artifact_path: str = DEFAULT_ARTIFACT_PATH) -> CompiledMappings:
+    """
+    The compiled mappings for a database, read from the artifact when it is
+    current, otherwise compiled from the database and written back.
+
+    Checking the artifact costs a stat() (JSON databases) or a one-row query
+    (SQLite); the database itself is only loaded when it has changed.
+    """
+    stamp = artifact_stamp(db_path)
+    compiled = read_artifact(artifact_path)
+    # A missing database stamp can't tell versions apart, so always recompile
+    if compiled is not None and stamp[2] is not None and compiled.stamp == stamp:
+        return compiled
+
+    compiled = compile_mappings(MappingDatabase(db_path))
+    try:
+        write_artifact(compiled, artifact_path)
+    except OSError as e:
+        print(f"⚠️ Could not write mapping artifact {artifact_path}: {e}")
+    return compiled
+
+
+def load_existing_compiled_mappings(db_path: str = DEFAULT_DB_PATH,
+                                    artifact_path: str = DEFAULT_ARTIFACT_PATH) -> Optional[CompiledMappings]:
+    """
+    load_compiled_mappings() once an artifact has been compiled (by running
+    this module), else None. Lets the CLIs opt in without loading the
+    database on every run.
+    """
+    if not os.path.exists(artifact_path):
+        return None
+    return load_compiled_mappings(db_path, artifact_path)
+
+
+if __name__ == "__main__":
+    compiled = load_compiled_mappings()
+    print(f"✓ {DEFAULT_ARTIFACT_PATH}: {len(compiled.field_mappings)} field mappings "
+          f"({compiled.learned_count} learned), {len(compiled.loop_mappings)} loop mappings")
@@ -5,47 +5,497 @@ Persistent Mapping Database
 
 Stores and manages learned field mappings across multiple projects.
 Each time a mapping is discovered, it's saved and its confidence score increases.
+
+Two storage backends sit behind the same MappingDatabase API, chosen by the
+database file's extension:
+
+- SQLite (.db, .sqlite, .sqlite3; the default): one row per mapping in WAL
+  mode, with indexes on v1_field, v2_field, source and confidence. Saves
+  upsert or delete only the rows that changed. A new SQLite database
+  imports the legacy learned_mappings_db.json next to it once.
+- JSON (.json): the original format, the whole file rewritten on each save.
+
+Several processes (gunicorn workers) can share one database file. Every
+write runs under an advisory lock file and starts by reloading whatever
+another process saved, and get_mapping_database() hands out one instance
+per file that reloads only when the file's mtime or size has changed.
+
+MappingShards keeps one database per ScopeStack account (mapping_shards/
+<account slug>.db), opened on first use and held in an LRU bounded by the
+shards' combined size on disk. Each shard can fall back to the global
+database for mappings the account hasn't learned itself; writes only go to
+the shard, and deleting an inherited mapping hides it in that shard only.
 """
 
 import json
 import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 from pathlib import Path
 
+from mapping_index import MappingIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, same-process threads are still serialized
+    fcntl = None
+
+DEFAULT_DB_PATH = "learned_mappings.db"
+LEGACY_JSON_NAME = "learned_mappings_db.json"
+SQLITE_EXTENSIONS = {'.db', '.sqlite', '.sqlite3'}
+
+SECTIONS = ("mappings", "array_mappings")
+# Metadata lists of fallback keys a shard has deleted (see MappingDatabase.delete_mapping)
+HIDDEN_KEYS = {"mappings": "hidden_mappings", "array_mappings": "hidden_array_mappings"}
+
+SHARD_DIR = "mapping_shards"
+SHARD_DISK_MB = 256  # Default on-disk size cap for open shards (MAPPING_SHARD_DISK_MB overrides)
+
+BULK_MODES = ("merge", "skip", "replace")
+MAX_REPORTED_ERRORS = 20  # Invalid rows described in a bulk_upsert() result
+
+
+def _file_signature(path: str):
+    """(mtime, size) of a file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def database_stamp(db_path: str):
+    """
+    Identifies a database's saved state without loading it: the last save
+    time for SQLite (one metadata row), the file's mtime and size for JSON.
+    None if there is nothing saved.
+    """
+    if Path(db_path).suffix.lower() not in SQLITE_EXTENSIONS:
+        return _file_signature(db_path)
+    if not os.path.exists(db_path):
+        return None
+    conn = sqlite3.connect(f"{Path(db_path).absolute().as_uri()}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT value FROM metadata WHERE key = 'last_updated'").fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def empty_database() -> Dict:
+    """The contents of a new database"""
+    return {
+        "mappings": {},
+        "array_mappings": {},  # New: stores array-level mappings
+        "metadata": {
+            "version": "1.1",
+            "last_updated": None,
+            "total_projects_analyzed": 0
+        }
+    }
+
+
+class JsonMappingStore:
+    """Whole-file JSON storage (the original learned_mappings_db.json format)"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[Dict]:
+        """Load the database, or None if the file doesn't exist"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        # Ensure array_mappings section exists (for backwards compatibility)
+        if "array_mappings" not in data:
+            data["array_mappings"] = {}
+        return data
+
+    def signature(self):
+        """Changes whenever the file is written"""
+        return _file_signature(self.path)
+
+    def size(self) -> int:
+        """Bytes on disk"""
+        signature = _file_signature(self.path)
+        return signature[1] if signature else 0
+
+    def save(self, data: Dict, changed: Optional[Dict[str, Set[str]]] = None):
+        """Rewrite the whole file (changed is ignored)"""
+        # Written aside and renamed into place, so other processes never read half a file
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        pass
+
+
+class SqliteMappingStore:
+    """
+    SQLite storage: one row per mapping, written incrementally.
+
+    Each row keeps the full mapping dict as JSON in its data column. The
+    other columns (v2_field, source, confidence_score, ...) duplicate the
+    dict's values so the file can be inspected with plain SQL. Only the
+    v1 keys are indexed: the upserts need them for ON CONFLICT, and every
+    other read loads the whole table, so more indexes would only slow writes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS mappings (
+            v1_field TEXT NOT NULL,
+            v2_field TEXT,
+            source TEXT,
+            confidence_score NUMERIC,
+            times_seen INTEGER,
+            last_seen TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_mappings_v1_field ON mappings(v1_field);
+
+        CREATE TABLE IF NOT EXISTS array_mappings (
+            v1_array TEXT NOT NULL,
+            v2_array TEXT,
+            source TEXT,
+            confidence_score NUMERIC,
+            data TEXT NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_array_mappings_v1_array ON array_mappings(v1_array);
+
+        CREATE TABLE IF NOT EXISTS metadata (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+
+        -- Unused by any query; dropped from databases created before they were removed
+        DROP INDEX IF EXISTS idx_mappings_v2_field;
+        DROP INDEX IF EXISTS idx_mappings_source;
+        DROP INDEX IF EXISTS idx_mappings_confidence;
+        DROP INDEX IF EXISTS idx_array_mappings_v2_array;
+    """
+
+    UPSERT_MAPPING = """
+        INSERT INTO mappings (v1_field, v2_field, source, confidence_score, times_seen, last_seen, data)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(v1_field) DO UPDATE SET
+            v2_field = excluded.v2_field, source = excluded.source,
+            confidence_score = excluded.confidence_score, times_seen = excluded.times_seen,
+            last_seen = excluded.last_seen, data = excluded.data
+    """
+
+    UPSERT_ARRAY_MAPPING = """
+        INSERT INTO array_mappings (v1_array, v2_array, source, confidence_score, data)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(v1_array) DO UPDATE SET
+            v2_array = excluded.v2_array, source = excluded.source,
+            confidence_score = excluded.confidence_score, data = excluded.data
+    """
+
+    def __init__(self, path: str, legacy_json_path: Optional[str] = None):
+        """
+        Args:
+            path: SQLite database file
+            legacy_json_path: JSON database to import when the SQLite one is new
+        """
+        self.path = path
+        self.legacy_json_path = legacy_json_path
+        # Shared by the Flask request threads; every use holds the lock
+        self.conn = None
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connect()
+
+    def _connect(self):
+        """Open the connection if it isn't (again, after close()) (caller holds the lock)"""
+        if self.conn is not None:
+            return
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def load(self) -> Optional[Dict]:
+        """Load the database, migrating the legacy JSON file on first use (None if both are empty)"""
+        with self._lock:
+            self._connect()
+            metadata = {key: json.loads(value) for key, value in
+                        self.conn.execute("SELECT key, value FROM metadata")}
+            if not metadata:
+                return self._migrate_legacy_json()
+
+            data = empty_database()
+            data["metadata"].update(metadata)
+            data["mappings"] = {v1_field: json.loads(row) for v1_field, row in
+                                self.conn.execute("SELECT v1_field, data FROM mappings ORDER BY rowid")}
+            data["array_mappings"] = {v1_array: json.loads(row) for v1_array, row in
+                                      self.conn.execute("SELECT v1_array, data FROM array_mappings ORDER BY rowid")}
+            return data
+
+    def _migrate_legacy_json(self) -> Optional[Dict]:
+        """One-shot import of the legacy JSON database (caller holds the lock)"""
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return None
+
+        data = JsonMappingStore(self.legacy_json_path).load()
+        data.setdefault("mappings", {})
+        data.setdefault("metadata", empty_database()["metadata"])
+        # Recorded in metadata, so the import never runs twice
+        data["metadata"]["migrated_from"] = os.path.abspath(self.legacy_json_path)
+        self._write(data, None)
+        print(f"✓ Migrated {len(data['mappings'])} mappings and {len(data['array_mappings'])} "
+              f"array mappings from {self.legacy_json_path} to {self.path}")
+        return data
+
+    def signature(self):
+        """Changes whenever a transaction is committed (commits land in the -wal file first)"""
+        return (_file_signature(self.path), _file_signature(self.path + '-wal'))
+
+    def size(self) -> int:
+        """Bytes on disk, including the -wal file"""
+        return sum(signature[1] for signature in self.signature() if signature)
+
+    def save(self, data: Dict, changed: Optional[Dict[str, Set[str]]] = None):
+        """
+        Write changes in one transaction.
+
+        Args:
+            data: The whole database
+            changed: Keys changed per section ("mappings", "array_mappings");
+                keys no longer in data are deleted. None rewrites every row.
+        """
+        with self._lock:
+            self._connect()
+            self._write(data, changed)
+
+    def _write(self, data: Dict, changed: Optional[Dict[str, Set[str]]]):
+        with self.conn:
+            if changed is None:
+                self.conn.execute("DELETE FROM mappings")
+                self.conn.execute("DELETE FROM array_mappings")
+                changed = {section: data[section].keys() for section in SECTIONS}
+
+            mappings = data["mappings"]
+            upserts = [key for key in changed.get("mappings", ()) if key in mappings]
+            self.conn.executemany(self.UPSERT_MAPPING, [
+                (key, m.get("v2_field"), m.get("source"), m.get("confidence_score"),
+                 m.get("times_seen"), m.get("last_seen"), json.dumps(m))
+                for key, m in ((key, mappings[key]) for key in upserts)
+            ])
+            self.conn.executemany("DELETE FROM mappings WHERE v1_field = ?", [
+                (key,) for key in changed.get("mappings", ()) if key not in mappings
+            ])
+
+            array_mappings = data["array_mappings"]
+            upserts = [key for key in changed.get("array_mappings", ()) if key in array_mappings]
+            self.conn.executemany(self.UPSERT_ARRAY_MAPPING, [
+                (key, m.get("v2_array"), m.get("source"), m.get("confidence_score"), json.dumps(m))
+                for key, m in ((key, array_mappings[key]) for key in upserts)
+            ])
+            self.conn.executemany("DELETE FROM array_mappings WHERE v1_array = ?", [
+                (key,) for key in changed.get("array_mappings", ()) if key not in array_mappings
+            ])
+
+            self.conn.executemany(
+                "INSERT INTO metadata (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                [(key, json.dumps(value)) for key, value in data["metadata"].items()]
+            )
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+def open_store(db_path: str):
+    """The storage backend for a database path, by file extension"""
+    if Path(db_path).suffix.lower() in SQLITE_EXTENSIONS:
+        legacy = os.path.join(os.path.dirname(db_path), LEGACY_JSON_NAME)
+        return SqliteMappingStore(db_path, legacy_json_path=legacy)
+    return JsonMappingStore(db_path)
+
 
 class MappingDatabase:
     """Persistent storage for learned field mappings"""
 
-    def __init__(self, db_path: str = "learned_mappings_db.json"):
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
         self.db_path = db_path
+        self.store = open_store(db_path)
+        self._lock = threading.RLock()
+        self._write_depth = 0
+        # Keys changed since the last save, per section (see _mark_changed)
+        self._changed: Dict[str, Set[str]] = {section: set() for section in SECTIONS}
+        self._rewrite = False
+        self._signature = self.store.signature()
         self.data = self._load_database()
+        self._index = MappingIndex()  # Kept in step with data["mappings"] through _mark_changed
+        self.version = 0  # Bumped on every change, for callers caching derived data
+        # Read-only database consulted for keys this one doesn't have (see MappingShards)
+        self.fallback: Optional['MappingDatabase'] = None
+        self._layers: Dict[str, tuple] = {}  # section -> (revision, merged dict)
+        self._index_fallback = None  # Fallback revision the index was built against
 
     def _load_database(self) -> Dict:
         """Load the database from disk"""
-        if os.path.exists(self.db_path):
-            with open(self.db_path, 'r') as f:
-                data = json.load(f)
-                # Ensure array_mappings section exists (for backwards compatibility)
-                if "array_mappings" not in data:
-                    data["array_mappings"] = {}
-                return data
-        else:
-            return {
-                "mappings": {},
-                "array_mappings": {},  # New: stores array-level mappings
-                "metadata": {
-                    "version": "1.1",
-                    "last_updated": None,
-                    "total_projects_analyzed": 0
-                }
-            }
+        data = self.store.load()
+        return data if data is not None else empty_database()
+
+    def refresh(self) -> bool:
+        """
+        Reload the database if another process saved it since this instance
+        last loaded or saved. Costs a stat() or two when nothing changed.
+
+        Returns:
+            True if the database was reloaded
+        """
+        with self._lock:
+            if self._rewrite or any(self._changed.values()):
+                return False  # Unsaved changes of our own; the next write lock merges
+            signature = self.store.signature()
+            if signature == self._signature:
+                return False
+            self.data = self._load_database()
+            self._signature = signature
+            self._index.invalidate()
+            self.version += 1
+            return True
+
+    @contextmanager
+    def write_lock(self):
+        """
+        Hold the database for a read-modify-write.
+
+        Other threads wait on an in-process lock and other processes on an
+        advisory lock on <db_path>.lock. The data is refreshed from disk on
+        entry, so changes are applied to what other processes saved. Nested
+        uses only take the locks once.
+        """
+        with self._lock:
+            lock_file = None
+            if self._write_depth == 0:
+                lock_file = open(self.db_path + '.lock', 'a')
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._write_depth += 1
+            try:
+                if lock_file is not None:
+                    self.refresh()
+                yield self
+            finally:
+                self._write_depth -= 1
+                if lock_file is not None:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    def _mark_changed(self, section: str, key: str):
+        """Record a changed (or deleted) key so the next save writes only what changed"""
+        self._changed[section].add(key)
+        if section == "mappings":
+            self._index.invalidate([key])
+        self.version += 1
+
+    def _discard_changes(self):
+        """Drop unsaved changes by reloading the saved database (callers hold write_lock())"""
+        self._changed = {section: set() for section in SECTIONS}
+        self._rewrite = False
+        self.data = self._load_database()
+        self._signature = self.store.signature()
+        self._index.invalidate()
+        self.version += 1
 
     def _save_database(self):
-        """Save the database to disk"""
+        """Save the database to disk (callers hold write_lock())"""
         self.data["metadata"]["last_updated"] = datetime.now().isoformat()
-        with open(self.db_path, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        self.store.save(self.data, None if self._rewrite else self._changed)
+        self._changed = {section: set() for section in SECTIONS}
+        self._rewrite = False
+        self._signature = self.store.signature()
+
+    def set_mapping(self, v1_field: str, mapping: Dict):
+        """Store a mapping dict as-is, replacing any existing one (not saved until _save_database)"""
+        self.data["mappings"][v1_field] = mapping
+        self._mark_changed("mappings", v1_field)
+
+    def set_array_mapping(self, v1_array: str, mapping: Dict):
+        """Store an array mapping dict as-is, replacing any existing one (not saved until _save_database)"""
+        self.data["array_mappings"][v1_array] = mapping
+        self._mark_changed("array_mappings", v1_array)
+
+    def clear(self):
+        """Remove every mapping and array mapping (not saved until _save_database)"""
+        self.data["mappings"] = {}
+        self.data["array_mappings"] = {}
+        self._rewrite = True
+        self._index.invalidate()
+        self.version += 1
+
+    def revision(self) -> tuple:
+        """Changes whenever this database or its fallback changes, for callers caching derived data"""
+        fallback = self.fallback.revision() if self.fallback is not None else None
+        return (self.db_path, self.version, fallback)
+
+    def _hidden(self, section: str) -> List[str]:
+        """Fallback keys deleted in this database"""
+        return self.data["metadata"].get(HIDDEN_KEYS[section], [])
+
+    def _layered(self, section: str) -> Dict:
+        """A section with the fallback's entries underneath this database's own"""
+        if self.fallback is None:
+            return self.data[section]
+        with self._lock:
+            revision = self.revision()
+            cached = self._layers.get(section)
+            if cached is None or cached[0] != revision:
+                merged = dict(self.fallback.data.get(section, {}))
+                for key in self._hidden(section):
+                    merged.pop(key, None)
+                merged.update(self.data[section])
+                cached = self._layers[section] = (revision, merged)
+            return cached[1]
+
+    def mapping_index(self) -> MappingIndex:
+        """The sorted indexes over the field mappings, brought up to date"""
+        with self._lock:
+            fallback = self.fallback.revision() if self.fallback is not None else None
+            if fallback != self._index_fallback:
+                # Own changes are tracked key by key; the fallback's are not
+                self._index.invalidate()
+                self._index_fallback = fallback
+            self._index.sync(self._layered("mappings"))
+            return self._index
+
+    def query_mappings(self, search: str = None, match: str = "substring", field: str = "both",
+                       source: str = None, min_score: float = None, sort: str = "v1_field",
+                       descending: bool = False, offset: int = 0, limit: int = None) -> Dict:
+        """
+        Search, filter and page the field mappings through the sorted indexes
+
+        Args:
+            search, match, field, source, min_score, sort, descending,
+            offset, limit: See MappingIndex.query()
+
+        Returns:
+            {'total': matching mappings, 'mappings': [(v1_field, mapping), ...] for the page}
+        """
+        with self._lock:
+            index = self.mapping_index()
+            total, keys = index.query(search=search, match=match, field=field, source=source,
+                                      min_score=min_score, sort=sort, descending=descending,
+                                      offset=offset, limit=limit)
+            mappings = self._layered("mappings")
+            return {"total": total, "mappings": [(key, mappings[key]) for key in keys]}
 
     def add_mapping(self, v1_field: str, v2_field: str, value: str = None,
                    project_id: str = None, confidence: str = "high"):
@@ -59,8 +509,157 @@ class MappingDatabase:
             project_id: Project ID where this mapping was discovered
             confidence: Initial confidence level ("high", "medium", "low", "manual")
         """
+        with self.write_lock():
+            self._apply_mapping(
+                v1_field, v2_field,
+                values=[value] if value else [],
+                project_ids=[project_id] if project_id else [],
+                confidence=confidence
+            )
+            self._save_database()
+
+    def add_votes(self, votes: List[Dict], projects_analyzed: int = 0):
+        """
+        Apply aggregated multi-project votes and save once.
+
+        Each vote counts as if add_mapping() had been called once per
+        project that voted for it, but the database is written a single
+        time for the whole batch.
+
+        Args:
+            votes: Dicts with v1_field, v2_field, votes (number of projects),
+                   projects, sample_values and confidence, highest votes
+                   first (see learn_mappings.aggregate_votes)
+            projects_analyzed: Number of projects the votes came from
+        """
+        self.bulk_upsert(
+            [dict(vote, times_seen=vote.get("votes", 1)) for vote in votes],
+            projects_analyzed=projects_analyzed
+        )
+
+    def bulk_upsert(self, mappings=None, array_mappings=None, mode: str = "merge",
+                    project_id: str = None, projects_analyzed: int = 0) -> Dict:
+        """
+        Validate many mappings and write them in one transaction.
+
+        mappings is either {v1_field: mapping} (the /api/mappings/export
+        format) or a list of dicts with a v1_field. Rows are either:
+        - stored mappings (they have a confidence_score): added as they are,
+          or merged into an existing mapping as if seen times_seen more times
+        - learned rows (v1_field, v2_field and optionally value or
+          sample_values, projects, confidence, times_seen): applied like
+          add_mapping()
+        Stored rows get the fields they leave out (times_seen, sample_values,
+        projects, ...) filled in. Invalid rows are reported and left out; the
+        rest are still written. On any other error nothing is written and
+        unsaved changes are dropped.
+
+        Args:
+            mappings: Field mappings to write
+            array_mappings: {v1_array: array mapping} to write
+            mode: 'merge' to combine with existing mappings (the same v2 field
+                  adds up times_seen and confidence, another v2 field becomes
+                  an alternative), 'skip' to leave existing mappings alone, or
+                  'replace' to remove every mapping and array mapping first
+            project_id: Project the rows came from
+            projects_analyzed: Added to the analyzed projects count
+
+        Returns:
+            Counts of added, merged, skipped and invalid rows, and errors
+            (messages for the first invalid rows)
+        """
+        if mode not in BULK_MODES:
+            raise ValueError(f"Unknown mode {mode!r} (expected one of: {', '.join(BULK_MODES)})")
+
+        result = {"added": 0, "merged": 0, "skipped": 0, "invalid": 0, "errors": []}
+
+        def rows(section):
+            if isinstance(section, dict):
+                return section.items()
+            return ((None, row) for row in section or [])
+
+        with self.write_lock():
+            try:
+                self._bulk_apply(rows(mappings), rows(array_mappings), mode, project_id, result)
+                self.data["metadata"]["total_projects_analyzed"] += projects_analyzed
+                self._save_database()
+            except BaseException:
+                self._discard_changes()
+                raise
+
+        return result
+
+    def _bulk_apply(self, mappings, array_mappings, mode: str, project_id: Optional[str], result: Dict):
+        """Apply bulk_upsert() rows in memory, counting them into result"""
+        if mode == "replace":
+            self.clear()
+
+        for key, row in mappings:
+            try:
+                v1_field = _validate_row(key, row, "v1_field", "v2_field")
+            except ValueError as e:
+                _report_invalid(result, str(e))
+                continue
+
+            existing = self.data["mappings"].get(v1_field)
+            if existing is not None and mode == "skip":
+                result["skipped"] += 1
+                continue
+
+            project_ids = list(row.get("projects") or [])
+            if project_id:
+                project_ids.append(project_id)
+
+            if existing is None and "confidence_score" in row:
+                stored = _complete_row(dict(row, v1_field=v1_field), project_ids, source="learned")
+                stored.setdefault("sample_values", [])
+                stored.setdefault("initial_confidence", "manual" if stored["source"] == "manual" else "high")
+                self.set_mapping(v1_field, stored)
+            else:
+                value = row.get("value")
+                self._apply_mapping(
+                    v1_field, row["v2_field"],
+                    values=row.get("sample_values") or ([value] if value else []),
+                    project_ids=project_ids,
+                    confidence="manual" if row.get("source") == "manual"
+                    else row.get("confidence", row.get("initial_confidence", "high")),
+                    times=row.get("times_seen", 1)
+                )
+            result["added" if existing is None else "merged"] += 1
+
+        for key, row in array_mappings:
+            try:
+                v1_array = _validate_row(key, row, "v1_array", "v2_array")
+            except ValueError as e:
+                _report_invalid(result, str(e))
+                continue
+
+            if not v1_array.endswith('[]'):
+                v1_array = v1_array + '[]'
+            existing = self.data["array_mappings"].get(v1_array)
+            if existing is not None and mode == "skip":
+                result["skipped"] += 1
+                continue
+
+            project_ids = list(row.get("projects") or [])
+            if project_id:
+                project_ids.append(project_id)
+
+            if existing is None and "confidence_score" in row:
+                stored = _complete_row(dict(row, v1_array=v1_array), project_ids, source="manual")
+                stored.setdefault("field_mappings", [])
+                self.set_array_mapping(v1_array, stored)
+            else:
+                self._apply_array_mapping(v1_array, row["v2_array"], row.get("field_mappings"),
+                                          project_ids, times=row.get("times_seen", 1))
+            result["added" if existing is None else "merged"] += 1
+
+    def _apply_mapping(self, v1_field: str, v2_field: str, values: List, project_ids: List[str],
+                       confidence: str = "high", times: int = 1):
+        """Add or update a mapping in memory, as if seen `times` times (see add_mapping)"""
         # Create mapping key
         key = v1_field
+        now = datetime.now().isoformat()
 
         # Determine source and confidence score based on confidence parameter
         if confidence == "manual":
@@ -68,18 +667,18 @@ class MappingDatabase:
             initial_score = 10  # Manual mappings get highest score
         else:
             source = "learned"
-            initial_score = 1
+            initial_score = times
 
         if key not in self.data["mappings"]:
             self.data["mappings"][key] = {
                 "v1_field": v1_field,
                 "v2_field": v2_field,
                 "confidence_score": initial_score,
-                "times_seen": 1,
+                "times_seen": times,
                 "sample_values": [],
                 "projects": [],
-                "first_seen": datetime.now().isoformat(),
-                "last_seen": datetime.now().isoformat(),
+                "first_seen": now,
+                "last_seen": now,
                 "initial_confidence": confidence,
                 "source": source
             }
@@ -94,8 +693,8 @@ class MappingDatabase:
                     existing["source"] = "manual"
                     existing["confidence_score"] = 10  # Manual always gets highest score
                 else:
-                    existing["confidence_score"] += 1
-                existing["times_seen"] += 1
+                    existing["confidence_score"] += times
+                existing["times_seen"] += times
             else:
                 # Different v2 field for same v1 field - possible conflict
                 # Store as alternative
@@ -106,46 +705,51 @@ class MappingDatabase:
                 alt_exists = False
                 for alt in existing["alternatives"]:
                     if alt["v2_field"] == v2_field:
-                        alt["times_seen"] += 1
+                        alt["times_seen"] += times
                         alt_exists = True
                         break
 
                 if not alt_exists:
                     existing["alternatives"].append({
                         "v2_field": v2_field,
-                        "times_seen": 1,
+                        "times_seen": times,
                         "projects": []
                     })
 
-            existing["last_seen"] = datetime.now().isoformat()
+            existing["last_seen"] = now
 
-        # Add sample value if provided
-        if value and value not in self.data["mappings"][key]["sample_values"]:
-            self.data["mappings"][key]["sample_values"].append(value)
-            # Keep only last 5 sample values
-            self.data["mappings"][key]["sample_values"] = \
-                self.data["mappings"][key]["sample_values"][-5:]
+        self._mark_changed("mappings", key)
+        mapping = self.data["mappings"][key]
 
-        # Add project ID if provided
-        if project_id and project_id not in self.data["mappings"][key]["projects"]:
-            self.data["mappings"][key]["projects"].append(project_id)
+        # Add sample values if provided
+        for value in values:
+            if value and value not in mapping["sample_values"]:
+                mapping["sample_values"].append(value)
+        # Keep only last 5 sample values
+        mapping["sample_values"] = mapping["sample_values"][-5:]
 
-        self._save_database()
+        # Add project IDs if provided
+        for project_id in project_ids:
+            if project_id and project_id not in mapping["projects"]:
+                mapping["projects"].append(project_id)
 
     def get_mapping(self, v1_field: str) -> Optional[Dict]:
         """Get the best mapping for a v1 field"""
-        return self.data["mappings"].get(v1_field)
+        mapping = self.data["mappings"].get(v1_field)
+        if mapping is None and self.fallback is not None and v1_field not in self._hidden("mappings"):
+            return self.fallback.get_mapping(v1_field)
+        return mapping
 
     def get_all_mappings(self) -> Dict:
-        """Get all stored mappings"""
-        return self.data["mappings"]
+        """Get all stored mappings (including the fallback's, if any)"""
+        return self._layered("mappings")
 
     def get_high_confidence_mappings(self, min_score: int = 2) -> Dict:
-        """Get mappings that have been confirmed multiple times"""
-        return {
-            k: v for k, v in self.data["mappings"].items()
-            if v["confidence_score"] >= min_score
-        }
+        """Get mappings that have been confirmed multiple times (highest score first)"""
+        with self._lock:
+            keys = self.mapping_index().min_score(min_score)
+            mappings = self._layered("mappings")
+            return {k: mappings[k] for k in reversed(keys)}
 
     def import_mappings(self, mappings: List[Dict], project_id: str = None):
         """
@@ -155,18 +759,7 @@ class MappingDatabase:
             mappings: List of mapping dicts with v1_field, v2_field, value, confidence
             project_id: Project ID where these mappings came from
         """
-        for mapping in mappings:
-            self.add_mapping(
-                v1_field=mapping.get("v1_field"),
-                v2_field=mapping.get("v2_field"),
-                value=mapping.get("value"),
-                project_id=project_id,
-                confidence=mapping.get("confidence", "high")
-            )
-
-        # Update metadata
-        self.data["metadata"]["total_projects_analyzed"] += 1
-        self._save_database()
+        self.bulk_upsert(mappings, project_id=project_id, projects_analyzed=1)
 
     def export_for_template_converter(self, output_file: str = "discovered_mappings.py"):
         """
@@ -197,10 +790,11 @@ class MappingDatabase:
 
     def get_statistics(self) -> Dict:
         """Get database statistics"""
-        total = len(self.data["mappings"])
-        high_conf = len(self.get_high_confidence_mappings(min_score=2))
-        very_high_conf = len(self.get_high_confidence_mappings(min_score=5))
-        array_mappings = len(self.data.get("array_mappings", {}))
+        index = self.mapping_index()
+        total = len(index)
+        high_conf = index.count_min_score(2)
+        very_high_conf = index.count_min_score(5)
+        array_mappings = len(self._layered("array_mappings"))
 
         return {
             "total_mappings": total,
@@ -267,13 +861,26 @@ class MappingDatabase:
 
         key = v1_array
 
+        with self.write_lock():
+            self._apply_array_mapping(v1_array, v2_array, field_mappings,
+                                      [project_id] if project_id else [])
+            self._save_database()
+            return self.data["array_mappings"][key]
+
+    def _apply_array_mapping(self, v1_array: str, v2_array: str, field_mappings: Optional[List[Dict]],
+                             project_ids: List[str], times: int = 1):
+        """Add or update an array mapping in memory, as if seen `times` times (see add_array_mapping)"""
+        key = v1_array
+        if not v2_array.endswith('[]'):
+            v2_array = v2_array + '[]'
+
         if key not in self.data["array_mappings"]:
             self.data["array_mappings"][key] = {
                 "v1_array": v1_array,
                 "v2_array": v2_array,
                 "field_mappings": field_mappings or [],
                 "confidence_score": 10,  # Manual mappings get high score
-                "times_seen": 1,
+                "times_seen": times,
                 "projects": [],
                 "first_seen": datetime.now().isoformat(),
                 "last_seen": datetime.now().isoformat(),
@@ -282,8 +889,8 @@ class MappingDatabase:
         else:
             existing = self.data["array_mappings"][key]
             if existing["v2_array"] == v2_array:
-                existing["confidence_score"] += 1
-                existing["times_seen"] += 1
+                existing["confidence_score"] += times
+                existing["times_seen"] += times
                 # Merge field mappings if provided
                 if field_mappings:
                     existing_fields = {(fm.get('v1'), fm.get('v2')) for fm in existing["field_mappings"]}
@@ -292,41 +899,53 @@ class MappingDatabase:
                             existing["field_mappings"].append(fm)
             existing["last_seen"] = datetime.now().isoformat()
 
-        if project_id and project_id not in self.data["array_mappings"][key]["projects"]:
-            self.data["array_mappings"][key]["projects"].append(project_id)
+        for project_id in project_ids:
+            if project_id and project_id not in self.data["array_mappings"][key]["projects"]:
+                self.data["array_mappings"][key]["projects"].append(project_id)
 
-        self._save_database()
-        return self.data["array_mappings"][key]
+        self._mark_changed("array_mappings", key)
 
     def get_array_mapping(self, v1_array: str) -> Optional[Dict]:
         """Get the mapping for a v1 array"""
         if not v1_array.endswith('[]'):
             v1_array = v1_array + '[]'
-        return self.data.get("array_mappings", {}).get(v1_array)
+        mapping = self.data["array_mappings"].get(v1_array)
+        if mapping is None and self.fallback is not None and v1_array not in self._hidden("array_mappings"):
+            return self.fallback.get_array_mapping(v1_array)
+        return mapping
 
     def get_all_array_mappings(self) -> Dict:
-        """Get all stored array mappings"""
-        return self.data.get("array_mappings", {})
+        """Get all stored array mappings (including the fallback's, if any)"""
+        return self._layered("array_mappings")
+
+    def size(self) -> int:
+        """Bytes the database takes on disk"""
+        return self.store.size()
+
+    def close(self):
+        """Close the storage backend (SQLite reconnects if the database is used again)"""
+        self.store.close()
 
     def delete_mapping(self, v1_field: str) -> bool:
         """
         Delete a mapping from the database
 
+        A mapping only inherited from the fallback is hidden in this
+        database instead; deleting one this database overrides reveals the
+        fallback's again.
+
         Args:
             v1_field: The v1 field name to delete
 
         Returns:
             bool: True if mapping was deleted, False if not found
         """
-        if v1_field in self.data["mappings"]:
-            del self.data["mappings"][v1_field]
-            self._save_database()
-            return True
-        return False
+        with self.write_lock():
+            return self._delete("mappings", v1_field)
 
     def delete_array_mapping(self, v1_array: str) -> bool:
         """
-        Delete an array mapping from the database
+        Delete an array mapping from the database (see delete_mapping)
 
         Args:
             v1_array: The v1 array path to delete
@@ -337,16 +956,168 @@ class MappingDatabase:
         if not v1_array.endswith('[]'):
             v1_array = v1_array + '[]'
 
-        if v1_array in self.data.get("array_mappings", {}):
-            del self.data["array_mappings"][v1_array]
-            self._save_database()
-            return True
-        return False
+        with self.write_lock():
+            return self._delete("array_mappings", v1_array)
+
+    def _delete(self, section: str, key: str) -> bool:
+        """Delete or hide one key and save (caller holds write_lock())"""
+        if key in self.data[section]:
+            del self.data[section][key]
+        elif key in self._layered(section):
+            self.data["metadata"].setdefault(HIDDEN_KEYS[section], []).append(key)
+        else:
+            return False
+        self._mark_changed(section, key)
+        self._save_database()
+        return True
+
+
+def _validate_row(key: Optional[str], row, key_field: str, target_field: str) -> str:
+    """Check one bulk_upsert() row and return its key (raises ValueError)"""
+    if not isinstance(row, dict):
+        raise ValueError(f"{key or 'Row'}: not an object")
+    name = key if key is not None else row.get(key_field)
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"Row without a {key_field}")
+    if not isinstance(row.get(target_field), str) or not row[target_field]:
+        raise ValueError(f"{name}: missing {target_field}")
+    for number in ("confidence_score", "times_seen"):
+        if number in row and (isinstance(row[number], bool) or not isinstance(row[number], (int, float))):
+            raise ValueError(f"{name}: {number} is not a number")
+    if "times_seen" in row and row["times_seen"] < 1:
+        raise ValueError(f"{name}: times_seen must be at least 1")
+    for listed in ("sample_values", "projects", "field_mappings"):
+        if row.get(listed) is not None and not isinstance(row[listed], list):
+            raise ValueError(f"{name}: {listed} is not a list")
+    return name
+
+
+def _complete_row(stored: Dict, project_ids: List[str], source: str) -> Dict:
+    """Fill in the fields a stored bulk_upsert() row may leave out, so later merges find them"""
+    now = datetime.now().isoformat()
+    stored["projects"] = list(dict.fromkeys(project_ids))
+    stored.setdefault("times_seen", 1)
+    stored.setdefault("first_seen", now)
+    stored.setdefault("last_seen", stored["first_seen"])
+    stored.setdefault("source", source)
+    return stored
+
+
+def _report_invalid(result: Dict, message: str):
+    result["invalid"] += 1
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append(message)
+
+
+_shared_databases: Dict[str, MappingDatabase] = {}
+_shared_lock = threading.Lock()
+
+
+def get_mapping_database(db_path: str = DEFAULT_DB_PATH) -> MappingDatabase:
+    """
+    The process-wide MappingDatabase for a file, refreshed if another
+    process has saved it since (see MappingDatabase.refresh()).
+
+    Use this instead of constructing MappingDatabase() per request: the file
+    is parsed once per process and again only after it changes.
+    """
+    key = os.path.abspath(db_path)
+    with _shared_lock:
+        db = _shared_databases.get(key)
+        if db is None:
+            db = _shared_databases[key] = MappingDatabase(db_path)
+            return db
+    db.refresh()
+    return db
+
+
+class MappingShards:
+    """
+    One MappingDatabase per account, opened on first use.
+
+    Open shards are kept in an LRU: when their combined size on disk passes
+    max_disk_bytes, the least recently used ones are closed and dropped (the
+    last one used always stays). Shards live in <shard_dir>/<account slug>.db.
+    """
+
+    def __init__(self, shard_dir: str = SHARD_DIR, global_db_path: str = DEFAULT_DB_PATH,
+                 max_disk_bytes: int = None, use_fallback: bool = True):
+        """
+        Args:
+            shard_dir: Directory holding the account shards
+            global_db_path: Database used without an account, and as every
+                shard's fallback
+            max_disk_bytes: Cap on the open shards' combined file size (default:
+                MAPPING_SHARD_DISK_MB megabytes, or SHARD_DISK_MB)
+            use_fallback: Serve global mappings an account hasn't learned itself
+        """
+        if max_disk_bytes is None:
+            max_disk_bytes = int(os.environ.get('MAPPING_SHARD_DISK_MB', SHARD_DISK_MB)) * 1024 * 1024
+        self.shard_dir = shard_dir
+        self.global_db_path = global_db_path
+        self.max_disk_bytes = max_disk_bytes
+        self.use_fallback = use_fallback
+        self._shards = OrderedDict()  # account slug -> MappingDatabase
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def shard_name(account_slug: str) -> str:
+        """File-safe name for an account slug"""
+        return re.sub(r'[^a-z0-9_-]', '_', account_slug.lower())
+
+    def shard_path(self, account_slug: str) -> str:
+        return os.path.join(self.shard_dir, f"{self.shard_name(account_slug)}.db")
+
+    def global_database(self) -> MappingDatabase:
+        """The global database (refreshed, see get_mapping_database())"""
+        return get_mapping_database(self.global_db_path)
+
+    def for_account(self, account_slug: Optional[str]) -> MappingDatabase:
+        """
+        The database for an account, opened on first use and refreshed from
+        disk otherwise. Without an account slug, the global database.
+        """
+        if not account_slug:
+            return self.global_database()
+
+        name = self.shard_name(account_slug)
+        with self._lock:
+            db = self._shards.get(name)
+            if db is not None:
+                self._shards.move_to_end(name)
+
+        if db is None:
+            # Opened outside the lock so other accounts aren't blocked
+            os.makedirs(self.shard_dir, exist_ok=True)
+            opened = MappingDatabase(self.shard_path(account_slug))
+            with self._lock:
+                db = self._shards.setdefault(name, opened)
+                self._shards.move_to_end(name)
+                self._evict()
+        else:
+            db.refresh()
+
+        db.fallback = self.global_database() if self.use_fallback else None
+        return db
+
+    def _evict(self):
+        """Close least recently used shards over the disk size cap (caller holds the lock)"""
+        sizes = {name: db.size() for name, db in self._shards.items()}
+        total = sum(sizes.values())
+        while total > self.max_disk_bytes and len(self._shards) > 1:
+            name, db = self._shards.popitem(last=False)
+            db.close()
+            total -= sizes[name]
+
+    def loaded(self) -> List[str]:
+        """Shard names currently open, least recently used first"""
+        with self._lock:
+            return list(self._shards)
 
 
 if __name__ == "__main__":
     # Test the database
-    db = MappingDatabase()
+    db = get_mapping_database()
 
     print("Mapping Database Statistics:")
     print("=" * 60)
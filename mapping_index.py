@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Mapping Index
+=============
+
+Sorted secondary indexes over a MappingDatabase's field mappings.
+
+The mapping manager pages, searches and filters tens of thousands of
+mappings. Instead of scanning every mapping per request, MappingIndex keeps:
+
+- by_v1 / by_v2: (lowercased field, v1 field) sorted, for prefix search
+  (a bisect range) and for ordering pages by either field
+- by_score: (confidence score, v1 field) sorted, for minimum-confidence
+  filters and ordering by confidence
+- by_source: source -> v1 fields
+- one newline-joined lowercase text per field, for substring search with
+  str.find() instead of a Python-level loop (built on first use)
+
+MappingDatabase reports changed keys with invalidate(); they are applied on
+the next query, in place for a few keys or by rebuilding for many.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+SORT_FIELDS = ("v1_field", "v2_field", "confidence")
+SEARCH_FIELDS = ("both", "v1", "v2")
+MATCH_MODES = ("substring", "prefix")
+
+# Above this share of changed keys, rebuilding beats updating in place
+REBUILD_RATIO = 8
+
+
+class MappingIndex:
+    """Sorted indexes over {v1_field: mapping}"""
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[str, str, str, float]] = {}  # v1 -> (v1 lower, v2 lower, source, score)
+        self.by_v1: List[Tuple[str, str]] = []
+        self.by_v2: List[Tuple[str, str]] = []
+        self.by_score: List[Tuple[float, str]] = []
+        self.by_source: Dict[str, Set[str]] = {}
+        self._pending: Set[str] = set()
+        self._stale = True
+        self._texts: Dict[str, Tuple[str, List[int], List[str]]] = {}  # field -> (joined text, line starts, v1 keys)
+
+    def invalidate(self, keys: Optional[Iterable[str]] = None):
+        """Mark keys (or, with None, everything) as changed"""
+        if keys is None:
+            self._stale = True
+            self._pending.clear()
+        elif not self._stale:
+            self._pending.update(keys)
+        self._texts.clear()
+
+    def sync(self, mappings: Dict[str, Dict]):
+        """Apply pending changes from the mappings they came from"""
+        if self._stale or len(self._pending) * REBUILD_RATIO > len(self.entries):
+            self._rebuild(mappings)
+            return
+        for key in self._pending:
+            self._remove(key)
+            if key in mappings:
+                self._insert(key, mappings[key])
+        self._pending.clear()
+
+    def _rebuild(self, mappings: Dict[str, Dict]):
+        self.entries = {key: _entry(key, mapping) for key, mapping in mappings.items()}
+        self.by_v1 = sorted((entry[0], key) for key, entry in self.entries.items())
+        self.by_v2 = sorted((entry[1], key) for key, entry in self.entries.items())
+        self.by_score = sorted((entry[3], key) for key, entry in self.entries.items())
+        self.by_source = {}
+        for key, entry in self.entries.items():
+            self.by_source.setdefault(entry[2], set()).add(key)
+        self._pending.clear()
+        self._stale = False
+
+    def _insert(self, key: str, mapping: Dict):
+        entry = self.entries[key] = _entry(key, mapping)
+        insort(self.by_v1, (entry[0], key))
+        insort(self.by_v2, (entry[1], key))
+        insort(self.by_score, (entry[3], key))
+        self.by_source.setdefault(entry[2], set()).add(key)
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for sorted_list, item in ((self.by_v1, (entry[0], key)), (self.by_v2, (entry[1], key)),
+                                  (self.by_score, (entry[3], key))):
+            position = bisect_left(sorted_list, item)
+            del sorted_list[position]
+        self.by_source[entry[2]].discard(key)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # ==================== Lookups ====================
+
+    def prefix(self, field: str, text: str) -> List[str]:
+        """v1 fields whose v1 or v2 field starts with text (case-insensitive), in field order"""
+        sorted_list = self.by_v1 if field == "v1" else self.by_v2
+        text = text.lower()
+        position = bisect_left(sorted_list, (text,))
+        keys = []
+        while position < len(sorted_list) and sorted_list[position][0].startswith(text):
+            keys.append(sorted_list[position][1])
+            position += 1
+        return keys
+
+    def substring(self, field: str, text: str) -> Set[str]:
+        """v1 fields whose v1 or v2 field contains text (case-insensitive)"""
+        joined, starts, keys = self._text(field)
+        text = text.lower()
+        found = set()
+        position = joined.find(text)
+        while position != -1:
+            line = bisect_right(starts, position) - 1
+            found.add(keys[line])
+            # Continue after this line: one hit per mapping is enough
+            next_start = starts[line + 1] if line + 1 < len(starts) else len(joined)
+            position = joined.find(text, next_start)
+        return found
+
+    def _text(self, field: str) -> Tuple[str, List[int], List[str]]:
+        if field not in self._texts:
+            sorted_list = self.by_v1 if field == "v1" else self.by_v2
+            starts, keys, offset = [], [], 0
+            for value, key in sorted_list:
+                starts.append(offset)
+                keys.append(key)
+                offset += len(value) + 1
+            self._texts[field] = ('\n'.join(value for value, _ in sorted_list), starts, keys)
+        return self._texts[field]
+
+    def min_score(self, score: float) -> List[str]:
+        """v1 fields with a confidence score of at least score, lowest first"""
+        start = bisect_left(self.by_score, (score,))
+        return [key for _, key in self.by_score[start:]]
+
+    def count_min_score(self, score: float) -> int:
+        """Number of v1 fields with a confidence score of at least score"""
+        return len(self.by_score) - bisect_left(self.by_score, (score,))
+
+    def source(self, source: str) -> Set[str]:
+        """v1 fields with a given source"""
+        return self.by_source.get(source, set())
+
+    def query(self, search: str = None, match: str = "substring", field: str = "both",
+              source: str = None, min_score: float = None, sort: str = "v1_field",
+              descending: bool = False, offset: int = 0, limit: int = None) -> Tuple[int, List[str]]:
+        """
+        Filter, order and page the mappings.
+
+        Args:
+            search: Text to look for in v1 and/or v2 fields
+            match: 'substring' or 'prefix'
+            field: 'both', 'v1' or 'v2'
+            source: Only mappings with this source
+            min_score: Only mappings with at least this confidence score
+            sort: 'v1_field', 'v2_field' or 'confidence'
+            descending: Reverse the order
+            offset: Mappings to skip
+            limit: Maximum mappings to return (None for all)
+
+        Returns:
+            (number of matching mappings, v1 fields of the requested page)
+        """
+        candidates: Optional[Set[str]] = None
+
+        def narrow(keys):
+            nonlocal candidates
+            keys = keys if isinstance(keys, set) else set(keys)
+            candidates = keys if candidates is None else candidates & keys
+
+        if search:
+            fields = ("v1", "v2") if field == "both" else (field,)
+            found = set()
+            for name in fields:
+                found.update(self.prefix(name, search) if match == "prefix" else self.substring(name, search))
+            narrow(found)
+        if source:
+            narrow(self.source(source))
+        if min_score is not None:
+            narrow(self.min_score(min_score))
+
+        order = {"v1_field": self.by_v1, "v2_field": self.by_v2, "confidence": self.by_score}[sort]
+        if candidates is None:
+            # No filters: page straight out of the sorted index
+            total = len(order)
+            end = total if limit is None else min(total, offset + limit)
+            if descending:
+                page = [order[total - 1 - i][1] for i in range(offset, end)]
+            else:
+                page = [item[1] for item in order[offset:end]]
+            return total, page
+
+        position = {"v1_field": 0, "v2_field": 1, "confidence": 3}[sort]
+        ordered = sorted(candidates, key=lambda key: (self.entries[key][position], key), reverse=descending)
+        end = None if limit is None else offset + limit
+        return len(ordered), ordered[offset:end]
+
+
+def _entry(key: str, mapping: Dict) -> Tuple[str, str, str, float]:
+    score = mapping.get("confidence_score", 1)
+    return (
+        key.lower(),
+        str(mapping.get("v2_field") or "").lower(),
+        mapping.get("source") or "learned",
+        score if isinstance(score, (int, float)) else 1,
+    )
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Mapping NDJSON
+==============
+
+Newline-delimited JSON export and import for mapping databases, so mapping
+sets can move between environments without the whole export held in one
+JSON document on either side.
+
+Each line is one JSON object:
+
+    {"type": "header", "version": "1.0", "exported_at": "..."}
+    {"type": "mapping", "key": "project_name", "mapping": {...}}
+    {"type": "array_mapping", "key": "locations[]", "mapping": {...}}
+
+The header comes first and is optional on import. mapping objects are the
+stored mapping dicts (the same ones /api/mappings/export nests under
+'mappings' and 'array_mappings').
+
+Export is a generator of text chunks, for a streamed response. Import reads
+lines from any iterable (a file, a request stream) and writes them through
+MappingDatabase.bulk_upsert() in batches, or in one transaction when
+replacing the whole database.
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Union
+
+from mapping_database import BULK_MODES, MAX_REPORTED_ERRORS, MappingDatabase
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_VERSION = "1.0"
+
+IMPORT_BATCH_SIZE = 1000    # Rows per bulk_upsert() transaction
+EXPORT_CHUNK_SIZE = 64 * 1024  # Characters per yielded export chunk
+
+SECTION_TYPES = {"mapping": "mappings", "array_mapping": "array_mappings"}
+
+
+def iter_ndjson_export(db: MappingDatabase) -> Iterator[str]:
+    """
+    Export a database as NDJSON text chunks of about EXPORT_CHUNK_SIZE.
+
+    The mappings are read from a snapshot of the keys taken when the export
+    starts; only one chunk of serialized text is held at a time.
+    """
+    header = {"type": "header", "version": NDJSON_VERSION, "exported_at": datetime.now().isoformat()}
+    lines = [json.dumps(header)]
+    size = len(lines[0])
+
+    for line_type, section in (("mapping", db.get_all_mappings()),
+                               ("array_mapping", db.get_all_array_mappings())):
+        for key in list(section):
+            mapping = section.get(key)
+            if mapping is None:
+                continue  # Deleted since the export started
+            line = json.dumps({"type": line_type, "key": key, "mapping": mapping})
+            lines.append(line)
+            size += len(line) + 1
+            if size >= EXPORT_CHUNK_SIZE:
+                yield '\n'.join(lines) + '\n'
+                lines, size = [], 0
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def import_ndjson(db: MappingDatabase, lines: Iterable[Union[str, bytes]], mode: str = "merge",
+                  batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+    """
+    Import NDJSON lines in batches of batch_size rows.
+
+    Lines are parsed without holding the database's write lock; it is only
+    taken while each batch is written.
+
+    Args:
+        db: Database to write to
+        lines: NDJSON lines (str or bytes, e.g. an open file or request.stream)
+        mode: See MappingDatabase.bulk_upsert(). 'replace' reads the whole
+              stream first and writes it in one transaction, so the
+              existing mappings stay until the import is complete
+        batch_size: Rows per transaction ('merge' and 'skip')
+
+    Returns:
+        bulk_upsert() counts summed over every batch, plus lines (the
+        number of non-empty lines read) and batches
+    """
+    if mode not in BULK_MODES:
+        raise ValueError(f"Unknown mode {mode!r} (expected one of: {', '.join(BULK_MODES)})")
+
+    totals = {"added": 0, "merged": 0, "skipped": 0, "invalid": 0, "errors": [], "lines": 0, "batches": 0}
+    batch = {"mappings": {}, "array_mappings": {}}
+    pending = 0
+
+    def invalid(message):
+        totals["invalid"] += 1
+        if len(totals["errors"]) < MAX_REPORTED_ERRORS:
+            totals["errors"].append(message)
+
+    def flush():
+        nonlocal pending
+        result = db.bulk_upsert(batch["mappings"], batch["array_mappings"], mode=mode)
+        for count in ("added", "merged", "skipped", "invalid"):
+            totals[count] += result[count]
+        totals["errors"].extend(result["errors"][:MAX_REPORTED_ERRORS - len(totals["errors"])])
+        totals["batches"] += 1
+        batch["mappings"], batch["array_mappings"] = {}, {}
+        pending = 0
+
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            try:
+                line = line.decode('utf-8')
+            except UnicodeDecodeError as e:
+                totals["lines"] += 1
+                invalid(f"Line {number}: invalid UTF-8 ({e})")
+                continue
+        line = line.strip()
+        if not line:
+            continue
+        totals["lines"] += 1
+
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            invalid(f"Line {number}: invalid JSON ({e})")
+            continue
+        if not isinstance(row, dict):
+            invalid(f"Line {number}: not an object")
+            continue
+
+        section = SECTION_TYPES.get(row.get("type"))
+        if section is None:
+            if row.get("type") != "header":
+                invalid(f"Line {number}: unknown type {row.get('type')!r}")
+            continue
+        if not isinstance(row.get("key"), str):
+            invalid(f"Line {number}: missing key")
+            continue
+
+        # Duplicate keys in one batch: the later line wins, as in a JSON import
+        batch[section][row["key"]] = row.get("mapping")
+        pending += 1
+        if pending >= batch_size and mode != "replace":
+            flush()
+
+    if pending or totals["batches"] == 0:
+        flush()  # Also runs for an empty import, so 'replace' still clears
+
+    return totals
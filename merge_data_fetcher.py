@@ -8,15 +8,23 @@ import requests
 import json
 import sys
 import os
-from typing import Dict, List, Set
+from typing import Any, Callable, Dict, Iterator, List, Set, Tuple
 from pathlib import Path
 
+from json_stream import CHUNK_SIZE, iter_events
+
 
 class MergeDataFetcher:
     """Fetches and parses merge data from ScopeStack"""
 
-    def __init__(self, base_url: str = "https://app.scopestack.io"):
+    def __init__(self, base_url: str = "https://app.scopestack.io", log: Callable[..., None] = print):
+        """
+        Args:
+            base_url: ScopeStack app URL
+            log: Called like print() with progress and error messages
+        """
         self.base_url = base_url
+        self.log = log
         self.session = requests.Session()
         self.auth_token = None
 
@@ -41,7 +49,7 @@ class MergeDataFetcher:
             client_secret = os.environ.get('SCOPESTACK_CLIENT_SECRET')
 
             if not client_id or not client_secret:
-                print("✗ SCOPESTACK_CLIENT_ID and SCOPESTACK_CLIENT_SECRET environment variables must be set")
+                self.log("✗ SCOPESTACK_CLIENT_ID and SCOPESTACK_CLIENT_SECRET environment variables must be set")
                 return False
 
             payload = {
@@ -64,11 +72,11 @@ class MergeDataFetcher:
                     'Accept': 'application/vnd.api+json'
                 })
 
-                print("✓ Successfully authenticated with ScopeStack")
+                self.log("✓ Successfully authenticated with ScopeStack")
                 return True
 
             except requests.exceptions.RequestException as e:
-                print(f"✗ Authentication failed: {e}")
+                self.log(f"✗ Authentication failed: {e}")
                 return False
 
         raise ValueError("Must provide either token or email/password for authentication")
@@ -94,9 +102,57 @@ class MergeDataFetcher:
                 'account_id': user_data.get('data', {}).get('attributes', {}).get('account-id')
             }
         except requests.exceptions.RequestException as e:
-            print(f"Error getting account info: {e}")
+            self.log(f"Error getting account info: {e}")
             return None
 
+    def get_recent_project_ids(self, count: int = 50) -> List[str]:
+        """
+        Get the IDs of the most recently created projects in the account
+
+        Args:
+            count: Number of project IDs to return
+
+        Returns:
+            List of project IDs, most recent first (empty on error)
+        """
+        account_info = self.get_account_info()
+        if not account_info or not account_info['account_slug']:
+            self.log("Error: Could not get account slug")
+            return []
+
+        url = f"https://api.scopestack.io/{account_info['account_slug']}/v1/projects"
+        page_size = min(count, 100)
+        project_ids = []
+        page = 1
+
+        try:
+            while len(project_ids) < count:
+                response = self.session.get(
+                    url,
+                    params={
+                        'page[size]': page_size,
+                        'page[number]': page,
+                        'sort': '-created-at'  # Most recent first
+                    },
+                    headers={
+                        'Authorization': f'Bearer {self.auth_token}',
+                        'Accept': 'application/vnd.api+json'
+                    },
+                    timeout=30
+                )
+                response.raise_for_status()
+
+                items = response.json().get('data', [])
+                project_ids.extend(str(item['id']) for item in items if item.get('id'))
+                if len(items) < page_size:
+                    break
+                page += 1
+
+        except requests.exceptions.RequestException as e:
+            self.log(f"Error listing recent projects: {e}")
+
+        return project_ids[:count]
+
     def get_client(self, client_id: str = None, client_name: str = None, domain: str = None) -> Dict:
         """
         Get a client from ScopeStack by ID, name, or domain
@@ -112,7 +168,7 @@ class MergeDataFetcher:
         """
         account_info = self.get_account_info()
         if not account_info or not account_info['account_slug']:
-            print("Error: Could not get account slug")
+            self.log("Error: Could not get account slug")
             return None
 
         account_slug = account_info['account_slug']
@@ -121,7 +177,7 @@ class MergeDataFetcher:
             if client_id:
                 # Get by ID
                 url = f"https://api.scopestack.io/{account_slug}/v1/clients/{client_id}"
-                print(f"Fetching client by ID: {client_id}")
+                self.log(f"Fetching client by ID: {client_id}")
 
                 response = self.session.get(
                     url,
@@ -144,7 +200,7 @@ class MergeDataFetcher:
                 if domain:
                     filter_params['domain'] = domain
 
-                print(f"Searching for client with filters: {filter_params}")
+                self.log(f"Searching for client with filters: {filter_params}")
 
                 response = self.session.get(
                     url,
@@ -158,23 +214,23 @@ class MergeDataFetcher:
                 data = response.json()
 
                 if not data.get('data'):
-                    print(f"No client found matching criteria")
+                    self.log(f"No client found matching criteria")
                     return None
 
                 # Return first match
                 return data['data'][0]
             else:
-                print("Error: Must provide client_id, client_name, or domain")
+                self.log("Error: Must provide client_id, client_name, or domain")
                 return None
 
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching client: {e}")
+            self.log(f"Error fetching client: {e}")
             if hasattr(e, 'response') and e.response is not None:
                 try:
                     error_detail = e.response.json()
-                    print(f"   Error detail: {error_detail}")
+                    self.log(f"   Error detail: {error_detail}")
                 except:
-                    print(f"   Status: {e.response.status_code}")
+                    self.log(f"   Status: {e.response.status_code}")
             return None
 
     def get_document_template(self, template_name: str) -> Dict:
@@ -189,7 +245,7 @@ class MergeDataFetcher:
         """
         account_info = self.get_account_info()
         if not account_info or not account_info['account_slug']:
-            print("Error: Could not get account slug")
+            self.log("Error: Could not get account slug")
             return None
 
         account_slug = account_info['account_slug']
@@ -208,22 +264,22 @@ class MergeDataFetcher:
             data = response.json()
 
             if not data.get('data'):
-                print(f"No document template found with name: {template_name}")
+                self.log(f"No document template found with name: {template_name}")
                 return None
 
             if len(data['data']) > 1:
-                print(f"Warning: Multiple templates found with name: {template_name}. Using first one.")
+                self.log(f"Warning: Multiple templates found with name: {template_name}. Using first one.")
 
             return data['data'][0]
 
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching document template: {e}")
+            self.log(f"Error fetching document template: {e}")
             if hasattr(e, 'response') and e.response is not None:
                 try:
                     error_detail = e.response.json()
-                    print(f"   Error detail: {error_detail}")
+                    self.log(f"   Error detail: {error_detail}")
                 except:
-                    print(f"   Status: {e.response.status_code}")
+                    self.log(f"   Status: {e.response.status_code}")
             return None
 
     def generate_project_document(self, project_id: str, template_id: str,
@@ -249,7 +305,7 @@ class MergeDataFetcher:
 
         account_info = self.get_account_info()
         if not account_info or not account_info['account_slug']:
-            print("Error: Could not get account slug")
+            self.log("Error: Could not get account slug")
             return None
 
         account_slug = account_info['account_slug']
@@ -275,7 +331,7 @@ class MergeDataFetcher:
             }
         }
 
-        print(f"Generating document for project {project_id} with template {template_id}...")
+        self.log(f"Generating document for project {project_id} with template {template_id}...")
 
         try:
             # Create document
@@ -294,7 +350,7 @@ class MergeDataFetcher:
             document_data = response.json()
             document_id = document_data['data']['id']
 
-            print(f"✓ Document generation started (ID: {document_id})")
+            self.log(f"✓ Document generation started (ID: {document_id})")
 
             if not wait_for_completion:
                 return document_data['data']
@@ -303,7 +359,7 @@ class MergeDataFetcher:
             max_attempts = 60  # 5 minutes with 5 second intervals
             attempts = 0
 
-            print("⏳ Waiting for document generation to complete...")
+            self.log("⏳ Waiting for document generation to complete...")
 
             while attempts < max_attempts:
                 # Check document status
@@ -321,52 +377,60 @@ class MergeDataFetcher:
                 status = status_data['data']['attributes']['status']
 
                 if status == 'finished':
-                    print(f"✓ Document generated successfully!")
+                    self.log(f"✓ Document generated successfully!")
                     document_url = status_data['data']['attributes'].get('document-url')
                     if document_url:
-                        print(f"  Download URL: {document_url}")
+                        self.log(f"  Download URL: {document_url}")
                     return status_data['data']
 
                 elif status == 'error':
                     error_text = status_data['data']['attributes'].get('error-text', 'Unknown error')
-                    print(f"✗ Document generation failed: {error_text}")
+                    self.log(f"✗ Document generation failed: {error_text}")
                     return None
 
                 attempts += 1
                 if attempts < max_attempts:
                     time.sleep(5)
-                    print(f"  Status: {status} (attempt {attempts}/{max_attempts})")
+                    self.log(f"  Status: {status} (attempt {attempts}/{max_attempts})")
 
-            print("✗ Document generation timed out after 5 minutes")
+            self.log("✗ Document generation timed out after 5 minutes")
             return None
 
         except requests.exceptions.RequestException as e:
-            print(f"Error generating document: {e}")
+            self.log(f"Error generating document: {e}")
             if hasattr(e, 'response') and e.response is not None:
                 try:
                     error_detail = e.response.json()
-                    print(f"   Error detail: {error_detail}")
+                    self.log(f"   Error detail: {error_detail}")
                 except:
-                    print(f"   Status: {e.response.status_code}")
+                    self.log(f"   Status: {e.response.status_code}")
             return None
 
-    def fetch_v1_merge_data(self, project_id: str) -> Dict:
+    def fetch_v1_merge_data(self, project_id: str, stream: bool = False, raw: bool = False,
+                            load_under: int = None) -> Dict:
         """
         Fetch v1 merge data using the API endpoint
         URL pattern: https://api.scopestack.io/{account_slug}/v1/projects/{project_id}/merge-data
 
-        Returns the raw v1 merge data structure
+        Returns the raw v1 merge data structure, or with stream=True an
+        iterator of JSON parse events read straight off the response (see
+        json_stream.iter_events), so the payload is never held in memory whole.
+        With raw=True returns the undecoded response body (bytes), for callers
+        that hash the payload before deciding whether to parse it.
+        With stream=True and load_under, a response whose Content-Length is
+        at most load_under bytes is decoded whole (json.loads is about ten
+        times faster than the event parser) and returned as data instead
         """
         # Get account slug first
         account_info = self.get_account_info()
         if not account_info or not account_info['account_slug']:
-            print("Error: Could not get account slug")
+            self.log("Error: Could not get account slug")
             return None
 
         account_slug = account_info['account_slug']
         url = f"https://api.scopestack.io/{account_slug}/v1/projects/{project_id}/merge-data"
 
-        print(f"Fetching v1 merge data from: {url}")
+        self.log(f"Fetching v1 merge data from: {url}")
 
         try:
             response = self.session.get(
@@ -374,41 +438,56 @@ class MergeDataFetcher:
                 headers={
                     'Authorization': f'Bearer {self.auth_token}',
                     'Accept': 'application/vnd.api+json'
-                }
+                },
+                stream=stream
             )
             response.raise_for_status()
 
+            if stream:
+                if self._small_enough(response, load_under):
+                    self.log(f"✓ Successfully fetched v1 merge data for project {project_id}")
+                    return response.json()
+                self.log(f"✓ Streaming v1 merge data for project {project_id}")
+                return self._stream_events(response)
+
+            if raw:
+                self.log(f"✓ Successfully fetched v1 merge data for project {project_id} ({len(response.content)} bytes)")
+                return response.content
+
             data = response.json()
-            print(f"✓ Successfully fetched v1 merge data for project {project_id}")
+            self.log(f"✓ Successfully fetched v1 merge data for project {project_id}")
             return data
 
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching v1 merge data: {e}")
+            self.log(f"Error fetching v1 merge data: {e}")
             if hasattr(e, 'response') and e.response is not None:
                 try:
                     error_detail = e.response.json()
-                    print(f"   Error detail: {error_detail}")
+                    self.log(f"   Error detail: {error_detail}")
                 except:
-                    print(f"   Status: {e.response.status_code}")
+                    self.log(f"   Status: {e.response.status_code}")
             return None
 
-    def fetch_v2_merge_data(self, project_id: str) -> Dict:
+    def fetch_v2_merge_data(self, project_id: str, stream: bool = False, raw: bool = False,
+                            load_under: int = None) -> Dict:
         """
         Fetch v2 merge data using the API endpoint with filter parameter
         URL pattern: https://api.scopestack.io/{account_slug}/v1/projects/{project_id}/merge-data?filter[version]=2
 
-        Returns the raw v2 merge data structure
+        Returns the raw v2 merge data structure, parse events with
+        stream=True (or the data, for a response under load_under bytes), or
+        the response body with raw=True (see fetch_v1_merge_data)
         """
         # Get account slug first
         account_info = self.get_account_info()
         if not account_info or not account_info['account_slug']:
-            print("Error: Could not get account slug")
+            self.log("Error: Could not get account slug")
             return None
 
         account_slug = account_info['account_slug']
         url = f"https://api.scopestack.io/{account_slug}/v1/projects/{project_id}/merge-data"
 
-        print(f"Fetching v2 merge data from: {url}")
+        self.log(f"Fetching v2 merge data from: {url}")
 
         try:
             response = self.session.get(
@@ -417,24 +496,53 @@ class MergeDataFetcher:
                 headers={
                     'Authorization': f'Bearer {self.auth_token}',
                     'Accept': 'application/vnd.api+json'
-                }
+                },
+                stream=stream
             )
             response.raise_for_status()
 
+            if stream:
+                if self._small_enough(response, load_under):
+                    self.log(f"✓ Successfully fetched v2 merge data for project {project_id}")
+                    return response.json()
+                self.log(f"✓ Streaming v2 merge data for project {project_id}")
+                return self._stream_events(response)
+
+            if raw:
+                self.log(f"✓ Successfully fetched v2 merge data for project {project_id} ({len(response.content)} bytes)")
+                return response.content
+
             data = response.json()
-            print(f"✓ Successfully fetched v2 merge data for project {project_id}")
+            self.log(f"✓ Successfully fetched v2 merge data for project {project_id}")
             return data
 
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching v2 merge data: {e}")
+            self.log(f"Error fetching v2 merge data: {e}")
             if hasattr(e, 'response') and e.response is not None:
                 try:
                     error_detail = e.response.json()
-                    print(f"   Error detail: {error_detail}")
+                    self.log(f"   Error detail: {error_detail}")
                 except:
-                    print(f"   Status: {e.response.status_code}")
+                    self.log(f"   Status: {e.response.status_code}")
             return None
 
+    @staticmethod
+    def _small_enough(response, load_under) -> bool:
+        """Whether a streamed response declares a Content-Length of at most load_under bytes"""
+        if load_under is None:
+            return False
+        try:
+            return int(response.headers.get('Content-Length', '')) <= load_under
+        except ValueError:
+            return False  # Chunked: size unknown, keep streaming
+
+    def _stream_events(self, response) -> Iterator[Tuple[str, Any]]:
+        """Parse a streamed response incrementally, releasing the connection when done"""
+        try:
+            yield from iter_events(response.iter_content(chunk_size=CHUNK_SIZE))
+        finally:
+            response.close()
+
     def fetch_merge_data(self, project_id: str, version: int = 2, use_api: bool = True) -> Dict:
         """
         Fetch merge data for a specific project
@@ -457,7 +565,7 @@ class MergeDataFetcher:
         # Fall back to visualization endpoint (legacy)
         url = f"{self.base_url}/projects/{project_id}/merge_data_visualization?version={version}"
 
-        print(f"Fetching merge data from: {url}")
+        self.log(f"Fetching merge data from: {url}")
 
         try:
             response = self.session.get(url)
@@ -473,7 +581,7 @@ class MergeDataFetcher:
                 return self._parse_html_merge_data(response.text)
 
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching merge data: {e}")
+            self.log(f"Error fetching merge data: {e}")
             return None
 
     def _parse_html_merge_data(self, html_content: str) -> Dict:
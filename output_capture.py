@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Output Capture
+==============
+
+Per-thread capture of print() output, for routes that return a debug log.
+
+Swapping sys.stdout for a StringIO captures every thread's output, and
+with threaded workers two requests restoring it in overlapping order can
+leave sys.stdout pointing at a dead buffer. capture_output() instead
+installs one ThreadStdout in place of sys.stdout (once) that sends each
+write to the calling thread's buffer while it captures, and to the real
+stream otherwise.
+
+Usage:
+    with capture_output() as log:
+        learner.learn_mappings(project_id)
+    debug_log = log.getvalue()
+"""
+
+import io
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+_install_lock = threading.Lock()
+
+
+class ThreadStdout:
+    """sys.stdout stand-in that writes to the current thread's capture buffer, if any"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def _target(self):
+        return getattr(self._local, 'buffer', None) or self.stream
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        # encoding, isatty(), fileno(), ... come from the real stream
+        return getattr(self.stream, name)
+
+
+def thread_stdout() -> ThreadStdout:
+    """The installed ThreadStdout, installing it over sys.stdout on first use"""
+    with _install_lock:
+        if not isinstance(sys.stdout, ThreadStdout):
+            sys.stdout = ThreadStdout(sys.stdout)
+        return sys.stdout
+
+
+@contextmanager
+def capture_output() -> Iterator[io.StringIO]:
+    """Capture what the calling thread prints until the block exits (nests)"""
+    stdout = thread_stdout()
+    buffer = io.StringIO()
+    previous = getattr(stdout._local, 'buffer', None)
+    stdout._local.buffer = buffer
+    try:
+        yield buffer
+    finally:
+        stdout._local.buffer = previous
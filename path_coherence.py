@@ -26,10 +26,45 @@ Example:
                 {name}
 """
 
-from typing import List, Dict, Set, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 import re
 
 
+class _PathTrie:
+    """Prefix trie of dotted v2 paths, one node per path segment"""
+
+    def __init__(self, paths: List[str]):
+        self.root = {'children': {}, 'paths': []}
+        for path in paths:
+            node = self.root
+            for segment in path.split('.'):
+                node = node['children'].setdefault(segment, {'children': {}, 'paths': []})
+            node['paths'].append(path)
+
+    def common_lengths(self, segments: List[str]) -> Dict[str, int]:
+        """
+        Number of leading segments every path shares with segments, in one
+        walk down the trie instead of one comparison per path.
+        """
+        lengths = {}
+        node = self.root
+        for depth, segment in enumerate(segments + [None]):
+            on_path = node['children'].get(segment) if segment is not None else None
+            # Everything below this node but off the walked branch stops here
+            for path in node['paths']:
+                lengths[path] = depth
+            stack = [child for name, child in node['children'].items() if child is not on_path]
+            while stack:
+                below = stack.pop()
+                for path in below['paths']:
+                    lengths[path] = depth
+                stack.extend(below['children'].values())
+            if on_path is None:
+                break
+            node = on_path
+        return lengths
+
+
 class PathCoherenceScorer:
     """Score mapping suggestions based on structural coherence"""
 
@@ -37,6 +72,14 @@ class PathCoherenceScorer:
         self.v1_context_stack = []  # Track current loop context in v1
         self.v2_context_stack = []  # Track suggested v2 context
 
+        # Live ranking state, so pinning a manual mapping only re-ranks
+        # the fields it affects
+        self.pinned_mappings: Dict[str, str] = {}  # v1 field -> v2 path
+        self._rankings: Dict[str, Dict] = {}  # v1 field -> last rank_v2_candidates() call and result
+        self._candidate_owners: Dict[str, Set[str]] = {}  # v2 path -> v1 fields ranking it
+
+        self._parsed_paths: Dict[str, List[Dict]] = {}  # v2 path -> _parse_v2_path() result
+
     def parse_v1_structure(self, fields: List[str]) -> Dict[str, Dict]:
         """
         Parse v1 fields to understand loop structure and context
@@ -139,51 +182,65 @@ class PathCoherenceScorer:
 
         # Get v1 field context
         v1_info = v1_structure.get(v1_field, {})
-        v1_context_path = v1_info.get('context_path', [])
         v1_depth = v1_info.get('depth', 0)
 
-        # Parse v2 path to understand its structure
-        v2_parts = self._parse_v2_path(v2_candidate)
-        v2_depth = len([p for p in v2_parts if p['type'] == 'array'])
-
         # RULE 1: Depth Matching (30% weight)
         # Prefer v2 paths with similar nesting depth
-        if v1_depth == v2_depth:
-            score += 0.3
-        elif abs(v1_depth - v2_depth) == 1:
-            score += 0.15
-        # else: 0 points for depth
+        score += self._depth_score(v1_depth, self._array_depth(v2_candidate))
 
         # RULE 2: Context Path Coherence (40% weight)
         # If we're inside v2 loops, prefer paths that stay within those loops
         if current_v2_context:
-            v2_part_names = [p['name'] for p in v2_parts[:len(current_v2_context)]]
-            v2_candidate_prefix = '.'.join(v2_part_names)
             expected_prefix = '.'.join(current_v2_context)
-
-            if v2_candidate_prefix == expected_prefix or v2_candidate.startswith(expected_prefix):
-                score += 0.4  # Stays within current context
-            elif self._shares_common_prefix(v2_candidate, expected_prefix):
-                score += 0.2  # Partial match
-            # else: 0 points
+            shares_prefix = self._shares_common_prefix(v2_candidate, expected_prefix)
+            score += self._context_score(v2_candidate, current_v2_context, expected_prefix, shares_prefix)
 
         # RULE 3: Sibling Coherence (30% weight)
         # If siblings have been mapped to a certain v2 prefix, prefer same prefix
         if v1_info.get('siblings'):
-            sibling_v2_paths = self._get_sibling_v2_paths(
-                v1_info['siblings'],
-                other_v2_candidates
-            )
+            common_prefix = self._sibling_prefix(v1_info['siblings'], other_v2_candidates)
+            score += self._sibling_score(v2_candidate, common_prefix)
 
-            if sibling_v2_paths:
-                # Calculate most common prefix among siblings
-                common_prefix = self._find_common_prefix(sibling_v2_paths)
+        return min(score, 1.0)  # Cap at 1.0
 
-                if v2_candidate.startswith(common_prefix):
-                    coherence_ratio = len(common_prefix) / len(v2_candidate)
-                    score += 0.3 * coherence_ratio
+    def _depth_score(self, v1_depth: int, v2_depth: int) -> float:
+        """Rule 1: full points for equal loop depth, half for one level off"""
+        if v1_depth == v2_depth:
+            return 0.3
+        elif abs(v1_depth - v2_depth) == 1:
+            return 0.15
+        return 0.0
 
-        return min(score, 1.0)  # Cap at 1.0
+    def _context_score(self, v2_candidate: str, current_v2_context: List[str],
+                       expected_prefix: str, shares_prefix: bool) -> float:
+        """Rule 2: does the candidate stay inside the current v2 loops?"""
+        v2_parts = self._parse_v2_path(v2_candidate)
+        v2_candidate_prefix = '.'.join(p['name'] for p in v2_parts[:len(current_v2_context)])
+
+        if v2_candidate_prefix == expected_prefix or v2_candidate.startswith(expected_prefix):
+            return 0.4  # Stays within current context
+        elif shares_prefix:
+            return 0.2  # Partial match
+        return 0.0
+
+    def _sibling_prefix(self, siblings: List[str], other_v2_candidates: List[str]) -> Optional[str]:
+        """Common parent prefix of the v2 paths the siblings are mapped to (None if none are)"""
+        sibling_v2_paths = self._get_sibling_v2_paths(siblings, other_v2_candidates)
+        if not sibling_v2_paths:
+            return None
+        # Calculate most common prefix among the siblings' parent paths
+        return self._find_common_prefix([p.rsplit('.', 1)[0] for p in sibling_v2_paths])
+
+    def _sibling_score(self, v2_candidate: str, common_prefix: Optional[str]) -> float:
+        """Rule 3: share of the candidate covered by its siblings' common prefix"""
+        if common_prefix is not None and v2_candidate.startswith(common_prefix):
+            coherence_ratio = len(common_prefix) / len(v2_candidate)
+            return 0.3 * coherence_ratio
+        return 0.0
+
+    def _array_depth(self, v2_path: str) -> int:
+        """Number of array segments in a v2 path"""
+        return sum(1 for p in self._parse_v2_path(v2_path) if p['type'] == 'array')
 
     def _parse_v2_path(self, v2_path: str) -> List[Dict]:
         """
@@ -198,7 +255,13 @@ class PathCoherenceScorer:
                 {'type': 'array', 'name': 'services'},
                 {'type': 'field', 'name': 'name'}
             ]
+
+        Results are memoized per path; treat them as read-only.
         """
+        parts = self._parsed_paths.get(v2_path)
+        if parts is not None:
+            return parts
+
         parts = []
         segments = v2_path.split('.')
 
@@ -216,6 +279,7 @@ class PathCoherenceScorer:
         if parts and parts[-1]['type'] == 'object':
             parts[-1]['type'] = 'field'
 
+        self._parsed_paths[v2_path] = parts
         return parts
 
     def _shares_common_prefix(self, path1: str, path2: str) -> bool:
@@ -240,11 +304,13 @@ class PathCoherenceScorer:
         """
         Get v2 paths that siblings have been mapped to
 
-        This is a simplified version - in reality you'd look up
-        actual mappings from the database or current session
+        Uses the mappings pinned in this session (see pin_mapping()).
         """
-        # Placeholder: would query mapping database for sibling mappings
-        return []
+        return [
+            self.pinned_mappings[sibling]
+            for sibling in sibling_v1_fields
+            if sibling in self.pinned_mappings
+        ]
 
     def _find_common_prefix(self, paths: List[str]) -> str:
         """Find the longest common prefix among a list of paths"""
@@ -301,26 +367,174 @@ class PathCoherenceScorer:
                 other_v2_candidates=v2_paths
             )
 
-            # Determine confidence based on score
-            if coherence_score >= 0.7:
-                confidence = 'high'
-            elif coherence_score >= 0.4:
-                confidence = 'medium'
-            else:
-                confidence = 'low'
-
             ranked.append({
                 'v2_path': v2_path,
                 'match_reason': match_reason,
                 'coherence_score': coherence_score,
-                'confidence': confidence
+                'confidence': self._confidence(coherence_score)
             })
 
         # Sort by coherence score (highest first)
         ranked.sort(key=lambda x: x['coherence_score'], reverse=True)
 
+        self._remember_ranking(v1_field, v2_candidates, v1_structure, current_v2_context, ranked)
         return ranked
 
+    def rank_all_v2_candidates(
+        self,
+        field_candidates: Dict[str, List[Tuple[str, str]]],  # v1 field -> [(v2_path, match_reason), ...]
+        v1_structure: Dict,
+        v2_contexts: Dict[Tuple[str, ...], List[str]] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        Rank the v2 candidates of every field of a template in one call
+
+        Gives the same rankings as calling rank_v2_candidates() per field,
+        but shares the work between fields: each candidate path is parsed
+        once, the context rule is evaluated once per (loop scope, candidate)
+        through a prefix trie of all candidate paths, and the siblings'
+        common prefix is computed once per sibling group.
+
+        Args:
+            field_candidates: Candidates per v1 field
+            v1_structure: Parsed v1 structure from parse_v1_structure()
+            v2_contexts: v2 loop context per v1 loop scope, keyed by the
+                scope's context_path as a tuple (scopes not listed use [])
+
+        Returns:
+            {v1_field: ranked candidates}, as rank_v2_candidates() returns them
+        """
+        if v2_contexts is None:
+            v2_contexts = {}
+
+        all_paths = list(dict.fromkeys(
+            v2_path for candidates in field_candidates.values() for v2_path, _ in candidates
+        ))
+        trie = _PathTrie(all_paths)
+        array_depths = {v2_path: self._array_depth(v2_path) for v2_path in all_paths}
+
+        context_scores: Dict[Tuple[str, ...], Dict[str, float]] = {}  # v2 context -> v2 path -> rule 2 score
+        sibling_prefixes: Dict[Tuple[str, ...], Optional[str]] = {}  # sibling fields -> common prefix
+
+        rankings = {}
+        for v1_field, v2_candidates in field_candidates.items():
+            v1_info = v1_structure.get(v1_field, {})
+            v1_depth = v1_info.get('depth', 0)
+            current_v2_context = list(v2_contexts.get(tuple(v1_info.get('context_path', [])), []))
+
+            scores = None
+            if current_v2_context:
+                context_key = tuple(current_v2_context)
+                scores = context_scores.get(context_key)
+                if scores is None:
+                    expected_prefix = '.'.join(current_v2_context)
+                    common_lengths = trie.common_lengths(expected_prefix.split('.'))
+                    scores = context_scores[context_key] = {
+                        v2_path: self._context_score(v2_path, current_v2_context, expected_prefix,
+                                                     common_lengths[v2_path] >= 2)
+                        for v2_path in all_paths
+                    }
+
+            common_prefix = None
+            siblings = v1_info.get('siblings')
+            if siblings:
+                sibling_key = tuple(siblings)
+                if sibling_key not in sibling_prefixes:
+                    sibling_prefixes[sibling_key] = self._sibling_prefix(siblings, all_paths)
+                common_prefix = sibling_prefixes[sibling_key]
+
+            ranked = []
+            for v2_path, match_reason in v2_candidates:
+                coherence_score = self._depth_score(v1_depth, array_depths[v2_path])
+                if scores is not None:
+                    coherence_score += scores[v2_path]
+                coherence_score += self._sibling_score(v2_path, common_prefix)
+                coherence_score = min(coherence_score, 1.0)
+
+                ranked.append({
+                    'v2_path': v2_path,
+                    'match_reason': match_reason,
+                    'coherence_score': coherence_score,
+                    'confidence': self._confidence(coherence_score)
+                })
+
+            ranked.sort(key=lambda x: x['coherence_score'], reverse=True)
+            self._remember_ranking(v1_field, v2_candidates, v1_structure, current_v2_context, ranked)
+            rankings[v1_field] = ranked
+
+        return rankings
+
+    def _confidence(self, coherence_score: float) -> str:
+        """Confidence level for a coherence score"""
+        if coherence_score >= 0.7:
+            return 'high'
+        elif coherence_score >= 0.4:
+            return 'medium'
+        return 'low'
+
+    def _remember_ranking(self, v1_field: str, v2_candidates: List[Tuple[str, str]], v1_structure: Dict,
+                          current_v2_context: List[str], ranked: List[Dict]):
+        """Remember a ranking so pin_mapping() can refresh it in place"""
+        previous = self._rankings.get(v1_field)
+        if previous:
+            for old_path, _ in previous['v2_candidates']:
+                self._candidate_owners.get(old_path, set()).discard(v1_field)
+        self._rankings[v1_field] = {
+            'v2_candidates': list(v2_candidates),
+            'v1_structure': v1_structure,
+            'current_v2_context': current_v2_context,
+            'ranked': ranked
+        }
+        for v2_path, _ in v2_candidates:
+            self._candidate_owners.setdefault(v2_path, set()).add(v1_field)
+
+    def get_ranking(self, v1_field: str) -> List[Dict]:
+        """Last ranking computed for a v1 field (empty if never ranked)"""
+        entry = self._rankings.get(v1_field)
+        return entry['ranked'] if entry else []
+
+    def pin_mapping(self, v1_field: str, v2_path: str, v1_structure: Dict) -> Dict[str, List[Dict]]:
+        """
+        Pin a manual mapping and re-rank only the fields it affects.
+
+        Affected fields are the pinned field's siblings, the fields in the
+        same loop scope (same v1 context path), and every field that had the
+        pinned v2 path as a candidate. Only fields ranked earlier through
+        rank_v2_candidates() can be refreshed.
+
+        Args:
+            v1_field: The v1 field being pinned
+            v2_path: The v2 path it is pinned to
+            v1_structure: Parsed v1 structure from parse_v1_structure()
+
+        Returns:
+            {v1_field: new ranking} for every refreshed field
+        """
+        self.pinned_mappings[v1_field] = v2_path
+
+        affected = set(self._candidate_owners.get(v2_path, ()))
+        v1_info = v1_structure.get(v1_field, {})
+        context_path = v1_info.get('context_path')
+        for other, other_info in v1_structure.items():
+            if other_info.get('context_path') == context_path:
+                affected.add(other)  # Same loop scope
+            elif v1_field in other_info.get('siblings', []) or other in v1_info.get('siblings', []):
+                affected.add(other)
+        affected.discard(v1_field)
+
+        refreshed = {}
+        for field in sorted(affected):
+            entry = self._rankings.get(field)
+            if entry:
+                refreshed[field] = self.rank_v2_candidates(
+                    v1_field=field,
+                    v2_candidates=entry['v2_candidates'],
+                    v1_structure=entry['v1_structure'],
+                    current_v2_context=entry['current_v2_context']
+                )
+
+        return refreshed
+
 
 def main():
     """Test the path coherence scorer"""
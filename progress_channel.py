@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Progress Channel
+================
+
+In-process publish/subscribe for improvement session progress, and the
+Server-Sent Events stream built on it.
+
+SessionManager publishes a session's progress (the get_progress() dict)
+whenever it saves a change, and each /api/improvement-progress/<id>/stream
+connection subscribes to its session. Updates reach the browser as they
+happen instead of on the next 2-second poll, and nothing is read from disk
+while the improvement runs in the same process.
+
+Work started in another worker process publishes to that process's
+channel. The stream therefore also calls get_progress() after each quiet
+poll_interval; SessionManager only re-reads a session when its files have
+changed, so an idle check costs a few stat() calls.
+
+Each open stream occupies a request thread for up to MAX_STREAM_SECONDS,
+so the app must run under a threaded or async gunicorn worker class (see
+the Procfile); a sync worker would be blocked and then killed by its
+timeout.
+"""
+
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Set
+
+TERMINAL_STATUSES = ('complete', 'completed', 'failed')
+
+SSE_RETRY_MS = 1000          # Browser reconnect delay after a stream ends
+HEARTBEAT_SECONDS = 15       # Comment lines that keep idle proxies from closing the stream
+MISSING_TIMEOUT_SECONDS = 30  # Give up on a session that never appears
+MAX_STREAM_SECONDS = 600     # Streams end after this; EventSource reconnects
+
+
+class ProgressChannel:
+    """Latest progress per session, pushed to every subscriber's queue"""
+
+    def __init__(self, queue_size: int = 64, max_sessions: int = 256):
+        """
+        Args:
+            queue_size: Updates buffered per subscriber (a slow one loses its oldest)
+            max_sessions: Sessions whose latest progress is kept for new subscribers
+        """
+        self.queue_size = queue_size
+        self.max_sessions = max_sessions
+        self._subscribers: Dict[str, Set[queue.Queue]] = {}
+        self._latest = OrderedDict()  # session_id -> last published progress
+        self._lock = threading.Lock()
+
+    def publish(self, session_id: str, progress: Dict):
+        """Send progress to the session's subscribers"""
+        with self._lock:
+            self._latest[session_id] = progress
+            self._latest.move_to_end(session_id)
+            while len(self._latest) > self.max_sessions:
+                self._latest.popitem(last=False)
+            subscribers = list(self._subscribers.get(session_id, ()))
+
+        for updates in subscribers:
+            try:
+                updates.put_nowait(progress)
+            except queue.Full:
+                # Only the newest progress matters; drop the oldest
+                try:
+                    updates.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    updates.put_nowait(progress)
+                except queue.Full:
+                    pass
+
+    def latest(self, session_id: str) -> Optional[Dict]:
+        """The last progress published for a session in this process, or None"""
+        with self._lock:
+            return self._latest.get(session_id)
+
+    @contextmanager
+    def subscribe(self, session_id: str) -> Iterator[queue.Queue]:
+        """A queue receiving the session's progress until the block exits"""
+        updates = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add(updates)
+        try:
+            yield updates
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(session_id)
+                if subscribers is not None:
+                    subscribers.discard(updates)
+                    if not subscribers:
+                        del self._subscribers[session_id]
+
+    def subscriber_count(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(session_id, ()))
+
+
+def progress_stream(session_id: str, get_progress: Callable[[str], Dict],
+                    channel: 'ProgressChannel' = None, poll_interval: float = 1.0,
+                    heartbeat: float = HEARTBEAT_SECONDS, missing_timeout: float = MISSING_TIMEOUT_SECONDS,
+                    max_duration: float = MAX_STREAM_SECONDS) -> Iterator[str]:
+    """
+    Server-Sent Events for one session's progress.
+
+    Each changed progress dict is sent as a data: line. The stream ends
+    after a terminal status, when the session hasn't appeared within
+    missing_timeout (with an error event) or after max_duration.
+
+    Args:
+        session_id: Improvement session ID
+        get_progress: SessionManager.get_progress (reads saved progress)
+        channel: Channel to subscribe to (default: progress_channel)
+        poll_interval: Seconds without an update before checking saved progress
+        heartbeat: Seconds without output before a keep-alive comment
+        missing_timeout: Seconds to wait for an unknown session
+        max_duration: Seconds before the stream ends and the browser reconnects
+
+    Yields:
+        SSE text
+    """
+    channel = channel or progress_channel
+    yield f"retry: {SSE_RETRY_MS}\n\n"
+
+    with channel.subscribe(session_id) as updates:
+        started = last_output = time.monotonic()
+        last_sent = None
+        progress = channel.latest(session_id) or get_progress(session_id)
+
+        while True:
+            now = time.monotonic()
+            if progress and progress.get('success'):
+                data = json.dumps(progress)
+                if data != last_sent:
+                    yield f"data: {data}\n\n"
+                    last_sent, last_output = data, now
+                if progress.get('status') in TERMINAL_STATUSES:
+                    return
+            elif last_sent is None and now - started > missing_timeout:
+                yield f"data: {json.dumps({'success': False, 'error': 'Session not found'})}\n\n"
+                return
+
+            if now - started > max_duration:
+                return
+            if now - last_output > heartbeat:
+                yield ": keep-alive\n\n"
+                last_output = now
+
+            try:
+                progress = updates.get(timeout=poll_interval)
+            except queue.Empty:
+                # Progress saved by another process
+                progress = get_progress(session_id)
+
+
+# Process-wide channel SessionManager publishes to
+progress_channel = ProgressChannel()
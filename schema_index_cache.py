@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Schema Index Cache
+==================
+
+Persists SemanticMatcher field indexes to disk, keyed by schema fingerprint.
+
+V2 merge data has the same shape for every project in an account, so the
+FieldInfo index (and the normalized name features used by name similarity)
+only needs to be built once per schema version. The fingerprint is a hash of
+the sorted (path, type) list, so sample values and array lengths never
+change it.
+
+Files are written with marshal (compact, stdlib, no code execution on load)
+behind a small header, and read back through mmap so the payload is decoded
+straight from the page cache without an intermediate copy.
+"""
+
+import hashlib
+import marshal
+import mmap
+import os
+import tempfile
+from dataclasses import astuple
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from semantic_matcher import FieldInfo
+
+MAGIC = b'SSIX'
+FORMAT_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 1
+
+
+def schema_fingerprint(structure: Dict) -> str:
+    """
+    Hash the shape of a structure: its sorted (path, type) pairs.
+
+    Args:
+        structure: Output from DataStructureExtractor.extract_structure()
+
+    Returns:
+        Hex digest identifying the schema
+    """
+    digest = hashlib.sha256()
+    for path in sorted(structure):
+        digest.update(f"{path}\t{structure[path].get('type', 'unknown')}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SchemaIndexCache:
+    """
+    On-disk cache of field indexes keyed by schema fingerprint.
+
+    Loaded entries are also kept in memory, so repeated matching runs in the
+    same process skip the disk read too.
+    """
+
+    def __init__(self, cache_dir=None):
+        """
+        Args:
+            cache_dir: Directory for index files (default: ~/.scopestack/schema_index)
+        """
+        if cache_dir is None:
+            cache_dir = Path.home() / '.scopestack' / 'schema_index'
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._memory: Dict[str, Tuple[Dict[str, FieldInfo], Dict]] = {}
+
+    def _file_for(self, fingerprint: str) -> Path:
+        return self.cache_dir / f"{fingerprint}.idx"
+
+    def load(self, fingerprint: str) -> Optional[Tuple[Dict[str, FieldInfo], Dict]]:
+        """
+        Load a cached index.
+
+        Returns:
+            (index, name_features) or None if nothing usable is cached
+        """
+        if fingerprint in self._memory:
+            return self._memory[fingerprint]
+
+        path = self._file_for(fingerprint)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if mm[:len(MAGIC)] != MAGIC or mm[len(MAGIC)] != FORMAT_VERSION:
+                        return None
+                    with memoryview(mm) as view:
+                        payload = marshal.loads(view[HEADER_SIZE:])
+        except (OSError, ValueError, EOFError, TypeError) as e:
+            print(f"⚠️  Could not read schema index {path.name}: {e}")
+            return None
+
+        if payload.get('fingerprint') != fingerprint:
+            return None
+
+        index = {}
+        for row in payload['fields']:
+            info = FieldInfo(*row)
+            index[info.path] = info
+        features = {name: (norm, list(words)) for name, (norm, words) in payload['features'].items()}
+
+        self._memory[fingerprint] = (index, features)
+        return index, features
+
+    def save(self, fingerprint: str, index: Dict[str, FieldInfo], features: Dict):
+        """
+        Persist an index and its name features.
+
+        The file is written to a temporary name and moved into place, so
+        concurrent readers never see a partial file.
+        """
+        payload = {
+            'fingerprint': fingerprint,
+            'fields': [astuple(info) for info in index.values()],
+            'features': {name: (norm, tuple(words)) for name, (norm, words) in features.items()},
+        }
+        data = MAGIC + bytes([FORMAT_VERSION]) + marshal.dumps(payload)
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._file_for(fingerprint))
+        except OSError as e:
+            print(f"⚠️  Could not save schema index: {e}")
+            return
+
+        self._memory[fingerprint] = (index, features)
+
+    def clear(self):
+        """Remove every cached index"""
+        self._memory.clear()
+        for path in self.cache_dir.glob('*.idx'):
+            path.unlink()
@@ -51,7 +51,9 @@ def convert_template(input_path: str, output_path: str = None):
         base = Path(input_path).stem
         output_path = f"{base}_converted.docx"
 
-    converter = TemplateConverter(input_path, output_path)
+    # Learned mappings, once `python mapping_artifact.py` has compiled them
+    from mapping_artifact import load_existing_compiled_mappings
+    converter = TemplateConverter(input_path, output_path, compiled=load_existing_compiled_mappings())
     success = converter.convert()
 
     if success:
@@ -19,10 +19,14 @@ This enables matching even when:
 """
 
 from typing import Dict, List, Tuple, Optional, Set
-from dataclasses import dataclass
+from dataclasses import dataclass, astuple, replace
 from difflib import SequenceMatcher
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import re
 
+from data_structure_extractor import StructureTable
+
 
 @dataclass
 class FieldInfo:
@@ -47,10 +51,35 @@ class MatchResult:
     v1_path: str
     v2_path: str
     confidence: float
-    match_type: str  # 'exact', 'name', 'structural', 'fuzzy'
+    match_type: str  # 'identical', 'exact', 'name', 'structural', 'fuzzy'
     reasons: List[str]
 
 
+@dataclass
+class MatchState:
+    """
+    Live matching state kept between suggestion refreshes.
+
+    Built once by SemanticMatcher.build_match_state(); pin_mapping() and
+    unpin_mapping() then re-rank only the fields a manual mapping affects.
+    """
+    v1_index: Dict[str, FieldInfo]
+    v2_index: Dict[str, FieldInfo]
+    candidates: Dict[str, List[Tuple[str, float, str, List[str]]]]  # v1 path -> scored candidates
+    candidate_owners: Dict[str, Set[str]]  # v2 path -> v1 paths that have it as a candidate
+    by_parent: Dict[Optional[str], List[str]]  # v1 parent path -> v1 paths
+    by_scope: Dict[Optional[str], List[str]]  # v1 loop scope -> v1 paths
+    best: Dict[str, MatchResult]
+    pinned: Dict[str, str]
+    min_confidence: float = 0.5
+
+    def results(self) -> List[MatchResult]:
+        """Current best match per V1 field, in find_best_matches() order"""
+        matches = [self.best[p] for p in self.v1_index if p in self.best]
+        matches.sort(key=lambda m: m.confidence, reverse=True)
+        return matches
+
+
 class SemanticMatcher:
     """
     Matches V1 fields to V2 fields using semantic analysis.
@@ -85,11 +114,39 @@ class SemanticMatcher:
         'task': {'job', 'work', 'activity'},
     }
 
+    # Priority order for match types when confidences tie
+    TYPE_PRIORITY = {'identical': 5, 'exact': 4, 'name': 3, 'structural': 2, 'fuzzy': 1, 'none': 0}
+
+    # Coherence bonuses applied around pinned (manual) mappings
+    PINNED_SIBLING_BONUS = 0.1
+    PINNED_SCOPE_BONUS = 0.05
+
     def __init__(self,
                  name_similarity_threshold: float = 0.8,
-                 structural_threshold: float = 0.7):
+                 structural_threshold: float = 0.7,
+                 workers: int = 1,
+                 index_cache=None):
+        """
+        Args:
+            name_similarity_threshold: Minimum name similarity for a 'name' match
+            structural_threshold: Minimum structural similarity
+            workers: Default number of worker processes for find_best_matches()
+                     and match_arrays(). 1 (the default) runs serially.
+            index_cache: Optional SchemaIndexCache; field indexes and name
+                         features are then built once per schema fingerprint
+        """
         self.name_threshold = name_similarity_threshold
         self.structural_threshold = structural_threshold
+        self.workers = workers
+        self.index_cache = index_cache
+        # name -> (normalized name, component words)
+        self._name_features: Dict[str, Tuple[str, List[str]]] = {}
+
+    def __getstate__(self):
+        # Worker processes never touch the on-disk cache
+        state = self.__dict__.copy()
+        state['index_cache'] = None
+        return state
 
     def build_field_index(self, structure: Dict) -> Dict[str, FieldInfo]:
         """
@@ -101,6 +158,30 @@ class SemanticMatcher:
         Returns:
             Dict mapping field paths to FieldInfo objects
         """
+        if self.index_cache is None:
+            return self._build_field_index(structure)
+
+        from schema_index_cache import schema_fingerprint
+
+        fingerprint = schema_fingerprint(structure)
+        cached = self.index_cache.load(fingerprint)
+
+        if cached is None:
+            index = self._build_field_index(structure)
+            self.index_cache.save(fingerprint, index, self._features_for_index(index))
+            return index
+
+        index, features = cached
+        self._name_features.update(features)
+
+        # Array lengths are project data, not schema - take them from this structure
+        return {
+            path: replace(info, array_count=structure[path].get('array_count', 0)) if info.is_array else info
+            for path, info in index.items()
+        }
+
+    def _build_field_index(self, structure: Dict) -> Dict[str, FieldInfo]:
+        """Build a field index from scratch (see build_field_index)"""
         index = {}
 
         for path, info in structure.items():
@@ -113,9 +194,12 @@ class SemanticMatcher:
             # Get parent path
             parent_path = self._get_parent_path(path)
 
-            # Get children
-            children = [p for p in structure.keys()
-                       if p.startswith(path + '.') or p.startswith(path + '[')]
+            # Get children (a StructureTable already links them, no need to scan)
+            if isinstance(structure, StructureTable):
+                children = list(structure.descendant_paths(path))
+            else:
+                children = [p for p in structure.keys()
+                           if p.startswith(path + '.') or p.startswith(path + '[')]
 
             field_info = FieldInfo(
                 path=path,
@@ -132,6 +216,15 @@ class SemanticMatcher:
 
         return index
 
+    def _features_for_index(self, index: Dict[str, FieldInfo]) -> Dict[str, Tuple[str, List[str]]]:
+        """Name features for every field and parent name in an index"""
+        names = set()
+        for info in index.values():
+            names.add(info.name)
+            if info.parent_path:
+                names.add(self._get_field_name(info.parent_path))
+        return {name: self._name_feature(name) for name in names}
+
     def find_matches(self,
                      v1_structure: Dict,
                      v2_structure: Dict,
@@ -178,7 +271,8 @@ class SemanticMatcher:
     def find_best_matches(self,
                           v1_structure: Dict,
                           v2_structure: Dict,
-                          min_confidence: float = 0.5) -> List[MatchResult]:
+                          min_confidence: float = 0.5,
+                          workers: Optional[int] = None) -> List[MatchResult]:
         """
         Find the single best V2 match for each V1 field.
 
@@ -190,6 +284,9 @@ class SemanticMatcher:
             v1_structure: V1 schema from DataStructureExtractor
             v2_structure: V2 schema from DataStructureExtractor
             min_confidence: Minimum confidence to include in results
+            workers: Number of worker processes to shard V1 fields across
+                     (defaults to self.workers). Output is identical to the
+                     serial mode.
 
         Returns:
             List of MatchResult objects (one per V1 field), sorted by confidence
@@ -197,40 +294,322 @@ class SemanticMatcher:
         v1_index = self.build_field_index(v1_structure)
         v2_index = self.build_field_index(v2_structure)
 
-        # Priority order for match types
-        type_priority = {'exact': 4, 'name': 3, 'structural': 2, 'fuzzy': 1, 'none': 0}
+        best_matches = self._best_matches(list(v1_index.items()), v2_index, min_confidence, workers)
+
+        # Sort final results by confidence (descending)
+        best_matches.sort(key=lambda m: m.confidence, reverse=True)
+
+        return best_matches
+
+    def match_with_diff(self,
+                        v1_structure: StructureTable,
+                        v2_structure: StructureTable,
+                        min_confidence: float = 0.5,
+                        workers: Optional[int] = None):
+        """
+        Best matches with identical subtrees paired up front.
+
+        Subtrees whose hashes agree (see structure_diff.diff_structures) are
+        matched field-for-field with confidence 1.0 and no scoring. Only the
+        residual V1 fields are scored, and only against the residual V2
+        fields, so the quadratic part of matching shrinks to what actually
+        changed between the schemas.
+
+        Args:
+            v1_structure: V1 StructureTable from DataStructureExtractor
+            v2_structure: V2 StructureTable from DataStructureExtractor
+            min_confidence: Minimum confidence for scored (residual) matches
+            workers: Worker processes for scoring (defaults to self.workers)
+
+        Returns:
+            (StructureDiff, list of MatchResult sorted by confidence)
+        """
+        from structure_diff import diff_structures
+
+        diff = diff_structures(v1_structure, v2_structure)
+
+        roots = dict(diff.subtree_pairs)
+        matches = []
+        root = None
+        for v1_path, v2_path in diff.pairs.items():
+            if v1_path in roots:
+                root = v1_path
+            matches.append(MatchResult(
+                v1_path=v1_path,
+                v2_path=v2_path,
+                confidence=1.0,
+                match_type='identical',
+                reasons=[f"Identical subtree: '{root}' = '{roots[root]}'"]
+            ))
+
+        v1_index = self.build_field_index(v1_structure)
+        v2_index = self.build_field_index(v2_structure)
+        v2_residual = {path: v2_index[path] for path in diff.v2_residual}
+
+        if v2_residual:
+            v1_items = [(path, v1_index[path]) for path in diff.v1_residual]
+            matches.extend(self._best_matches(v1_items, v2_residual, min_confidence, workers))
+
+        matches.sort(key=lambda m: m.confidence, reverse=True)
+        return diff, matches
+
+    def _best_matches(self,
+                      v1_items: List[Tuple[str, FieldInfo]],
+                      v2_index: Dict[str, FieldInfo],
+                      min_confidence: float,
+                      workers: Optional[int] = None) -> List[MatchResult]:
+        """Best match per V1 field, serially or sharded across worker processes"""
+        workers = self.workers if workers is None else workers
+
+        if workers > 1 and len(v1_items) > 1:
+            return self._run_sharded(
+                _best_match_shard,
+                v1_items,
+                workers,
+                (self, _pack_index(v2_index), None, min_confidence)
+            )
 
         best_matches = []
+        for v1_path, v1_info in v1_items:
+            match = self._best_match_for(v1_path, v1_info, v2_index, min_confidence)
+            if match:
+                best_matches.append(match)
+        return best_matches
+
+    def _best_match_for(self,
+                        v1_path: str,
+                        v1_info: FieldInfo,
+                        v2_index: Dict[str, FieldInfo],
+                        min_confidence: float) -> Optional[MatchResult]:
+        """Pick the best V2 candidate for one V1 field, or None if below min_confidence"""
+        candidates = self._find_candidates(v1_info, v2_index)
+
+        if not candidates:
+            return None
+
+        # Sort candidates by confidence (desc), then by match_type priority (desc)
+        candidates.sort(
+            key=lambda c: (c[1], self.TYPE_PRIORITY.get(c[2], 0)),
+            reverse=True
+        )
+
+        # Take the best candidate
+        v2_path, confidence, match_type, reasons = candidates[0]
+
+        if confidence < min_confidence:
+            return None
+
+        return MatchResult(
+            v1_path=v1_path,
+            v2_path=v2_path,
+            confidence=confidence,
+            match_type=match_type,
+            reasons=reasons
+        )
+
+    def _run_sharded(self, shard_fn, items: List, workers: int, shared: Tuple) -> List:
+        """
+        Run shard_fn over contiguous shards of items in a process pool.
+
+        `shared` is handed to every worker once through the pool initializer
+        (inherited on fork, pickled elsewhere). Shards are contiguous and
+        results are concatenated in submission order, so the merged list is
+        in the same order the serial loop would produce.
+        """
+        workers = min(workers, len(items))
+        shard_size = -(-len(items) // workers)  # ceil division
+        shards = [items[i:i + shard_size] for i in range(0, len(items), shard_size)]
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+        with ProcessPoolExecutor(max_workers=len(shards),
+                                 mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=shared) as pool:
+            results = []
+            for shard_results in pool.map(shard_fn, shards):
+                results.extend(shard_results)
+
+        return results
+
+    # ==================== Live Match State ====================
+
+    def build_match_state(self,
+                          v1_structure: Dict,
+                          v2_structure: Dict,
+                          min_confidence: float = 0.5,
+                          pinned: Dict[str, str] = None) -> MatchState:
+        """
+        Score every V1 field once and keep the candidates for later re-ranking.
+
+        With no pinned mappings, state.results() equals find_best_matches().
+
+        Args:
+            v1_structure: V1 schema from DataStructureExtractor
+            v2_structure: V2 schema from DataStructureExtractor
+            min_confidence: Minimum confidence for a best match
+            pinned: Optional existing manual mappings {v1_path: v2_path}
+
+        Returns:
+            MatchState to pass to pin_mapping() / unpin_mapping()
+        """
+        v1_index = self.build_field_index(v1_structure)
+        v2_index = self.build_field_index(v2_structure)
+
+        # Keep candidates that a coherence bonus could still lift over the threshold
+        floor = min_confidence - self.PINNED_SIBLING_BONUS - self.PINNED_SCOPE_BONUS
+
+        state = MatchState(
+            v1_index=v1_index,
+            v2_index=v2_index,
+            candidates={},
+            candidate_owners={},
+            by_parent={},
+            by_scope={},
+            best={},
+            pinned={},
+            min_confidence=min_confidence
+        )
 
         for v1_path, v1_info in v1_index.items():
-            candidates = self._find_candidates(v1_info, v2_index)
+            candidates = [c for c in self._find_candidates(v1_info, v2_index) if c[1] >= floor]
+            state.candidates[v1_path] = candidates
+            for v2_path, _, _, _ in candidates:
+                state.candidate_owners.setdefault(v2_path, set()).add(v1_path)
+            state.by_parent.setdefault(v1_info.parent_path, []).append(v1_path)
+            state.by_scope.setdefault(self._loop_scope(v1_path), []).append(v1_path)
 
-            if not candidates:
-                continue
+        for v1_path, v2_path in (pinned or {}).items():
+            if v1_path in v1_index:
+                state.pinned[v1_path] = v2_path
 
-            # Sort candidates by confidence (desc), then by match_type priority (desc)
-            candidates.sort(
-                key=lambda c: (c[1], type_priority.get(c[2], 0)),
-                reverse=True
-            )
+        for v1_path in v1_index:
+            self._rerank(state, v1_path)
 
-            # Take the best candidate
-            best = candidates[0]
-            v2_path, confidence, match_type, reasons = best
+        return state
 
-            if confidence >= min_confidence:
-                best_matches.append(MatchResult(
-                    v1_path=v1_path,
-                    v2_path=v2_path,
-                    confidence=confidence,
-                    match_type=match_type,
-                    reasons=reasons
-                ))
+    def pin_mapping(self, state: MatchState, v1_path: str, v2_path: str) -> List[MatchResult]:
+        """
+        Pin a manual mapping and re-rank only the fields it affects.
 
-        # Sort final results by confidence (descending)
-        best_matches.sort(key=lambda m: m.confidence, reverse=True)
+        Affected fields are the pinned field's siblings, the fields in the
+        same loop scope, and every field that had the pinned V2 path (or the
+        V2 path it was previously pinned to) as a candidate.
 
-        return best_matches
+        Returns:
+            Updated best matches for the affected fields (pinned field first)
+        """
+        previous = state.pinned.get(v1_path)
+        state.pinned[v1_path] = v2_path
+
+        affected = self._affected_fields(state, v1_path, {v2_path, previous})
+        return self._rerank_fields(state, [v1_path] + sorted(affected))
+
+    def unpin_mapping(self, state: MatchState, v1_path: str) -> List[MatchResult]:
+        """
+        Remove a pinned mapping and re-rank the fields it affected.
+
+        Returns:
+            Updated best matches for the affected fields
+        """
+        previous = state.pinned.pop(v1_path, None)
+        if previous is None:
+            return []
+
+        affected = self._affected_fields(state, v1_path, {previous})
+        return self._rerank_fields(state, [v1_path] + sorted(affected))
+
+    def _affected_fields(self, state: MatchState, v1_path: str, v2_paths: Set[Optional[str]]) -> Set[str]:
+        """Siblings, same-scope fields and owners of the given V2 paths"""
+        affected = set()
+
+        v1_info = state.v1_index.get(v1_path)
+        if v1_info:
+            affected.update(state.by_parent.get(v1_info.parent_path, []))
+        affected.update(state.by_scope.get(self._loop_scope(v1_path), []))
+
+        for v2_path in v2_paths:
+            if v2_path:
+                affected.update(state.candidate_owners.get(v2_path, ()))
+
+        affected.discard(v1_path)
+        return affected
+
+    def _rerank_fields(self, state: MatchState, v1_paths: List[str]) -> List[MatchResult]:
+        updated = []
+        for path in v1_paths:
+            if path in state.v1_index:
+                self._rerank(state, path)
+                if path in state.best:
+                    updated.append(state.best[path])
+        return updated
+
+    def _rerank(self, state: MatchState, v1_path: str):
+        """Recompute the best match for one V1 field from its stored candidates"""
+        if v1_path in state.pinned:
+            state.best[v1_path] = MatchResult(
+                v1_path=v1_path,
+                v2_path=state.pinned[v1_path],
+                confidence=1.0,
+                match_type='manual',
+                reasons=['Pinned manual mapping']
+            )
+            return
+
+        v1_info = state.v1_index[v1_path]
+        taken = set(state.pinned.values())
+
+        # Where pinned neighbours landed in V2
+        parent_anchor = None
+        scope_anchor = None
+        v1_scope = self._loop_scope(v1_path)
+        for pinned_v1, pinned_v2 in state.pinned.items():
+            pinned_info = state.v1_index.get(pinned_v1)
+            if pinned_info and pinned_info.parent_path == v1_info.parent_path:
+                parent_anchor = self._get_parent_path(pinned_v2)
+            if v1_scope is not None and self._loop_scope(pinned_v1) == v1_scope:
+                scope_anchor = self._loop_scope(pinned_v2)
+
+        scored = []
+        for v2_path, confidence, match_type, reasons in state.candidates[v1_path]:
+            if v2_path in taken:
+                continue
+
+            if parent_anchor is not None and state.v2_index[v2_path].parent_path == parent_anchor:
+                confidence += self.PINNED_SIBLING_BONUS
+                reasons = reasons + [f"Sibling of pinned mapping under '{parent_anchor}'"]
+            elif scope_anchor is not None and self._loop_scope(v2_path) == scope_anchor:
+                confidence += self.PINNED_SCOPE_BONUS
+                reasons = reasons + [f"Same loop as pinned mapping ('{scope_anchor}')"]
+
+            scored.append((v2_path, min(confidence, 1.0), match_type, reasons))
+
+        scored.sort(key=lambda c: (c[1], self.TYPE_PRIORITY.get(c[2], 0)), reverse=True)
+
+        if scored and scored[0][1] >= state.min_confidence:
+            v2_path, confidence, match_type, reasons = scored[0]
+            state.best[v1_path] = MatchResult(
+                v1_path=v1_path,
+                v2_path=v2_path,
+                confidence=confidence,
+                match_type=match_type,
+                reasons=reasons
+            )
+        else:
+            state.best.pop(v1_path, None)
+
+    def _loop_scope(self, path: str) -> Optional[str]:
+        """
+        The innermost array a path lives in.
+
+        Examples:
+            'locations[0].name' -> 'locations'
+            'phases[0].tasks[0].name' -> 'phases[0].tasks'
+            'project_name' -> None
+        """
+        match = re.match(r'^(.*)\[\d+\]', path)
+        return match.group(1) if match else None
 
     def _find_candidates(self,
                          v1_info: FieldInfo,
@@ -342,21 +721,19 @@ class SemanticMatcher:
             return 1.0
 
         # Normalize names (lowercase, remove underscores/hyphens)
-        n1 = self._normalize_name(name1)
-        n2 = self._normalize_name(name2)
+        n1, words1 = self._name_feature(name1)
+        n2, words2 = self._name_feature(name2)
 
         if n1 == n2:
             return 0.95  # Almost exact after normalization
 
         # Check for synonym match (handles compound names with synonyms)
-        synonym_score = self._check_synonyms(n1, n2)
+        synonym_score = self._check_synonyms(n1, n2, words1, words2)
         if synonym_score > 0:
             return synonym_score
 
         # Check if one name is a word component of the other
         # e.g., 'name' is in 'project_name' or 'site_name'
-        words1 = self._split_words(n1)
-        words2 = self._split_words(n2)
 
         # If simple name matches exactly as a word in compound name
         if len(words1) == 1 and words1[0] in words2:
@@ -369,11 +746,23 @@ class SemanticMatcher:
         # Use SequenceMatcher for fuzzy matching
         return SequenceMatcher(None, n1, n2).ratio()
 
-    def _check_synonyms(self, n1: str, n2: str) -> float:
+    def _name_feature(self, name: str) -> Tuple[str, List[str]]:
+        """Normalized name and its component words, memoized per raw name"""
+        feature = self._name_features.get(name)
+        if feature is None:
+            normalized = self._normalize_name(name)
+            feature = (normalized, self._split_words(normalized))
+            self._name_features[name] = feature
+        return feature
+
+    def _check_synonyms(self, n1: str, n2: str,
+                        words1: List[str] = None, words2: List[str] = None) -> float:
         """Check if two names are synonyms. Returns score if match, 0 otherwise."""
         # Split compound names into words (e.g., 'clientname' -> ['client', 'name'])
-        words1 = self._split_words(n1)
-        words2 = self._split_words(n2)
+        if words1 is None:
+            words1 = self._split_words(n1)
+        if words2 is None:
+            words2 = self._split_words(n2)
 
         # Count exact matches and synonym matches
         exact_matches = 0
@@ -526,13 +915,19 @@ class SemanticMatcher:
     def match_arrays(self,
                      v1_structure: Dict,
                      v2_structure: Dict,
-                     min_confidence: float = 0.6) -> List[MatchResult]:
+                     min_confidence: float = 0.6,
+                     workers: Optional[int] = None) -> List[MatchResult]:
         """
         Find matching array structures between V1 and V2.
 
         This is specifically for matching entire arrays (like language_fields[])
         rather than individual fields within arrays.
 
+        Args:
+            workers: Number of worker processes to shard V1 arrays across
+                     (defaults to self.workers). Output is identical to the
+                     serial mode.
+
         Returns list of array-level matches.
         """
         v1_index = self.build_field_index(v1_structure)
@@ -542,31 +937,66 @@ class SemanticMatcher:
         v1_arrays = {k: v for k, v in v1_index.items() if v.is_array}
         v2_arrays = {k: v for k, v in v2_index.items() if v.is_array}
 
-        matches = []
+        workers = self.workers if workers is None else workers
+
+        # Item fields for each V2 array are needed by every V1 array, so
+        # compute them once up front
+        v2_fields = {p: self._get_array_item_fields(p, v2_structure) for p in v2_arrays}
+        v1_items = [
+            (v1_path, v1_info, self._get_array_item_fields(v1_path, v1_structure))
+            for v1_path, v1_info in v1_arrays.items()
+        ]
+
+        if workers > 1 and len(v1_items) > 1:
+            matches = self._run_sharded(
+                _array_match_shard,
+                v1_items,
+                workers,
+                (self, _pack_index(v2_arrays), v2_fields, min_confidence)
+            )
+        else:
+            matches = []
+            for v1_path, v1_info, v1_fields in v1_items:
+                match = self._best_array_match_for(
+                    v1_path, v1_info, v1_fields, v2_arrays, v2_fields, min_confidence
+                )
+                if match:
+                    matches.append(match)
 
-        for v1_path, v1_info in v1_arrays.items():
-            best_match = None
-            best_score = 0
+        return sorted(matches, key=lambda m: m.confidence, reverse=True)
 
-            for v2_path, v2_info in v2_arrays.items():
-                # Calculate array structure similarity
-                score, match_type, reasons = self._calculate_array_match(v1_info, v2_info, v1_structure, v2_structure)
+    def _best_array_match_for(self,
+                              v1_path: str,
+                              v1_info: FieldInfo,
+                              v1_fields: List[str],
+                              v2_arrays: Dict[str, FieldInfo],
+                              v2_fields: Dict[str, List[str]],
+                              min_confidence: float) -> Optional[MatchResult]:
+        """Pick the best V2 array for one V1 array, or None if nothing reaches min_confidence"""
+        best_match = None
+        best_score = 0
+
+        for v2_path, v2_info in v2_arrays.items():
+            # Calculate array structure similarity
+            score, match_type, reasons = self._score_array_match(
+                v1_info, v2_info, v1_fields, v2_fields[v2_path]
+            )
 
-                if score > best_score and score >= min_confidence:
-                    best_score = score
-                    best_match = (v2_path, score, match_type, reasons)
+            if score > best_score and score >= min_confidence:
+                best_score = score
+                best_match = (v2_path, score, match_type, reasons)
 
-            if best_match:
-                v2_path, confidence, match_type, reasons = best_match
-                matches.append(MatchResult(
-                    v1_path=v1_path,
-                    v2_path=v2_path,
-                    confidence=confidence,
-                    match_type='array_' + match_type,
-                    reasons=reasons
-                ))
+        if not best_match:
+            return None
 
-        return sorted(matches, key=lambda m: m.confidence, reverse=True)
+        v2_path, confidence, match_type, reasons = best_match
+        return MatchResult(
+            v1_path=v1_path,
+            v2_path=v2_path,
+            confidence=confidence,
+            match_type='array_' + match_type,
+            reasons=reasons
+        )
 
     def _calculate_array_match(self,
                                v1: FieldInfo,
@@ -576,6 +1006,18 @@ class SemanticMatcher:
         """
         Calculate match score for two arrays based on their internal structure.
         """
+        return self._score_array_match(
+            v1, v2,
+            self._get_array_item_fields(v1.path, v1_structure),
+            self._get_array_item_fields(v2.path, v2_structure)
+        )
+
+    def _score_array_match(self,
+                           v1: FieldInfo,
+                           v2: FieldInfo,
+                           v1_fields: List[str],
+                           v2_fields: List[str]) -> Tuple[float, str, List[str]]:
+        """Score two arrays given the field names found inside their items"""
         reasons = []
         scores = []
 
@@ -586,9 +1028,6 @@ class SemanticMatcher:
             scores.append(name_sim * 0.3)
 
         # 2. Child field similarity (most important for arrays)
-        v1_fields = self._get_array_item_fields(v1.path, v1_structure)
-        v2_fields = self._get_array_item_fields(v2.path, v2_structure)
-
         if v1_fields and v2_fields:
             # Compare field names
             v1_names = set(self._get_field_name(f) for f in v1_fields)
@@ -600,7 +1039,9 @@ class SemanticMatcher:
             if union:
                 field_sim = len(common) / len(union)
                 if field_sim > 0:
-                    reasons.append(f"Common fields: {common} ({field_sim:.0%})")
+                    # Sorted so the reason text does not depend on set ordering
+                    common_names = ', '.join(repr(n) for n in sorted(common))
+                    reasons.append(f"Common fields: {{{common_names}}} ({field_sim:.0%})")
                     scores.append(field_sim * 0.5)
 
         # 3. Similar item count (weak signal)
@@ -640,11 +1081,64 @@ class SemanticMatcher:
         return list(set(fields))  # Unique field names
 
 
+# ==================== Process-pool workers ====================
+#
+# Worker processes receive the matcher and the V2 side once, through the pool
+# initializer, and then only ever see shards of V1 fields.
+
+_worker_state: Dict = {}
+
+
+def _pack_index(index: Dict[str, FieldInfo]) -> List[Tuple]:
+    """Compact, picklable form of a field index (plain tuples, no dataclass overhead)"""
+    return [astuple(info) for info in index.values()]
+
+
+def _unpack_index(packed: List[Tuple]) -> Dict[str, FieldInfo]:
+    """Rebuild a field index from _pack_index() output"""
+    return {row[0]: FieldInfo(*row) for row in packed}
+
+
+def _init_worker(matcher: 'SemanticMatcher', packed_v2: List[Tuple],
+                 v2_fields: Optional[Dict[str, List[str]]], min_confidence: float):
+    _worker_state['matcher'] = matcher
+    _worker_state['v2_index'] = _unpack_index(packed_v2)
+    _worker_state['v2_fields'] = v2_fields
+    _worker_state['min_confidence'] = min_confidence
+
+
+def _best_match_shard(shard: List[Tuple[str, FieldInfo]]) -> List[MatchResult]:
+    matcher = _worker_state['matcher']
+    results = []
+    for v1_path, v1_info in shard:
+        match = matcher._best_match_for(
+            v1_path, v1_info, _worker_state['v2_index'], _worker_state['min_confidence']
+        )
+        if match:
+            results.append(match)
+    return results
+
+
+def _array_match_shard(shard: List[Tuple[str, FieldInfo, List[str]]]) -> List[MatchResult]:
+    matcher = _worker_state['matcher']
+    v2_fields = _worker_state['v2_fields']
+    results = []
+    for v1_path, v1_info, v1_fields in shard:
+        match = matcher._best_array_match_for(
+            v1_path, v1_info, v1_fields, _worker_state['v2_index'],
+            v2_fields, _worker_state['min_confidence']
+        )
+        if match:
+            results.append(match)
+    return results
+
+
 def main():
     """CLI for testing semantic matching"""
     import sys
     from data_structure_extractor import DataStructureExtractor
     from merge_data_fetcher import MergeDataFetcher
+    from schema_index_cache import SchemaIndexCache
 
     if len(sys.argv) < 2:
         print("Usage: python semantic_matcher.py <project_id>")
@@ -677,7 +1171,7 @@ def main():
 
     # Find semantic matches
     print("\n3️⃣  Finding semantic matches...")
-    matcher = SemanticMatcher()
+    matcher = SemanticMatcher(index_cache=SchemaIndexCache())
     matches = matcher.find_matches(v1_structure, v2_structure, min_confidence=0.6)
 
     print(f"\n📊 Found {len(matches)} matches with confidence >= 60%")
@@ -2,13 +2,341 @@
 """
 AI Conversion Session Manager
 Saves and restores AI improvement sessions for later continuation
+
+Each session is stored as a snapshot plus an append-only event log
+(logs/<session_id>.json and logs/<session_id>.log). A change appends one
+line holding only the fields that changed, so a progress tick costs the
+same however long the session's history is, and writers in other threads
+or processes append instead of overwriting each other's files. When a log
+passes COMPACT_BYTES it is folded into the snapshot. Reading a session
+replays its log over its snapshot.
+
+Log lines:
+    {"generation": 3}                              first line, see below
+    {"set": {"status": "complete", ...},           fields replaced
+     "extend": {"iterations": [...]},              items appended to lists
+     "unset": ["progress"]}                        fields removed
+
+Compaction writes the snapshot with the next generation number before it
+truncates the log and writes the new generation header. A log whose
+generation is older than its snapshot's (a compaction interrupted between
+the two steps) is already part of the snapshot and is skipped.
+
+The single active_sessions.json file of earlier versions is split into
+snapshots once, on first use.
+
+Saved progress is also published to progress_channel, for the progress
+event stream.
 """
 
+import copy
 import json
 import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+
+from progress_channel import progress_channel
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks
+    fcntl = None
+
+LOG_DIR = 'logs'
+COMPACT_BYTES = 64 * 1024  # Fold a log into its snapshot past this size
+MAX_CACHED_SESSIONS = 64    # Session dicts a SessionStore keeps in memory
+SESSION_ID = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+
+
+def _stat_signature(path: Path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def apply_event(state: Dict, event: Dict):
+    """Apply one log event to a session's state in place"""
+    for key, value in event.get('set', {}).items():
+        state[key] = value
+    for key, items in event.get('extend', {}).items():
+        state.setdefault(key, []).extend(items)
+    for key in event.get('unset', ()):
+        state.pop(key, None)
+
+
+def diff_event(saved: Dict, state: Dict) -> Dict:
+    """The event that turns saved into state (empty if nothing changed)"""
+    event = {}
+    for key, value in state.items():
+        if key not in saved:
+            event.setdefault('set', {})[key] = value
+            continue
+        old = saved[key]
+        if old == value:
+            continue
+        # Appends to a list (iterations, user_feedback) only log the new items
+        if isinstance(old, list) and isinstance(value, list) and len(value) > len(old) \
+                and value[:len(old)] == old:
+            event.setdefault('extend', {})[key] = value[len(old):]
+        else:
+            event.setdefault('set', {})[key] = value
+    unset = [key for key in saved if key not in state]
+    if unset:
+        event['unset'] = unset
+    return event
+
+
+class SessionLog:
+    """Snapshot and event log files of one session"""
+
+    def __init__(self, directory: Path, session_id: str):
+        self.snapshot_path = directory / f'{session_id}.json'
+        self.log_path = directory / f'{session_id}.log'
+
+    def exists(self) -> bool:
+        return self.log_path.exists() or self.snapshot_path.exists()
+
+    def signature(self):
+        """Changes whenever the session is written"""
+        return (_stat_signature(self.log_path), _stat_signature(self.snapshot_path))
+
+    def read(self) -> Optional[Dict]:
+        """The session's state (snapshot + log), or None if it doesn't exist"""
+        try:
+            log_file = open(self.log_path, 'rb')
+        except FileNotFoundError:
+            return self._replay(None)
+        with log_file:
+            if fcntl is not None:
+                fcntl.flock(log_file, fcntl.LOCK_SH)  # Not while a compaction is half done
+            return self._replay(log_file)
+
+    def _replay(self, log_file) -> Optional[Dict]:
+        snapshot = None
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+        if snapshot is None and log_file is None:
+            return None
+
+        generation = snapshot['generation'] if snapshot else 0
+        state = snapshot['state'] if snapshot else {}
+        if log_file is None:
+            return state
+
+        lines = log_file.read().splitlines()
+        start = 0
+        if lines:
+            try:
+                header = json.loads(lines[0])
+            except ValueError:
+                header = None
+            if isinstance(header, dict) and 'generation' in header:
+                if header['generation'] < generation:
+                    return state  # Already folded into the snapshot
+                start = 1
+        for line in lines[start:]:
+            try:
+                apply_event(state, json.loads(line))
+            except ValueError:
+                continue  # A line cut short by a crash
+        return state
+
+    def append(self, event: Dict, expected_signature=None):
+        """
+        Append one event, compacting the log if it has grown past COMPACT_BYTES.
+
+        Returns:
+            The new signature if the files were at expected_signature before
+            this write (so nobody else's events were missed), else None
+        """
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        line = (json.dumps(event, separators=(',', ':')) + '\n').encode('utf-8')
+        fd = os.open(self.log_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            current = self.signature() == expected_signature
+            if os.fstat(fd).st_size == 0:
+                generation = 0
+                if self.snapshot_path.exists():
+                    with open(self.snapshot_path, 'r') as f:
+                        generation = json.load(f)['generation']
+                os.write(fd, (json.dumps({'generation': generation}) + '\n').encode('utf-8'))
+            os.write(fd, line)
+            if os.fstat(fd).st_size > COMPACT_BYTES:
+                self._compact(fd)
+            return self.signature() if current else None
+        finally:
+            os.close(fd)  # Releases the lock
+
+    def compact(self):
+        """Fold the log into the snapshot now"""
+        if not self.log_path.exists():
+            return
+        fd = os.open(self.log_path, os.O_RDWR | os.O_APPEND)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            self._compact(fd)
+        finally:
+            os.close(fd)
+
+    def _compact(self, fd: int):
+        """Write the state as a new snapshot generation and restart the log (caller holds the lock)"""
+        with open(self.log_path, 'rb') as log_file:
+            state = self._replay(log_file)
+        generation = 0
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'r') as f:
+                generation = json.load(f)['generation']
+        generation += 1
+
+        tmp_path = self.snapshot_path.with_name(f'{self.snapshot_path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'generation': generation, 'state': state}, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+        os.ftruncate(fd, 0)
+        os.write(fd, (json.dumps({'generation': generation}) + '\n').encode('utf-8'))
+
+    def remove(self):
+        for path in (self.log_path, self.snapshot_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SessionStore(MutableMapping):
+    """
+    session_id -> session dict, backed by SessionLogs.
+
+    Sessions are read on first access and re-read when their files change.
+    persist() logs what changed in a session dict since it was last read or
+    persisted, so callers can keep changing the returned dicts in place.
+    At most max_sessions are kept in memory; the least recently used one is
+    persisted and dropped beyond that, and read again on its next access.
+    """
+
+    def __init__(self, directory: Path, max_sessions: int = MAX_CACHED_SESSIONS):
+        self.directory = directory
+        self.max_sessions = max_sessions
+        self._states: Dict[str, Dict] = OrderedDict()
+        self._saved: Dict[str, Dict] = {}       # Last read or persisted copy of each state
+        self._signatures: Dict[str, tuple] = {}
+        # Request threads share a store; persist() must diff and append atomically
+        self._lock = threading.RLock()
+
+    def _log(self, session_id: str) -> SessionLog:
+        if not isinstance(session_id, str) or not SESSION_ID.match(session_id):
+            raise KeyError(session_id)
+        return SessionLog(self.directory, session_id)
+
+    def __getitem__(self, session_id: str) -> Dict:
+        log = self._log(session_id)
+        with self._lock:
+            signature = log.signature()
+            if session_id in self._states:
+                if self._signatures.get(session_id) == signature:
+                    self._states.move_to_end(session_id)
+                    return self._states[session_id]
+                # Written elsewhere: log our own pending changes, then re-read
+                self.persist(session_id)
+                signature = log.signature()
+
+            state = log.read()
+            if state is None:
+                self._forget(session_id)
+                raise KeyError(session_id)
+            self._remember(session_id, state, copy.deepcopy(state), signature)
+            return state
+
+    def __setitem__(self, session_id: str, state: Dict):
+        log = self._log(session_id)
+        with self._lock:
+            self._remember(session_id, state, log.read() or {}, None)
+            self.persist(session_id)
+
+    def __delitem__(self, session_id: str):
+        log = self._log(session_id)
+        with self._lock:
+            if not log.exists() and session_id not in self._states:
+                raise KeyError(session_id)
+            log.remove()
+            self._forget(session_id)
+
+    def __contains__(self, session_id) -> bool:
+        try:
+            return session_id in self._states or self._log(session_id).exists()
+        except KeyError:
+            return False
+
+    def __iter__(self) -> Iterator[str]:
+        ids = set(self._states)
+        if self.directory.exists():
+            for path in self.directory.iterdir():
+                if path.suffix in ('.json', '.log') and SESSION_ID.match(path.stem):
+                    ids.add(path.stem)
+        return iter(sorted(ids))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def _remember(self, session_id: str, state: Dict, saved: Dict, signature: Optional[tuple]):
+        """Keep a session in memory, dropping the least recently used over max_sessions (caller holds the lock)"""
+        self._states[session_id] = state
+        self._states.move_to_end(session_id)
+        self._saved[session_id] = saved
+        self._signatures[session_id] = signature
+        while len(self._states) > self.max_sessions:
+            oldest = next(iter(self._states))
+            self.persist(oldest)
+            self._forget(oldest)
+
+    def _forget(self, session_id: str):
+        self._states.pop(session_id, None)
+        self._saved.pop(session_id, None)
+        self._signatures.pop(session_id, None)
+
+    def persist(self, session_id: str) -> bool:
+        """
+        Append what changed in a session since it was last read or persisted
+
+        Returns:
+            True if anything was written
+        """
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is None:
+                return False
+            saved = self._saved[session_id]
+            event = diff_event(saved, state)
+            if not event:
+                return False
+
+            signature = self._log(session_id).append(event, self._signatures.get(session_id))
+            for key, value in event.get('set', {}).items():
+                saved[key] = copy.deepcopy(value)
+            for key, items in event.get('extend', {}).items():
+                saved[key] = saved[key] + copy.deepcopy(items)
+            for key in event.get('unset', ()):
+                saved.pop(key, None)
+            # None when someone else wrote too: the next access re-reads
+            self._signatures[session_id] = signature
+            return True
+
+    def flush(self) -> List[str]:
+        """persist() every session read through this store, returning the ones written"""
+        with self._lock:
+            return [session_id for session_id in list(self._states) if self.persist(session_id)]
 
 
 class SessionManager:
@@ -29,27 +357,52 @@ class SessionManager:
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
-        self.sessions_file = self.cache_dir / 'active_sessions.json'
-        self.sessions = self._load_sessions()
+        self.sessions_file = self.cache_dir / 'active_sessions.json'  # Pre-log format
+        self.sessions = SessionStore(self.cache_dir / LOG_DIR)
+        self._migrate_sessions_file()
 
-    def _load_sessions(self) -> Dict:
-        """Load session data from disk"""
-        if self.sessions_file.exists():
-            try:
-                with open(self.sessions_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"⚠️  Could not load sessions: {e}")
-        return {}
+    def _migrate_sessions_file(self):
+        """Split a legacy active_sessions.json into per-session snapshots (once)"""
+        if not self.sessions_file.exists():
+            return
+        # Renamed first, so only one process migrates
+        claimed = self.sessions_file.with_name(f'{self.sessions_file.name}.{os.getpid()}.migrating')
+        try:
+            os.replace(self.sessions_file, claimed)
+        except OSError:
+            return
+        try:
+            with open(claimed, 'r') as f:
+                sessions = json.load(f)
+            for session_id, session in sessions.items():
+                if SESSION_ID.match(session_id) and session_id not in self.sessions:
+                    self.sessions[session_id] = session
+            os.replace(claimed, self.sessions_file.with_name(f'{self.sessions_file.name}.migrated'))
+            print(f"✓ Migrated {len(sessions)} sessions to {self.cache_dir / LOG_DIR}")
+        except Exception as e:
+            print(f"⚠️  Could not migrate sessions: {e}")
 
     def _save_sessions(self):
-        """Save session data to disk"""
+        """Save changes made to session dicts in place"""
         try:
-            with open(self.sessions_file, 'w') as f:
-                json.dump(self.sessions, f, indent=2)
+            for session_id in self.sessions.flush():
+                self._publish(session_id)
         except Exception as e:
             print(f"⚠️  Could not save sessions: {e}")
 
+    def _save_session(self, session_id: str):
+        """Log the changes to one session"""
+        try:
+            if self.sessions.persist(session_id):
+                self._publish(session_id)
+        except Exception as e:
+            print(f"⚠️  Could not save session {session_id}: {e}")
+
+    def _publish(self, session_id: str):
+        """Push an improvement session's progress to its stream subscribers"""
+        if 'progress' in self.sessions[session_id]:
+            progress_channel.publish(session_id, self.get_progress(session_id))
+
     def create_session(
         self,
         v1_template_id: str,
@@ -91,7 +444,6 @@ class SessionManager:
             'user_feedback': []
         }
 
-        self._save_sessions()
         print(f"✓ Created session: {session_id} - {session_name}")
         return session_id
 
@@ -127,7 +479,7 @@ class SessionManager:
         session['status'] = status
         session['updated_at'] = datetime.now().isoformat()
 
-        self._save_sessions()
+        self._save_session(session_id)
         print(f"✓ Updated session: {session_id}")
 
     def add_user_feedback(
@@ -155,7 +507,7 @@ class SessionManager:
         }
 
         self.sessions[session_id]['user_feedback'].append(feedback_entry)
-        self._save_sessions()
+        self._save_session(session_id)
 
     def get_session(self, session_id: str) -> Optional[Dict]:
         """
@@ -227,13 +579,12 @@ class SessionManager:
         if session_id in self.sessions:
             self.sessions[session_id]['status'] = 'completed'
             self.sessions[session_id]['completed_at'] = datetime.now().isoformat()
-            self._save_sessions()
+            self._save_session(session_id)
 
     def delete_session(self, session_id: str):
         """Delete a session"""
         if session_id in self.sessions:
             del self.sessions[session_id]
-            self._save_sessions()
             print(f"✓ Deleted session: {session_id}")
 
     def clear_old_sessions(self, days: int = 30):
@@ -247,7 +598,7 @@ class SessionManager:
         cutoff = datetime.now() - timedelta(days=days)
 
         to_delete = []
-        for session_id, session_data in self.sessions.items():
+        for session_id, session_data in list(self.sessions.items()):
             updated_at = datetime.fromisoformat(session_data['updated_at'])
             if updated_at < cutoff:
                 to_delete.append(session_id)
@@ -256,7 +607,6 @@ class SessionManager:
             del self.sessions[session_id]
 
         if to_delete:
-            self._save_sessions()
             print(f"✓ Deleted {len(to_delete)} old sessions")
 
     def update_progress(self, session_id: str, progress_data: Dict):
@@ -291,7 +641,7 @@ class SessionManager:
         }
         self.sessions[session_id]['updated_at'] = datetime.now().isoformat()
 
-        self._save_sessions()
+        self._save_session(session_id)
 
     def get_progress(self, session_id: str) -> Dict:
         """
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Structure Cache
+===============
+
+Server-side cache of extracted merge data structures, per project.
+
+The data viewer opens one Miller column at a time. Keeping the extracted
+StructureTable for a project in memory lets the first paint send only the
+root fields and every column expansion send only the direct children of one
+node, without re-fetching merge data from ScopeStack for each request.
+
+Entries expire after a TTL (merge data changes when the project is edited)
+and the least recently used entries are dropped beyond max_entries.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+from data_structure_extractor import StructureTable
+
+
+class StructureCache:
+    """
+    TTL + LRU cache of StructureTables.
+
+    Keys are (project_id, version, template_only, account) tuples; any
+    hashable tuple whose first element is the project id works.
+    """
+
+    def __init__(self, ttl_seconds: float = 600, max_entries: int = 16):
+        """
+        Args:
+            ttl_seconds: How long an extracted structure stays valid
+            max_entries: Maximum number of structures kept in memory
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, StructureTable)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[StructureTable]:
+        """Return a cached structure, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, table = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return table
+
+    def put(self, key: Hashable, table: StructureTable):
+        """Store a structure, evicting the least recently used beyond max_entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, table)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], StructureTable], refresh: bool = False) -> StructureTable:
+        """
+        Return the cached structure for key, calling loader() on a miss.
+
+        The loader runs outside the lock, so a slow fetch for one project
+        doesn't block requests for others.
+        """
+        if not refresh:
+            table = self.get(key)
+            if table is not None:
+                return table
+
+        table = loader()
+        self.put(key, table)
+        return table
+
+    def invalidate(self, project_id: Optional[str] = None):
+        """Drop cached structures for one project (or all projects)"""
+        with self._lock:
+            if project_id is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == project_id]:
+                del self._entries[key]
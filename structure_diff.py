@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Structure Diff
+==============
+
+Finds where v1 and v2 merge data structures really differ.
+
+Every record of a StructureTable has a Merkle-style subtree hash
+(StructureTable.subtree_hashes()). Two subtrees with the same hash have the
+same shape and the same field names all the way down, so they can be paired
+wholesale without scoring any of their fields. The pairing is one pass over
+the v1 records with dictionary lookups, O(n) in the number of fields.
+
+What is left over (the residual) is what actually changed between the
+versions; only those fields need SemanticMatcher's pairwise scoring (see
+SemanticMatcher.match_with_diff), and they are what the data viewer's
+changed-only view shows.
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+
+from data_structure_extractor import StructureTable
+
+
+@dataclass
+class StructureDiff:
+    """Result of diff_structures()"""
+    pairs: Dict[str, str]                 # v1 path -> v2 path, for every field in a paired subtree
+    subtree_pairs: List[Tuple[str, str]]  # (v1 path, v2 path) roots of paired subtrees, v1 order
+    v1_residual: List[str]                # v1 fields with no identical counterpart
+    v2_residual: List[str]                # v2 fields with no identical counterpart
+    v1_changed: Set[str] = field(default_factory=set)  # Residual + moved roots + their ancestors
+    v2_changed: Set[str] = field(default_factory=set)
+
+    @property
+    def moved(self) -> List[Tuple[str, str]]:
+        """Paired subtrees that live at a different path in v2"""
+        return [(v1_path, v2_path) for v1_path, v2_path in self.subtree_pairs if v1_path != v2_path]
+
+
+def diff_structures(v1_structure: StructureTable, v2_structure: StructureTable) -> StructureDiff:
+    """
+    Pair identical v1/v2 subtrees by hash and collect the residual fields.
+
+    A v1 record is paired with:
+    1. the v2 record at the same path, if their subtree hashes are equal;
+    2. otherwise (containers only) the v2 record with the same hash and the
+       same field name, if that combination is unique on both sides;
+    3. otherwise the v2 record with the same hash, if that hash is unique
+       on both sides.
+    Ambiguous subtrees are left in the residual for the matcher to score.
+    Pairing a subtree pairs all of its descendants by relative path.
+
+    Args:
+        v1_structure: StructureTable from DataStructureExtractor
+        v2_structure: StructureTable from DataStructureExtractor
+
+    Returns:
+        StructureDiff
+    """
+    v1_hashes = v1_structure.subtree_hashes()
+    v2_hashes = v2_structure.subtree_hashes()
+
+    # Containers by hash (and by hash + field name) on each side. Leaves all
+    # share a handful of hashes, so they are only ever paired by path.
+    v1_by_hash = Counter()
+    v1_by_name = Counter()
+    for record_id, path in enumerate(v1_structure.paths):
+        if v1_structure.record(record_id)['child_ids']:
+            v1_by_hash[v1_hashes[record_id]] += 1
+            v1_by_name[(v1_hashes[record_id], _field_name(path))] += 1
+
+    v2_by_hash = defaultdict(list)
+    v2_by_name = defaultdict(list)
+    for record_id, path in enumerate(v2_structure.paths):
+        if v2_structure.record(record_id)['child_ids']:
+            v2_by_hash[v2_hashes[record_id]].append(record_id)
+            v2_by_name[(v2_hashes[record_id], _field_name(path))].append(record_id)
+
+    v1_covered = bytearray(len(v1_structure.paths))
+    v2_taken = bytearray(len(v2_structure.paths))
+    pairs: Dict[str, str] = {}
+    subtree_pairs: List[Tuple[str, str]] = []
+
+    # Pre-order, so a subtree root is always seen before its descendants
+    for v1_id, v1_path in enumerate(v1_structure.paths):
+        if v1_covered[v1_id]:
+            continue
+
+        subtree_hash = v1_hashes[v1_id]
+        v2_id = None
+
+        same_path = v2_structure.get(v1_path)
+        if same_path is not None and v2_hashes[same_path['id']] == subtree_hash:
+            v2_id = same_path['id']
+        elif v1_structure.record(v1_id)['child_ids']:
+            key = (subtree_hash, _field_name(v1_path))
+            if v1_by_name[key] == 1 and len(v2_by_name[key]) == 1:
+                v2_id = v2_by_name[key][0]
+            elif v1_by_hash[subtree_hash] == 1 and len(v2_by_hash[subtree_hash]) == 1:
+                v2_id = v2_by_hash[subtree_hash][0]
+
+        if v2_id is None or v2_taken[v2_id]:
+            continue
+
+        v2_path = v2_structure.paths[v2_id]
+        subtree_pairs.append((v1_path, v2_path))
+        _pair_subtree(v1_structure, v2_structure, v1_id, v2_id, v1_covered, v2_taken, pairs)
+
+    diff = StructureDiff(
+        pairs=pairs,
+        subtree_pairs=subtree_pairs,
+        v1_residual=[p for i, p in enumerate(v1_structure.paths) if not v1_covered[i]],
+        v2_residual=[p for i, p in enumerate(v2_structure.paths) if not v2_taken[i]],
+    )
+
+    moved = diff.moved
+    diff.v1_changed = _with_ancestors(v1_structure, diff.v1_residual + [v1 for v1, _ in moved])
+    diff.v2_changed = _with_ancestors(v2_structure, diff.v2_residual + [v2 for _, v2 in moved])
+    return diff
+
+
+def _pair_subtree(v1_structure: StructureTable, v2_structure: StructureTable, v1_id: int, v2_id: int,
+                  v1_covered: bytearray, v2_taken: bytearray, pairs: Dict[str, str]):
+    """Pair a subtree root and every descendant that has a counterpart at the same relative path"""
+    v1_root = v1_structure.paths[v1_id]
+    v2_root = v2_structure.paths[v2_id]
+
+    v1_covered[v1_id] = 1
+    v2_taken[v2_id] = 1
+    pairs[v1_root] = v2_root
+
+    for v1_path in v1_structure.descendant_paths(v1_root):
+        v2_record = v2_structure.get(v2_root + v1_path[len(v1_root):])
+        # Full extractions can hold different item counts; leave the extras residual
+        if v2_record is None or v2_taken[v2_record['id']]:
+            continue
+        v1_covered[v1_structure[v1_path]['id']] = 1
+        v2_taken[v2_record['id']] = 1
+        pairs[v1_path] = v2_record['path']
+
+
+def _with_ancestors(structure: StructureTable, paths: List[str]) -> Set[str]:
+    """Paths plus all of their ancestors (each ancestor is visited once)"""
+    result = set()
+    for path in paths:
+        record = structure[path]
+        while record is not None and record['path'] not in result:
+            result.add(record['path'])
+            parent_id = record['parent_id']
+            record = structure.record(parent_id) if parent_id is not None else None
+    return result
+
+
+def _field_name(path: str) -> str:
+    """Last path component without array indexes"""
+    return StructureTable.INDEX_PATTERN.sub('', path.rsplit('.', 1)[-1])
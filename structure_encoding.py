@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Structure Encoding
+==================
+
+Compact wire format for extracted merge data structures.
+
+The plain JSON form of a StructureTable repeats every path twice (as the key
+and in 'path'), and deep v2 paths such as
+'project.project_pricing.professional_services.phases[0].services[0]...'
+share long prefixes. In the compact form each path is interned against its
+parent record: a row stores the parent's id and only the suffix that the
+field adds to the parent path ('.name', '[0].hours'). Field types go through
+a small string table, and sample values are truncated to a budget.
+
+Payload:
+    {
+        'encoding': 'prefix-v1',
+        'types': ['object', 'string', ...],
+        'partial': true,        # Only for partial payloads
+        'ids': [...],           # Only when ids are not simply 0..n-1
+        'rows': [
+            [parent_id, suffix, type, sample, array_count, item_type, child_ids, extra],
+            ...
+        ]
+    }
+
+parent_id is -1 for top-level fields; type and item_type index into
+'types'. Trailing empty columns are dropped. child_ids is only sent for
+partial payloads (lazy data viewer responses), where it can't be rebuilt from
+the parent links. 'extra' holds any other record keys (e.g. union-mode
+statistics).
+
+The data viewer decodes this in templates/data_viewer.html (decodeStructure).
+"""
+
+import json
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from data_structure_extractor import StructureTable
+
+STRUCTURE_MEDIA_TYPE = 'application/vnd.scopestack.structure+json'
+ENCODING = 'prefix-v1'
+DEFAULT_SAMPLE_BUDGET = 40
+
+# Keys stored in dedicated columns (or derived) rather than in 'extra'
+_COLUMN_KEYS = {'path', 'type', 'sample_value', 'is_array', 'array_count', 'item_type',
+                'id', 'parent_id', 'child_ids'}
+
+
+def encode_structure(records: Iterable[Dict], partial: bool = False,
+                     sample_budget: int = DEFAULT_SAMPLE_BUDGET,
+                     parent_paths: Optional[Callable[[int], str]] = None) -> Dict:
+    """
+    Encode structure records in the compact prefix-interned form.
+
+    Args:
+        records: Records in table order (a StructureTable's values, or a
+                 subset such as StructureTable.child_records())
+        partial: True if the records are not the whole table; rows then
+                 carry their child_ids
+        sample_budget: Maximum length of string sample values
+        parent_paths: Resolves the path of a parent that is not among the
+                      records (partial payloads); defaults to the parent's
+                      path being unknown, i.e. suffixes become full paths
+
+    Returns:
+        JSON-serializable payload
+    """
+    types: List[str] = []
+    type_ids: Dict[str, int] = {}
+    paths: Dict[int, str] = {}  # id -> path, for records in this payload
+    ids: List[int] = []
+    rows: List[List] = []
+
+    for record in records:
+        record_id = record['id']
+        parent_id = record.get('parent_id')
+        path = record['path']
+
+        if parent_id is None:
+            parent_path = None
+        elif parent_id in paths:
+            parent_path = paths[parent_id]
+        else:
+            parent_path = parent_paths(parent_id) if parent_paths else None
+
+        if parent_path is not None and path.startswith(parent_path):
+            suffix = path[len(parent_path):]
+        else:
+            suffix = path
+            parent_path = None
+
+        paths[record_id] = path
+        ids.append(record_id)
+
+        sample = record.get('sample_value')
+        if type(sample) is str and len(sample) > sample_budget:
+            sample = sample[:sample_budget] + '…'
+
+        field_type = record.get('type', 'unknown')
+        type_index = type_ids.get(field_type)
+        if type_index is None:
+            type_index = type_ids[field_type] = len(types)
+            types.append(field_type)
+
+        row = [-1 if parent_id is None else parent_id, suffix, type_index, sample]
+
+        if 'array_count' in record or 'item_type' in record:
+            item_type = record.get('item_type')
+            item_index = None
+            if item_type is not None:
+                item_index = type_ids.get(item_type)
+                if item_index is None:
+                    item_index = type_ids[item_type] = len(types)
+                    types.append(item_type)
+            row += (record.get('array_count'), item_index)
+
+        if partial and record.get('child_ids'):
+            row += [None] * (6 - len(row))
+            row.append(list(record['child_ids']))
+
+        extra_keys = record.keys() - _COLUMN_KEYS
+        is_array = record.get('is_array', False)
+        if extra_keys or is_array != (field_type == 'array') or (parent_path is None and parent_id is not None):
+            extra = {k: record[k] for k in record if k in extra_keys}
+            if 'samples' in extra:
+                extra['samples'] = [_truncate(v, sample_budget) for v in extra['samples']]
+            if is_array != (field_type == 'array'):
+                extra['is_array'] = is_array
+            if parent_path is None and parent_id is not None:
+                # Suffix is the full path; tell the decoder not to prepend
+                extra['full_path'] = True
+            row += [None] * (7 - len(row))
+            row.append(extra)
+
+        while row[-1] is None:
+            row.pop()
+        rows.append(row)
+
+    payload = {'encoding': ENCODING, 'types': types, 'rows': rows}
+    if partial:
+        payload['partial'] = True
+    if partial or ids != list(range(len(ids))):
+        payload['ids'] = ids
+    return payload
+
+
+def _truncate(value, budget: int):
+    """Shorten string samples to the budget"""
+    if isinstance(value, str) and len(value) > budget:
+        return value[:budget] + '…'
+    return value
+
+
+def decode_structure(payload: Dict, parent_paths: Optional[Callable[[int], str]] = None) -> Dict[str, Dict]:
+    """
+    Decode a compact payload back into records.
+
+    Whole-table payloads decode to an equivalent StructureTable. Partial
+    payloads decode to a plain {path: record} dict that keeps the server's
+    ids and child_ids, to be merged into the table that holds the parents.
+
+    Args:
+        payload: Output of encode_structure()
+        parent_paths: Resolves parent paths not included in the payload
+    """
+    if payload.get('encoding') != ENCODING:
+        raise ValueError(f"Unsupported structure encoding: {payload.get('encoding')}")
+
+    types = payload['types']
+    ids = payload.get('ids')
+    partial = payload.get('partial', False)
+    table = {} if partial else StructureTable()
+    paths: Dict[int, str] = {}
+
+    for index, row in enumerate(payload['rows']):
+        row = row + [None] * (8 - len(row))
+        parent_id, suffix, type_index, sample, array_count, item_type, child_ids, extra = row
+        record_id = ids[index] if ids else index
+        parent_id = None if parent_id == -1 else parent_id
+        extra = dict(extra or {})
+
+        if parent_id is None or extra.pop('full_path', False):
+            path = suffix
+        elif parent_id in paths:
+            path = paths[parent_id] + suffix
+        else:
+            path = parent_paths(parent_id) + suffix
+        paths[record_id] = path
+
+        info = {
+            'path': path,
+            'type': types[type_index],
+            'sample_value': sample,
+            'is_array': extra.pop('is_array', types[type_index] == 'array'),
+        }
+        if array_count is not None:
+            info['array_count'] = array_count
+        if item_type is not None:
+            info['item_type'] = types[item_type]
+        info.update(extra)
+
+        if partial:
+            info['id'] = record_id
+            info['parent_id'] = parent_id
+            info['child_ids'] = list(child_ids or [])
+            table[path] = info
+        else:
+            table.add(path, info, parent_id)
+
+    return table
+
+
+def main():
+    """CLI: compare plain and compact encodings of a merge data file"""
+    import sys
+
+    from data_structure_extractor import DataStructureExtractor
+
+    if len(sys.argv) < 2:
+        print("Usage: python structure_encoding.py <merge_data.json> [--full-data]")
+        sys.exit(1)
+
+    with open(sys.argv[1], 'r') as f:
+        data = json.load(f)
+
+    extractor = DataStructureExtractor(template_only='--full-data' not in sys.argv)
+    structure = extractor.extract_structure(data)
+
+    start = time.perf_counter()
+    plain = json.dumps(structure)
+    plain_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compact = json.dumps(encode_structure(structure.values()), separators=(',', ':'))
+    compact_time = time.perf_counter() - start
+
+    print(f"Fields:  {len(structure)}")
+    print(f"Plain:   {len(plain) / 1024:10.1f} KiB  {plain_time * 1000:8.1f} ms")
+    print(f"Compact: {len(compact) / 1024:10.1f} KiB  {compact_time * 1000:8.1f} ms (encode + dumps)")
+    print(f"Saved:   {(1 - len(compact) / max(len(plain), 1)) * 100:9.1f} %")
+
+
+if __name__ == '__main__':
+    main()
@@ -173,10 +173,20 @@ class MailMergeParser:
 class TemplateConverter:
     """Converts Word Mail Merge templates to DocX Templater format"""
 
-    def __init__(self, input_docx: str, output_docx: str):
+    def __init__(self, input_docx: str, output_docx: str, compiled=None):
+        """
+        Args:
+            input_docx: Mail Merge template
+            output_docx: Where to write the converted template
+            compiled: Optional CompiledMappings (see mapping_artifact.py) to
+                      use instead of the hardcoded tables
+        """
         self.input_docx = input_docx
         self.output_docx = output_docx
         self.warnings = []
+        self.compiled = compiled
+        self.loop_conversions = compiled.loop_conversions if compiled else LOOP_CONVERSIONS
+        self.conditional_conversions = compiled.conditional_conversions if compiled else CONDITIONAL_CONVERSIONS
 
     def _escape_xml(self, text: str) -> str:
         """
@@ -300,11 +310,14 @@ class TemplateConverter:
         Returns:
             Dict mapping v1 fields to v2 fields
         """
-        # Start with hardcoded mappings as fallback
-        result = FIELD_MAPPINGS.copy()
+        # Start with hardcoded (or compiled) mappings as fallback
+        result = (self.compiled.field_mappings if self.compiled else FIELD_MAPPINGS).copy()
 
         if not learned_mappings:
-            print("\n📚 Using hardcoded field mappings only")
+            if self.compiled:
+                print(f"\n📚 Using compiled field mappings ({self.compiled.learned_count} learned)")
+            else:
+                print("\n📚 Using hardcoded field mappings only")
             return result
 
         # Override with high-confidence learned mappings
@@ -338,6 +351,8 @@ class TemplateConverter:
 
         # Build merged mapping dict (learned + hardcoded)
         self.active_field_mappings = self._merge_mappings(learned_field_mappings)
+        if loop_mappings is None and self.compiled:
+            loop_mappings = self.compiled.loop_mappings
 
         try:
             # Extract the docx
@@ -628,21 +643,21 @@ class TemplateConverter:
             return active_mappings[field_name]
 
         # Check loop conversions
-        if field_name in LOOP_CONVERSIONS:
-            start_tag, end_tag, _ = LOOP_CONVERSIONS[field_name]
+        if field_name in self.loop_conversions:
+            start_tag, end_tag, _ = self.loop_conversions[field_name]
             return start_tag
 
         # Check if it's an end marker
         if ':endEach' in field_name:
             base_name = field_name.replace(':endEach', ':each')
             # Find the matching loop
-            for loop_name, (start, end, _) in LOOP_CONVERSIONS.items():
+            for loop_name, (start, end, _) in self.loop_conversions.items():
                 if loop_name.startswith(base_name.split(':')[0]):
                     return end
 
         if ':endIf' in field_name:
             base_name = field_name.replace(':endIf', ':if')
-            for cond_name, (start, end) in CONDITIONAL_CONVERSIONS.items():
+            for cond_name, (start, end) in self.conditional_conversions.items():
                 if cond_name.startswith(base_name.split(':')[0]):
                     return end
 
@@ -651,8 +666,8 @@ class TemplateConverter:
             return '{:else}'
 
         # Check conditional conversions
-        if field_name in CONDITIONAL_CONVERSIONS:
-            start_tag, end_tag = CONDITIONAL_CONVERSIONS[field_name]
+        if field_name in self.conditional_conversions:
+            start_tag, end_tag = self.conditional_conversions[field_name]
             return start_tag
 
         return None
@@ -672,6 +687,8 @@ def main():
         print("ScopeStack Template Converter")
         print("Usage:")
         print("  python template_converter.py <input.docx> [output.docx]")
+        print("\nLearned mappings are used when compiled_mappings.pickle exists")
+        print("(python mapping_artifact.py); it is recompiled when the database changes.")
         print("\nExample:")
         print("  python template_converter.py old_template.docx new_template.docx")
         sys.exit(1)
@@ -689,8 +706,12 @@ def main():
         base_name = os.path.splitext(input_file)[0]
         output_file = f"{base_name}_converted.docx"
 
+    # Learned mappings, once `python mapping_artifact.py` has compiled them
+    from mapping_artifact import load_existing_compiled_mappings
+    compiled = load_existing_compiled_mappings()
+
     # Run conversion
-    converter = TemplateConverter(input_file, output_file)
+    converter = TemplateConverter(input_file, output_file, compiled=compiled)
     success = converter.convert()
 
     sys.exit(0 if success else 1)
@@ -0,0 +1,87 @@
+"""
+Tests for Flask routes that write to the mapping database or validate input.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    pytest.importorskip("flask")
+    pytest.importorskip("requests")
+    import app as app_module
+    from mapping_database import MappingShards
+
+    monkeypatch.setattr(app_module, "mapping_shards", MappingShards(
+        shard_dir=str(tmp_path / "shards"), global_db_path=str(tmp_path / "global.db")))
+    monkeypatch.setattr(app_module, "is_session_authenticated", lambda: True)
+    monkeypatch.setattr(app_module, "get_session_access_token", lambda: "token")
+    monkeypatch.setattr(app_module, "get_session_account_info", lambda: None)
+    app_module.app.config["TESTING"] = True
+    return app_module.app.test_client()
+
+
+class FakeLearner:
+    def __init__(self, fetcher, log=print):
+        pass
+
+    def learn_mappings(self, project_id):
+        return {
+            'total_matches': 2,
+            'suggested_mappings': [
+                {'v1_field': 'project_name', 'v2_field': 'project.name', 'value': 'Refresh', 'confidence': 'high'},
+                {'v1_field': 'client', 'v2_field': 'project.client.name', 'value': 'Acme', 'confidence': 'medium'},
+            ]
+        }
+
+
+class TestLearnMappingsRoute:
+    """/api/learn-mappings saves what it learns."""
+
+    def test_suggestions_are_saved(self, client, monkeypatch):
+        import app as app_module
+        import learn_mappings
+
+        monkeypatch.setattr(learn_mappings, "MappingLearner", FakeLearner)
+        monkeypatch.setattr(app_module, "MergeDataFetcher", lambda: type("F", (), {"authenticate": lambda *a, **k: None})())
+
+        response = client.post('/api/learn-mappings', json={'project_id': '42'})
+
+        assert response.status_code == 200
+        assert response.get_json()['stats']['saved'] == 2
+        db = app_module.mapping_shards.global_database()
+        assert db.get_mapping('project_name')['projects'] == ['42']
+        assert db.get_statistics()['projects_analyzed'] == 1
+
+
+class TestMinConfidenceValidation:
+    """A non-numeric min_confidence is a 400, not a 500."""
+
+    @pytest.mark.parametrize("path", [
+        '/api/structure-diff/42?match=true&min_confidence=high',
+        '/api/semantic-suggestions/42?min_confidence=high',
+    ])
+    def test_rejects_non_numeric(self, client, path):
+        response = client.get(path)
+
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'min_confidence must be a number'
+
+
+class TestCompiledMappings:
+    """Conversions use the account's mappings, compiled once per database revision."""
+
+    def test_recompiled_after_database_changes(self, client):
+        import app as app_module
+
+        with app_module.app.test_request_context():
+            db = app_module.current_mapping_db()
+            db.set_mapping("client", {"v1_field": "client", "v2_field": "project.client.name",
+                                      "confidence_score": 5})
+            first = app_module.current_compiled_mappings()
+            assert first.field_mappings["=client"] == "{project.client.name}"
+            assert app_module.current_compiled_mappings() is first
+
+            db.set_mapping("client", {"v1_field": "client", "v2_field": "project.client_name",
+                                      "confidence_score": 5})
+            assert app_module.current_compiled_mappings().field_mappings["=client"] == "{project.client_name}"
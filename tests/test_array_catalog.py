@@ -0,0 +1,74 @@
+"""
+Tests for the v2 array catalog used by loop matching.
+"""
+
+import pytest
+
+from array_catalog import build_array_catalog, unwrap
+
+
+def _v2(phases):
+    return {"data": {"attributes": {"content": {
+        "project": {
+            "name": "Refresh",
+            "project_locations": [{"location_name": "HQ", "address": "1 Main"},
+                                  {"location_name": "DC", "address": "2 Side", "city": "Dallas"}],
+            "phases": phases,
+        }
+    }}}}
+
+
+PHASES = [
+    {"name": "Design", "services": [{"service_name": "Survey", "quantity": 1}]},
+    {"name": "Build", "services": [{"service_name": "Install", "quantity": 2, "hours": 8},
+                                   {"service_name": "Test", "quantity": 1}]},
+]
+
+
+class TestBuildArrayCatalog:
+    """Each object array is listed once with merged keys and counts."""
+
+    def test_entries(self):
+        catalog = {entry.path: entry for entry in build_array_catalog(unwrap(_v2(PHASES)))}
+
+        assert list(catalog) == ["project.project_locations", "project.phases", "project.phases.services"]
+        assert catalog["project.project_locations"].keys == {"location_name", "address", "city"}
+        assert catalog["project.project_locations"].item_count == 2
+        # Nested arrays under every phase merge into one entry
+        assert catalog["project.phases.services"].keys == {"service_name", "quantity", "hours"}
+        assert catalog["project.phases.services"].item_count == 3
+
+    def test_later_items_are_not_shared_across_payloads(self):
+        # Same first phase, different later ones
+        other = PHASES[:1] + [{"name": "Run", "services": [{"service_name": "Support", "minutes": 30}]}]
+        first = {entry.path: entry for entry in build_array_catalog(unwrap(_v2(PHASES)))}
+        second = {entry.path: entry for entry in build_array_catalog(unwrap(_v2(other)))}
+
+        assert "hours" in first["project.phases.services"].keys
+        assert "minutes" in second["project.phases.services"].keys
+        assert "hours" not in second["project.phases.services"].keys
+
+    def test_scalar_arrays_are_not_candidates(self):
+        catalog = build_array_catalog({"tags": ["a", "b"], "items": [{"a": 1}]})
+        assert [entry.path for entry in catalog] == ["items"]
+
+
+class TestLoopMatching:
+    """MappingLearner scores loops against the catalog."""
+
+    def test_loops_match_catalog_arrays(self):
+        pytest.importorskip("requests")
+        from learn_mappings import MappingLearner
+
+        learner = MappingLearner(fetcher=None)
+        loops = [
+            {"sablon_var": "location", "nested_fields": ["location.location_name", "location.city"]},
+            {"sablon_var": "service", "nested_fields": ["service.service_name", "service.hours"]},
+        ]
+        mappings = learner.learn_loop_mappings(loops, _v2(PHASES))
+
+        assert mappings["location"] == "project.project_locations"
+        assert mappings["location_confidence"] == 1.0
+        # 'hours' only appears on a later item; the key union still finds it
+        assert mappings["service"] == "project.phases.services"
+        assert mappings["service_confidence"] == 1.0
@@ -245,3 +245,198 @@ class TestPrefixStripping:
         # "other" doesn't start with the prefix, so should be excluded
         assert "other" not in structure
         assert "name" in structure
+
+
+class TestFlatTable:
+    """The structure is one flat table; nested views are derived on demand."""
+
+    DATA = {
+        "project": {
+            "name": "Test",
+            "sections": [
+                {"title": "A", "items": [{"a": 1}]},
+            ],
+        }
+    }
+
+    def test_records_link_parent_and_children_by_id(self):
+        """Verify parent_id/child_ids describe the nesting."""
+        structure = DataStructureExtractor().extract_structure(self.DATA, strip_prefix="")
+
+        project = structure["project"]
+        sections = structure["project.sections"]
+        title = structure["project.sections[0].title"]
+
+        assert project["parent_id"] is None
+        assert sections["parent_id"] == project["id"]
+        assert title["parent_id"] == sections["id"]
+        assert sections["id"] in project["child_ids"]
+        assert title["id"] in sections["child_ids"]
+
+    def test_subtrees_are_not_duplicated_in_payload(self):
+        """Verify each field is serialized once, without nested children."""
+        import json
+
+        structure = DataStructureExtractor().extract_structure(self.DATA, strip_prefix="")
+        payload = json.dumps(structure)
+
+        assert '"children"' not in payload
+        assert payload.count('"project.sections[0].items[0].a"') == 2  # key + path
+
+    def test_children_view_lists_all_descendants(self):
+        """Verify record['children'] derives descendants in extraction order."""
+        structure = DataStructureExtractor().extract_structure(self.DATA, strip_prefix="")
+
+        children = structure["project.sections"]["children"]
+
+        assert list(children) == [
+            "project.sections[0].title",
+            "project.sections[0].items",
+            "project.sections[0].items[0].a",
+        ]
+        assert children["project.sections[0].items[0].a"]["sample_value"] == 1
+        assert "project.name" not in children
+        assert len(structure["project.name"]["children"]) == 0
+
+    def test_strip_prefix_relinks_top_level_fields(self):
+        """Verify fields directly under the stripped prefix become roots."""
+        data = {"data": {"attributes": {"content": self.DATA}}}
+        structure = DataStructureExtractor().extract_structure(data)
+
+        assert list(structure)[0] == "project"
+        assert structure["project"]["parent_id"] is None
+        assert structure["project.name"]["parent_id"] == structure["project"]["id"]
+
+
+class TestBuildTree:
+    """Test the Miller-columns tree built from a flat structure."""
+
+    def test_fields_nest_under_their_parents(self):
+        """Verify objects and array items nest under their parent node."""
+        extractor = DataStructureExtractor()
+        data = {"project": {"name": "T", "sections": [{"title": "A"}]}}
+        tree = extractor.build_tree(extractor.extract_structure(data, strip_prefix=""))
+
+        assert [c["name"] for c in tree["children"]] == ["project"]
+        project = tree["children"][0]
+        assert [c["name"] for c in project["children"]] == ["name", "sections"]
+
+        sections = project["children"][1]
+        assert sections["is_array"] is True
+        assert sections["array_count"] == 1
+        assert sections["children"] == [{
+            "name": "title",
+            "path": "project.sections[0].title",
+            "type": "string",
+            "sample_value": "A",
+            "is_array": False,
+        }]
+
+    def test_leaf_nodes_have_no_children_key(self):
+        """Verify leaves keep the existing node shape."""
+        extractor = DataStructureExtractor()
+        tree = extractor.build_tree(extractor.extract_structure({"name": "T"}, strip_prefix=""))
+
+        assert tree["children"] == [{
+            "name": "name",
+            "path": "name",
+            "type": "string",
+            "sample_value": "T",
+            "is_array": False,
+        }]
+
+    def test_missing_parents_become_intermediate_nodes(self):
+        """Verify a plain dict without parent records still builds a tree."""
+        extractor = DataStructureExtractor()
+        structure = {"a.b.c": {"type": "string", "sample_value": "x"}}
+
+        tree = extractor.build_tree(structure)
+
+        a = tree["children"][0]
+        assert (a["name"], a["path"], a["type"]) == ("a", "a", "object")
+        b = a["children"][0]
+        assert b["children"][0]["path"] == "a.b.c"
+
+
+class TestUnionMode:
+    """Test union-schema extraction across all array items."""
+
+    def test_fields_from_later_items_are_included(self):
+        """Keys missing from [0] still appear in the union schema."""
+        extractor = DataStructureExtractor(union=True)
+        data = {"items": [{"id": 1}, {"id": 2, "notes": "late field"}]}
+
+        structure = extractor.extract_structure(data, strip_prefix="")
+
+        assert "items[0].notes" in structure
+        assert structure["items[0].notes"]["type"] == "string"
+        assert structure["items[0].notes"]["optional"] is True
+        assert structure["items[0].id"]["optional"] is False
+        assert structure["items[0].id"]["occurrences"] == 2
+
+    def test_null_first_value_is_upgraded(self):
+        """A field that is null in [0] takes its type from later items."""
+        extractor = DataStructureExtractor(union=True)
+        data = {"items": [{"owner": None}, {"owner": "Alice"}]}
+
+        structure = extractor.extract_structure(data, strip_prefix="")
+
+        owner = structure["items[0].owner"]
+        assert owner["type"] == "string"
+        assert owner["nullable"] is True
+        assert owner["observed_types"] == {"null": 1, "string": 1}
+
+    def test_samples_are_bounded(self):
+        """Sample reservoirs never grow past sample_size."""
+        extractor = DataStructureExtractor(union=True, sample_size=3)
+        data = {"items": [{"id": i} for i in range(1000)]}
+
+        structure = extractor.extract_structure(data, strip_prefix="")
+
+        assert len(structure["items[0].id"]["samples"]) == 3
+        assert structure["items"]["array_count"] == 1000
+        assert structure["items"]["total_items"] == 1000
+
+    def test_nested_arrays_merge_across_parents(self):
+        """Nested arrays report their longest occurrence and total items."""
+        extractor = DataStructureExtractor(union=True)
+        data = {"sections": [
+            {"rows": [{"v": 1}]},
+            {"rows": [{"v": 2}, {"v": 3}, {"v": 4}]},
+        ]}
+
+        structure = extractor.extract_structure(data, strip_prefix="")
+
+        rows = structure["sections[0].rows"]
+        assert rows["array_count"] == 3
+        assert rows["total_items"] == 4
+        assert structure["sections[0].rows[0].v"]["occurrences"] == 4
+
+
+class TestChildRecords:
+    """Test direct-child lookups used by the lazy subtree endpoint."""
+
+    def test_root_and_direct_children(self):
+        """child_records returns one level only, top level when no path is given."""
+        extractor = DataStructureExtractor()
+        data = {
+            "project": {"name": "X", "phases": [{"name": "P1", "tasks": [{"hours": 2}]}]},
+            "client": "Acme",
+        }
+
+        structure = extractor.extract_structure(data, strip_prefix="")
+
+        assert [r["path"] for r in structure.child_records()] == ["project", "client"]
+        assert [r["path"] for r in structure.child_records("project")] == ["project.name", "project.phases"]
+        assert [r["path"] for r in structure.child_records("project.phases")] == [
+            "project.phases[0].name", "project.phases[0].tasks"
+        ]
+
+    def test_root_ids_survive_prefix_stripping(self):
+        """Stripping the wrapper prefix re-roots the top-level fields."""
+        extractor = DataStructureExtractor()
+        data = {"data": {"attributes": {"content": {"a": 1, "b": {"c": 2}}}}}
+
+        structure = extractor.extract_structure(data)
+
+        assert [r["path"] for r in structure.child_records()] == ["a", "b"]
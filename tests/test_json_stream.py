@@ -0,0 +1,121 @@
+"""
+Tests for the incremental JSON event reader and its consumers.
+"""
+
+import json
+
+import pytest
+
+from data_structure_extractor import DataStructureExtractor
+from json_stream import iter_events
+
+
+DOCUMENT = {
+    "data": {
+        "attributes": {
+            "content": {
+                "project_name": "Network Refresh ☃",
+                "budget": 12500.75,
+                "active": True,
+                "owner": None,
+                "locations": [
+                    {"name": "HQ", "seats": 120},
+                    {"name": "DC", "seats": 4, "notes": "colo"},
+                ],
+                "tags": ["a", "b"],
+                "matrix": [[1, 2], [3]],
+            }
+        }
+    }
+}
+
+
+def _chunks(text, size):
+    data = text.encode("utf-8")
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def _rebuild(events):
+    """Rebuild a Python value from events (test helper)."""
+    root, stack, keys = [], [], []
+
+    def put(value):
+        if not stack:
+            root.append(value)
+        elif isinstance(stack[-1], dict):
+            stack[-1][keys.pop()] = value
+        else:
+            stack[-1].append(value)
+
+    for event, value in events:
+        if event == "map_key":
+            keys.append(value)
+        elif event in ("start_map", "start_array"):
+            container = {} if event == "start_map" else []
+            put(container)
+            stack.append(container)
+        elif event in ("end_map", "end_array"):
+            stack.pop()
+        else:
+            put(value)
+    return root[0]
+
+
+class TestIterEvents:
+    """Test the event reader itself."""
+
+    @pytest.mark.parametrize("size", [1, 3, 64, 1 << 20])
+    def test_matches_json_loads_for_any_chunking(self, size):
+        """Chunk boundaries inside strings, numbers or literals don't matter."""
+        text = json.dumps(DOCUMENT, ensure_ascii=False)
+        assert _rebuild(iter_events(_chunks(text, size))) == json.loads(text)
+
+    def test_number_types_match_json(self):
+        """Integers stay ints, fractions and exponents become floats."""
+        events = list(iter_events([b'[1, -0, 2.5, 1e3, 12345678901234567890]']))
+        numbers = [value for event, value in events if event == "number"]
+        assert numbers == [1, 0, 2.5, 1000.0, 12345678901234567890]
+        assert [type(n) for n in numbers] == [int, int, float, float, int]
+
+    def test_event_sequence(self):
+        """Object keys and values come out as separate events, in order."""
+        events = list(iter_events(['{"a": [true, null], "b": "x"}']))
+        assert events == [
+            ("start_map", None),
+            ("map_key", "a"),
+            ("start_array", None),
+            ("boolean", True),
+            ("null", None),
+            ("end_array", None),
+            ("map_key", "b"),
+            ("string", "x"),
+            ("end_map", None),
+        ]
+
+    @pytest.mark.parametrize("text", ['{"a": 1,}', '[1 2]', '{"a" 1}', '[1]]', '{"a": tru}', '"abc', '[', '{"a": 1} x'])
+    def test_malformed_documents_raise(self, text):
+        """Malformed or truncated input raises JSONDecodeError."""
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_events(_chunks(text, 2)))
+
+
+class TestStreamingConsumers:
+    """Test that streamed extraction matches extraction from loaded data."""
+
+    @pytest.mark.parametrize("options", [
+        {"template_only": True},
+        {"template_only": False},
+        {"union": True},
+    ])
+    def test_structure_matches_loaded_extraction(self, options):
+        """extract_structure_from_events builds the same table."""
+        text = json.dumps(DOCUMENT)
+        loaded = DataStructureExtractor(**options).extract_structure(json.loads(text))
+        streamed = DataStructureExtractor(**options).extract_structure_from_events(iter_events(_chunks(text, 5)))
+
+        assert json.dumps(streamed) == json.dumps(loaded)
+        assert streamed.paths == loaded.paths
+
+    def test_missing_data_gives_empty_structure(self):
+        """A failed fetch (None) extracts to an empty table."""
+        assert len(DataStructureExtractor().extract_structure_from_events(None)) == 0
@@ -0,0 +1,144 @@
+"""
+Tests for multi-project mapping learning and batched vote writes.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from mapping_database import MappingDatabase
+
+
+def _payload(content):
+    return json.dumps({"data": {"attributes": {"content": content}}}).encode("utf-8")
+
+
+class FakeFetcher:
+    """Serves canned merge data, with a delay standing in for the network."""
+
+    def __init__(self, projects, delay=0.0, in_flight=None):
+        self.projects = projects
+        self.delay = delay
+        self.in_flight = in_flight
+
+    def _fetch(self, project_id, version):
+        if self.in_flight is not None:
+            with self.in_flight["lock"]:
+                self.in_flight["now"] += 1
+                self.in_flight["max"] = max(self.in_flight["max"], self.in_flight["now"])
+        time.sleep(self.delay)
+        if self.in_flight is not None:
+            with self.in_flight["lock"]:
+                self.in_flight["now"] -= 1
+        return self.projects.get(project_id, {}).get(version)
+
+    def fetch_v1_merge_data(self, project_id, stream=False, raw=False):
+        return self._fetch(project_id, "v1")
+
+    def fetch_v2_merge_data(self, project_id, stream=False, raw=False):
+        return self._fetch(project_id, "v2")
+
+
+PROJECTS = {
+    "1": {"v1": _payload({"project_name": "Alpha Build", "client_name": "Acme Corp"}),
+          "v2": _payload({"project": {"project_name": "Alpha Build", "client": {"name": "Acme Corp"}}})},
+    "2": {"v1": _payload({"project_name": "Beta Rollout", "client_name": "Globex"}),
+          "v2": _payload({"project": {"project_name": "Beta Rollout", "client": {"name": "Globex"}}})},
+    "3": {"v1": _payload({"project_name": "Gamma Refresh"}),
+          "v2": _payload({"project": {"title": "Gamma Refresh"}})},
+}
+
+
+class TestAggregateVotes:
+    """Votes are counted once per project per (v1, v2) pair."""
+
+    def test_votes_per_pair(self):
+        pytest.importorskip("requests")
+        from learn_mappings import aggregate_votes
+
+        votes = aggregate_votes({
+            "1": [{"v1_field": "a", "v2_field": "x", "value": "one", "confidence": "medium"},
+                  {"v1_field": "a", "v2_field": "x", "value": "uno", "confidence": "high"}],
+            "2": [{"v1_field": "a", "v2_field": "x", "value": "two", "confidence": "low"},
+                  {"v1_field": "a", "v2_field": "y", "value": "two", "confidence": "high"}],
+        })
+
+        assert [(v["v1_field"], v["v2_field"], v["votes"]) for v in votes] == [("a", "x", 2), ("a", "y", 1)]
+        assert votes[0]["projects"] == ["1", "2"]
+        assert votes[0]["sample_values"] == ["one", "uno", "two"]
+        assert votes[0]["confidence"] == "high"
+
+
+class TestLearnProjects:
+    """Projects are learned concurrently and their votes aggregated."""
+
+    def test_votes_across_projects(self):
+        pytest.importorskip("requests")
+        from learn_mappings import learn_projects
+
+        batch = learn_projects(lambda: FakeFetcher(PROJECTS), ["1", "2", "3", "404"], workers=2)
+        votes = {(v["v1_field"], v["v2_field"]): v["votes"] for v in batch["votes"]}
+
+        assert votes[("project_name", "project.project_name")] == 2
+        assert votes[("client_name", "project.client.name")] == 2
+        assert votes[("project_name", "project.title")] == 1
+        assert batch["projects"]["404"]["error"]
+        assert batch["projects"]["1"]["mappings"] == 2
+
+    def test_fetches_overlap_up_to_worker_limit(self):
+        pytest.importorskip("requests")
+        from learn_mappings import learn_projects
+
+        in_flight = {"lock": threading.Lock(), "now": 0, "max": 0}
+        learn_projects(lambda: FakeFetcher(PROJECTS, delay=0.05, in_flight=in_flight),
+                       ["1", "2", "3"], workers=2)
+        assert in_flight["max"] == 2
+
+
+    def test_quiet_log_silences_learners_only(self, capsys):
+        pytest.importorskip("requests")
+        from learn_mappings import learn_projects
+
+        messages = []
+        learn_projects(lambda: FakeFetcher(PROJECTS), ["1", "2"], log=lambda *args, **kwargs: messages.append(args))
+        assert messages
+        assert capsys.readouterr().out == ""
+
+
+class TestAddVotes:
+    """A batch of votes is applied like repeated add_mapping() calls, saved once."""
+
+    def test_votes_match_repeated_add_mapping(self, tmp_path):
+        batched = MappingDatabase(str(tmp_path / "batched.json"))
+        repeated = MappingDatabase(str(tmp_path / "repeated.json"))
+
+        votes = [
+            {"v1_field": "a", "v2_field": "x", "votes": 2, "projects": ["1", "2"],
+             "sample_values": ["one", "two"], "confidence": "high"},
+            {"v1_field": "a", "v2_field": "y", "votes": 1, "projects": ["2"],
+             "sample_values": ["two"], "confidence": "high"},
+        ]
+        batched.add_votes(votes, projects_analyzed=2)
+
+        repeated.add_mapping("a", "x", "one", "1")
+        repeated.add_mapping("a", "x", "two", "2")
+        repeated.add_mapping("a", "y", "two", "2")
+
+        def comparable(db):
+            mapping = dict(db.get_mapping("a"))
+            for key in ("first_seen", "last_seen"):
+                mapping.pop(key)
+            return mapping
+
+        assert comparable(batched) == comparable(repeated)
+        assert batched.get_statistics()["projects_analyzed"] == 2
+
+    def test_single_write(self, tmp_path, monkeypatch):
+        db = MappingDatabase(str(tmp_path / "db.json"))
+        saves = []
+        monkeypatch.setattr(db, "_save_database", lambda: saves.append(1))
+
+        db.add_votes([{"v1_field": f"f{i}", "v2_field": f"g{i}", "votes": 1} for i in range(50)])
+        assert len(saves) == 1
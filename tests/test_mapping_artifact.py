@@ -0,0 +1,73 @@
+"""
+Tests for the compiled mapping artifact.
+"""
+
+import pytest
+
+import mapping_artifact
+from mapping_artifact import CompiledMappings, compile_mappings, load_compiled_mappings
+from mapping_database import MappingDatabase, database_stamp
+from template_converter import FIELD_MAPPINGS, TemplateConverter
+
+
+@pytest.fixture(params=["mappings.db", "mappings.json"])
+def db_path(tmp_path, request):
+    path = str(tmp_path / request.param)
+    db = MappingDatabase(path)
+    db.add_mapping("client_name", "project.customer.name", confidence="manual")
+    db.add_mapping("rarely_seen", "project.rare")
+    db.add_array_mapping("locations", "project.sites")
+    return path
+
+
+class TestCompileMappings:
+    """Learned mappings are compiled on top of the hardcoded tables."""
+
+    def test_learned_mappings_override_hardcoded(self, db_path):
+        compiled = compile_mappings(MappingDatabase(db_path))
+
+        assert compiled.field_mappings['=client_name'] == '{project.customer.name}'
+        assert compiled.field_mappings['=project_name'] == FIELD_MAPPINGS['=project_name']
+        assert '=rarely_seen' not in compiled.field_mappings  # Seen once: below min_score
+        assert compiled.loop_mappings == {'locations': 'project.sites'}
+        assert compiled.learned_count == 1
+
+    def test_converter_uses_compiled_mappings(self, db_path):
+        compiled = compile_mappings(MappingDatabase(db_path))
+        converter = TemplateConverter('input.docx', 'output.docx', compiled=compiled)
+        converter.active_field_mappings = converter._merge_mappings()
+
+        assert converter._convert_single_field('=client_name') == '{project.customer.name}'
+        assert converter._convert_single_field('locations:if(any?)') == '{#locations}'
+
+
+class TestArtifact:
+    """The artifact is reused until the database or the tables change."""
+
+    def test_reused_until_the_database_changes(self, db_path, tmp_path, monkeypatch):
+        artifact = str(tmp_path / "compiled.pickle")
+        first = load_compiled_mappings(db_path, artifact)
+        assert isinstance(first, CompiledMappings)
+        assert first.stamp[2] == database_stamp(db_path)
+
+        def no_database(path):
+            raise AssertionError("database loaded for a current artifact")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(mapping_artifact, "MappingDatabase", no_database)
+            assert load_compiled_mappings(db_path, artifact) == first
+
+        MappingDatabase(db_path).add_mapping("project_name", "project.title", confidence="manual")
+        assert load_compiled_mappings(db_path, artifact).field_mappings['=project_name'] == '{project.title}'
+
+    def test_recompiled_when_tables_change(self, db_path, tmp_path, monkeypatch):
+        artifact = str(tmp_path / "compiled.pickle")
+        load_compiled_mappings(db_path, artifact)
+
+        monkeypatch.setitem(FIELD_MAPPINGS, '=new_field', '{project.new_field}')
+        assert load_compiled_mappings(db_path, artifact).field_mappings['=new_field'] == '{project.new_field}'
+
+    def test_unreadable_artifact_is_rebuilt(self, db_path, tmp_path):
+        artifact = tmp_path / "compiled.pickle"
+        artifact.write_bytes(b"not a pickle")
+        assert load_compiled_mappings(db_path, str(artifact)).learned_count == 1
@@ -0,0 +1,309 @@
+"""
+Tests for MappingDatabase storage backends.
+"""
+
+import json
+import sqlite3
+
+import pytest
+
+from mapping_database import (LEGACY_JSON_NAME, MappingDatabase, MappingShards, SqliteMappingStore,
+                              get_mapping_database)
+
+
+def _fill(db):
+    db.add_mapping("project_name", "project.name", "Network Refresh", "1")
+    db.add_mapping("project_name", "project.name", "Data Center", "2")
+    db.add_mapping("client", "project.client.name", confidence="manual")
+    db.add_array_mapping("locations", "project.sites", [{"v1": "name", "v2": "site_name"}], "1")
+
+
+class TestSqliteBackend:
+    """The SQLite backend behaves like the JSON one behind the same API."""
+
+    def test_reload_matches_json_backend(self, tmp_path):
+        sqlite_db = MappingDatabase(str(tmp_path / "mappings.db"))
+        json_db = MappingDatabase(str(tmp_path / "mappings.json"))
+        _fill(sqlite_db)
+        _fill(json_db)
+
+        reloaded = MappingDatabase(str(tmp_path / "mappings.db"))
+        assert isinstance(reloaded.store, SqliteMappingStore)
+        assert reloaded.get_all_mappings().keys() == json_db.get_all_mappings().keys()
+        assert reloaded.get_mapping("project_name")["confidence_score"] == 2
+        assert reloaded.get_mapping("project_name")["sample_values"] == ["Network Refresh", "Data Center"]
+        assert reloaded.get_mapping("client")["source"] == "manual"
+        assert reloaded.get_array_mapping("locations")["field_mappings"] == [{"v1": "name", "v2": "site_name"}]
+
+    def test_deletes_and_clear_are_persisted(self, tmp_path):
+        path = str(tmp_path / "mappings.db")
+        db = MappingDatabase(path)
+        _fill(db)
+
+        assert db.delete_mapping("client")
+        assert db.delete_array_mapping("locations")
+        assert list(MappingDatabase(path).get_all_mappings()) == ["project_name"]
+        assert MappingDatabase(path).get_all_array_mappings() == {}
+
+        db.clear()
+        db.set_mapping("other", {"v1_field": "other", "v2_field": "x", "confidence_score": 1})
+        db._save_database()
+        assert list(MappingDatabase(path).get_all_mappings()) == ["other"]
+
+    def test_wal_mode_and_indexes(self, tmp_path):
+        path = str(tmp_path / "mappings.db")
+        MappingDatabase(path)
+
+        conn = sqlite3.connect(path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_mappings_v1_field", "idx_array_mappings_v1_array"} <= indexes
+        assert "idx_mappings_v2_field" not in indexes
+
+    def test_unused_indexes_dropped_from_old_databases(self, tmp_path):
+        path = str(tmp_path / "mappings.db")
+        MappingDatabase(path).close()
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE INDEX idx_mappings_source ON mappings(source)")
+        conn.commit()
+        conn.close()
+
+        MappingDatabase(path)
+
+        conn = sqlite3.connect(path)
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert "idx_mappings_source" not in indexes
+
+
+class TestJsonMigration:
+    """A new SQLite database imports the legacy JSON file once."""
+
+    def test_one_shot_migration(self, tmp_path):
+        legacy = MappingDatabase(str(tmp_path / LEGACY_JSON_NAME))
+        _fill(legacy)
+        legacy.data["metadata"]["total_projects_analyzed"] = 7
+        legacy._save_database()
+
+        db = MappingDatabase(str(tmp_path / "learned_mappings.db"))
+        assert db.get_all_mappings() == legacy.get_all_mappings()
+        assert db.get_all_array_mappings() == legacy.get_all_array_mappings()
+        assert db.get_statistics()["projects_analyzed"] == 7
+
+        # Later changes to the JSON file are not imported again
+        db.delete_mapping("client")
+        with open(tmp_path / LEGACY_JSON_NAME) as f:
+            assert "client" in json.load(f)["mappings"]
+        assert "client" not in MappingDatabase(str(tmp_path / "learned_mappings.db")).get_all_mappings()
+
+
+@pytest.mark.parametrize("name", ["mappings.db", "mappings.json"])
+class TestSharedAccess:
+    """Instances on the same file (e.g. in other workers) see each other's saves."""
+
+    def test_writes_start_from_other_instances_saves(self, tmp_path, name):
+        path = str(tmp_path / name)
+        first, second = MappingDatabase(path), MappingDatabase(path)
+
+        first.add_mapping("project_name", "project.name")
+        second.add_mapping("client", "project.client.name")
+        second.add_mapping("project_name", "project.name")
+
+        reloaded = MappingDatabase(path)
+        assert set(reloaded.get_all_mappings()) == {"project_name", "client"}
+        assert reloaded.get_mapping("project_name")["confidence_score"] == 2
+
+    def test_refresh_reloads_only_after_a_change(self, tmp_path, name):
+        path = str(tmp_path / name)
+        reader, writer = MappingDatabase(path), MappingDatabase(path)
+
+        assert not reader.refresh()
+        writer.add_mapping("client", "project.client.name")
+        assert reader.refresh()
+        assert reader.get_mapping("client")["v2_field"] == "project.client.name"
+        assert not reader.refresh()
+
+    def test_shared_accessor_returns_one_refreshed_instance(self, tmp_path, name):
+        path = str(tmp_path / name)
+        shared = get_mapping_database(path)
+        assert get_mapping_database(path) is shared
+
+        MappingDatabase(path).add_mapping("client", "project.client.name")
+        assert get_mapping_database(path).get_mapping("client") is not None
+
+
+class TestBulkUpsert:
+    """bulk_upsert() validates, merges and writes everything in one save."""
+
+    EXPORTED = {
+        "project_name": {"v1_field": "project_name", "v2_field": "project.name", "confidence_score": 3,
+                         "times_seen": 3, "sample_values": ["Imported"], "projects": ["9"], "source": "learned"},
+        "client": {"v2_field": "project.client.name", "confidence_score": 10, "times_seen": 1, "source": "manual"},
+    }
+
+    def test_merge_adds_up_existing_and_keeps_new_as_is(self, tmp_path):
+        db = MappingDatabase(str(tmp_path / "mappings.db"))
+        db.add_mapping("project_name", "project.name", "Network Refresh", "1")
+
+        result = db.bulk_upsert(self.EXPORTED, {"locations": {"v2_array": "project.sites"}})
+
+        assert (result["added"], result["merged"], result["invalid"]) == (2, 1, 0)
+        merged = db.get_mapping("project_name")
+        assert (merged["confidence_score"], merged["times_seen"]) == (4, 4)
+        assert merged["sample_values"] == ["Network Refresh", "Imported"]
+        assert merged["projects"] == ["1", "9"]
+        assert db.get_mapping("client")["source"] == "manual"
+        assert db.get_array_mapping("locations")["v2_array"] == "project.sites[]"
+        assert MappingDatabase(str(tmp_path / "mappings.db")).get_all_mappings() == db.get_all_mappings()
+
+    def test_skip_and_replace_modes(self, tmp_path):
+        db = MappingDatabase(str(tmp_path / "mappings.db"))
+        db.add_mapping("project_name", "project.name")
+        db.add_mapping("other", "project.other")
+
+        assert db.bulk_upsert(self.EXPORTED, mode="skip")["skipped"] == 1
+        assert db.get_mapping("project_name")["confidence_score"] == 1
+
+        db.bulk_upsert(self.EXPORTED, mode="replace")
+        assert set(MappingDatabase(str(tmp_path / "mappings.db")).get_all_mappings()) == {"project_name", "client"}
+
+        with pytest.raises(ValueError):
+            db.bulk_upsert(self.EXPORTED, mode="overwrite")
+
+    def test_invalid_rows_are_reported_not_written(self, tmp_path):
+        db = MappingDatabase(str(tmp_path / "mappings.db"))
+        result = db.bulk_upsert([
+            {"v1_field": "ok", "v2_field": "project.ok", "value": "x"},
+            {"v1_field": "no_target"},
+            {"v2_field": "project.no_source"},
+            {"v1_field": "bad_score", "v2_field": "x", "confidence_score": "high"},
+            "not a mapping",
+        ])
+
+        assert (result["added"], result["invalid"]) == (1, 4)
+        assert result["errors"][0] == "no_target: missing v2_field"
+        assert list(db.get_all_mappings()) == ["ok"]
+
+    def test_minimal_stored_rows_can_be_merged_later(self, tmp_path):
+        db = MappingDatabase(str(tmp_path / "mappings.db"))
+        db.bulk_upsert({"x": {"v2_field": "a", "confidence_score": 3}},
+                       {"sites[]": {"v2_array": "project.sites[]", "confidence_score": 2}})
+
+        db.add_mapping("x", "a", "sample", "1")
+        db.add_array_mapping("sites", "project.sites", [{"v1": "name", "v2": "name"}], "1")
+
+        assert (db.get_mapping("x")["times_seen"], db.get_mapping("x")["projects"]) == (2, ["1"])
+        assert db.get_array_mapping("sites")["field_mappings"] == [{"v1": "name", "v2": "name"}]
+
+    def test_failure_drops_unsaved_changes(self, tmp_path, monkeypatch):
+        db = MappingDatabase(str(tmp_path / "mappings.db"))
+        db.add_mapping("kept", "project.kept")
+
+        def fail():
+            raise OSError("disk full")
+        monkeypatch.setattr(db, "_save_database", fail)
+        with pytest.raises(OSError):
+            db.bulk_upsert(self.EXPORTED, mode="replace")
+        monkeypatch.undo()
+
+        assert list(db.get_all_mappings()) == ["kept"]
+        db.add_mapping("other", "project.other")
+        assert set(MappingDatabase(str(tmp_path / "mappings.db")).get_all_mappings()) == {"kept", "other"}
+
+    def test_learned_rows_match_add_mapping_in_one_save(self, tmp_path, monkeypatch):
+        bulk = MappingDatabase(str(tmp_path / "bulk.json"))
+        single = MappingDatabase(str(tmp_path / "single.json"))
+        rows = [{"v1_field": "a", "v2_field": "x", "value": "one"},
+                {"v1_field": "a", "v2_field": "x", "value": "two", "confidence": "manual"},
+                {"v1_field": "a", "v2_field": "y"}]
+        for row in rows:
+            single.add_mapping(row["v1_field"], row["v2_field"], row.get("value"), "7",
+                               row.get("confidence", "high"))
+
+        saves = []
+        save = bulk._save_database
+        monkeypatch.setattr(bulk, "_save_database", lambda: (saves.append(1), save()))
+        bulk.bulk_upsert(rows, project_id="7")
+
+        def comparable(db):
+            return {k: v for k, v in db.get_mapping("a").items() if k not in ("first_seen", "last_seen")}
+
+        assert comparable(bulk) == comparable(single)
+        assert saves == [1]
+
+
+class TestMappingShards:
+    """Each account gets its own database, layered over the global one."""
+
+    def _shards(self, tmp_path, **kwargs):
+        return MappingShards(shard_dir=str(tmp_path / "shards"),
+                             global_db_path=str(tmp_path / "global.db"), **kwargs)
+
+    def test_accounts_are_isolated(self, tmp_path):
+        shards = self._shards(tmp_path, use_fallback=False)
+        shards.for_account("acme").add_mapping("client", "project.client.name")
+        shards.for_account("globex").add_mapping("client", "project.customer.name")
+
+        assert shards.for_account("acme").get_mapping("client")["v2_field"] == "project.client.name"
+        assert shards.for_account("globex").get_mapping("client")["v2_field"] == "project.customer.name"
+        assert shards.for_account(None).get_all_mappings() == {}
+        assert (tmp_path / "shards" / "acme.db").exists()
+
+    def test_fallback_to_global_database(self, tmp_path):
+        shards = self._shards(tmp_path)
+        shards.global_database().add_mapping("client", "project.client.name")
+        shards.global_database().add_mapping("project_name", "project.name")
+        acme = shards.for_account("acme")
+        acme.add_mapping("client", "project.customer.name", confidence="manual")
+
+        assert acme.get_mapping("project_name")["v2_field"] == "project.name"
+        assert acme.get_mapping("client")["v2_field"] == "project.customer.name"
+        assert set(acme.get_all_mappings()) == {"client", "project_name"}
+        assert acme.query_mappings(search="project.name")["total"] == 1
+        assert acme.get_statistics()["total_mappings"] == 2
+        # Writes stay in the shard
+        assert list(MappingDatabase(acme.db_path).get_all_mappings()) == ["client"]
+        assert shards.global_database().get_mapping("client")["v2_field"] == "project.client.name"
+
+        # Global changes show through, including in the index
+        shards.global_database().add_mapping("status", "project.status")
+        assert acme.query_mappings(search="status")["total"] == 1
+        assert acme.delete_mapping("client")
+        assert acme.get_mapping("client")["v2_field"] == "project.client.name"
+
+    def test_deleting_an_inherited_mapping_hides_it_in_the_shard(self, tmp_path):
+        shards = self._shards(tmp_path)
+        shards.global_database().add_mapping("client", "project.client.name")
+        shards.global_database().add_array_mapping("locations", "project.sites")
+        acme = shards.for_account("acme")
+
+        assert acme.delete_mapping("client")
+        assert acme.delete_array_mapping("locations")
+        assert acme.get_mapping("client") is None
+        assert acme.get_all_mappings() == {} and acme.get_all_array_mappings() == {}
+        assert acme.query_mappings()["total"] == 0
+        assert not acme.delete_mapping("client")
+
+        reopened = self._shards(tmp_path).for_account("acme")
+        assert reopened.get_all_mappings() == {}
+        assert shards.for_account("globex").get_mapping("client") is not None
+        assert shards.global_database().get_mapping("client") is not None
+
+    def test_least_recently_used_shards_are_dropped_over_the_cap(self, tmp_path):
+        shards = self._shards(tmp_path, max_disk_bytes=1)
+        first = shards.for_account("acme")
+        shards.for_account("globex")
+        assert shards.loaded() == ["globex"]
+        assert first.store.conn is None  # Closed when dropped
+        # Reopened from disk on next use
+        assert shards.for_account("acme") is not first
+        assert shards.loaded() == ["acme"]
+
+        roomy = self._shards(tmp_path, max_disk_bytes=10 * 1024 * 1024)
+        acme = roomy.for_account("acme")
+        roomy.for_account("globex")
+        assert roomy.for_account("acme") is acme
+        assert roomy.loaded() == ["globex", "acme"]
+
+    def test_slugs_are_file_safe(self, tmp_path):
+        shards = self._shards(tmp_path)
+        assert shards.shard_path("../Acme Co").endswith("___acme_co.db")
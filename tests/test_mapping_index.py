@@ -0,0 +1,124 @@
+"""
+Tests for the sorted mapping indexes behind paged mapping queries.
+"""
+
+import random
+
+import pytest
+
+from mapping_database import MappingDatabase
+from mapping_index import MappingIndex
+
+
+def _mappings(count=300, seed=7):
+    rng = random.Random(seed)
+    words = ["project", "client", "Name", "total", "phase", "service", "site", "date"]
+    mappings = {}
+    for i in range(count):
+        v1 = f"{rng.choice(words)}_{rng.choice(words)}_{i}"
+        mappings[v1] = {
+            "v1_field": v1,
+            "v2_field": f"{rng.choice(words)}.{rng.choice(words)}_{i}",
+            "confidence_score": rng.randint(1, 12),
+            "source": rng.choice(["learned", "manual"]),
+        }
+    return mappings
+
+
+def _brute_force(mappings, search=None, match="substring", field="both", source=None, min_score=None):
+    def text_matches(value):
+        value, needle = value.lower(), search.lower()
+        return value.startswith(needle) if match == "prefix" else needle in value
+
+    keys = []
+    for key, mapping in mappings.items():
+        values = {"v1": [key], "v2": [mapping["v2_field"]], "both": [key, mapping["v2_field"]]}[field]
+        if search and not any(text_matches(value) for value in values):
+            continue
+        if source and mapping["source"] != source:
+            continue
+        if min_score is not None and mapping["confidence_score"] < min_score:
+            continue
+        keys.append(key)
+    return keys
+
+
+class TestMappingIndexQuery:
+    """query() agrees with a full scan."""
+
+    @pytest.mark.parametrize("filters", [
+        {},
+        {"search": "name"},
+        {"search": "NAME_s", "field": "v1"},
+        {"search": "site.", "match": "prefix", "field": "v2"},
+        {"search": "client", "match": "prefix", "source": "manual"},
+        {"source": "learned", "min_score": 6},
+        {"min_score": 11},
+        {"search": "no such text"},
+    ])
+    def test_filters_match_full_scan(self, filters):
+        mappings = _mappings()
+        index = MappingIndex()
+        index.sync(mappings)
+
+        total, page = index.query(**filters)
+        expected = sorted(_brute_force(mappings, **filters), key=lambda k: (k.lower(), k))
+        assert total == len(expected)
+        assert page == expected
+
+    def test_pages_and_orders(self):
+        mappings = _mappings()
+        index = MappingIndex()
+        index.sync(mappings)
+
+        by_score = sorted(mappings, key=lambda k: (mappings[k]["confidence_score"], k), reverse=True)
+        assert index.query(sort="confidence", descending=True, offset=20, limit=10) == (300, by_score[20:30])
+
+        manual = sorted((k for k in mappings if mappings[k]["source"] == "manual"),
+                        key=lambda k: (mappings[k]["v2_field"].lower(), k))
+        assert index.query(source="manual", sort="v2_field", offset=5, limit=5) == (len(manual), manual[5:10])
+
+    def test_incremental_updates_match_rebuild(self):
+        mappings = _mappings()
+        index = MappingIndex()
+        index.sync(mappings)
+
+        changed = list(mappings)[:10]
+        for key in changed[:5]:
+            del mappings[key]
+        for key in changed[5:]:
+            mappings[key] = dict(mappings[key], v2_field="moved.field", confidence_score=99)
+        mappings["brand_new"] = {"v2_field": "project.brand_new", "confidence_score": 3, "source": "manual"}
+        index.invalidate(changed + ["brand_new"])
+        index.sync(mappings)
+
+        rebuilt = MappingIndex()
+        rebuilt.sync(mappings)
+        assert (index.by_v1, index.by_v2, index.by_score) == (rebuilt.by_v1, rebuilt.by_v2, rebuilt.by_score)
+        assert index.query(search="moved.", match="prefix", field="v2")[0] == 5
+
+
+class TestDatabaseQueries:
+    """MappingDatabase keeps its index in step with writes."""
+
+    def test_query_sees_writes_and_deletes(self, tmp_path):
+        db = MappingDatabase(str(tmp_path / "mappings.db"))
+        db.bulk_upsert(_mappings(50))
+        assert db.query_mappings(limit=10)["total"] == 50
+
+        db.add_mapping("zzz_client", "project.client.name", confidence="manual")
+        first = db.query_mappings(search="zzz", match="prefix")["mappings"]
+        assert [key for key, _ in first] == ["zzz_client"]
+
+        db.delete_mapping("zzz_client")
+        assert db.query_mappings(search="zzz")["total"] == 0
+
+    def test_high_confidence_mappings_use_index(self, tmp_path):
+        db = MappingDatabase(str(tmp_path / "mappings.db"))
+        db.bulk_upsert(_mappings(50))
+
+        high = db.get_high_confidence_mappings(min_score=5)
+        assert set(high) == {k for k, v in db.get_all_mappings().items() if v["confidence_score"] >= 5}
+        scores = [v["confidence_score"] for v in high.values()]
+        assert scores == sorted(scores, reverse=True)
+        assert db.get_statistics()["very_high_confidence"] == len(high)
@@ -0,0 +1,94 @@
+"""
+Tests for NDJSON mapping export and import.
+"""
+
+import io
+import json
+
+import pytest
+
+import mapping_ndjson
+from mapping_database import MappingDatabase
+from mapping_ndjson import import_ndjson, iter_ndjson_export
+
+
+def _fill(db, count=5):
+    db.bulk_upsert([{"v1_field": f"field_{i}", "v2_field": f"project.field_{i}", "times_seen": i + 1}
+                    for i in range(count)])
+    db.add_array_mapping("locations", "project.sites", [{"v1": "name", "v2": "site_name"}])
+
+
+class TestNdjsonRoundTrip:
+    """An export imports back into an identical database."""
+
+    def test_round_trip(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(mapping_ndjson, "EXPORT_CHUNK_SIZE", 200)
+        source = MappingDatabase(str(tmp_path / "source.db"))
+        _fill(source, 50)
+
+        chunks = list(iter_ndjson_export(source))
+        assert len(chunks) > 1
+        lines = ''.join(chunks).splitlines()
+        assert json.loads(lines[0])["type"] == "header"
+        assert len(lines) == 1 + 50 + 1
+
+        target = MappingDatabase(str(tmp_path / "target.db"))
+        result = import_ndjson(target, io.BytesIO(''.join(chunks).encode('utf-8')), batch_size=7)
+        assert (result["added"], result["invalid"], result["batches"]) == (51, 0, 8)
+
+        reloaded = MappingDatabase(str(tmp_path / "target.db"))
+        assert reloaded.get_all_mappings() == source.get_all_mappings()
+        assert reloaded.get_all_array_mappings() == source.get_all_array_mappings()
+
+
+class TestNdjsonImport:
+    """Import validates line by line and writes in batches."""
+
+    def test_bad_lines_are_reported_and_skipped(self, tmp_path):
+        db = MappingDatabase(str(tmp_path / "mappings.db"))
+        lines = [
+            '{"type": "mapping", "key": "client", "mapping": {"v2_field": "project.client.name"}}',
+            '',
+            'not json',
+            '["a list"]',
+            '{"type": "widget", "key": "x"}',
+            '{"type": "mapping", "mapping": {"v2_field": "x"}}',
+            '{"type": "mapping", "key": "no_target", "mapping": {}}',
+        ]
+        result = import_ndjson(db, [line.encode('utf-8') for line in lines] + [b'{"key": "\xff"}'])
+
+        assert (result["added"], result["invalid"], result["lines"]) == (1, 6, 7)
+        assert any(error.startswith("Line 8: invalid UTF-8") for error in result["errors"])
+        assert result["errors"][0].startswith("Line 3: invalid JSON")
+        assert db.get_mapping("client")["v2_field"] == "project.client.name"
+
+    def test_replace_clears_once(self, tmp_path):
+        db = MappingDatabase(str(tmp_path / "mappings.db"))
+        _fill(db)
+        lines = [json.dumps({"type": "mapping", "key": f"new_{i}", "mapping": {"v2_field": f"project.new_{i}"}})
+                 for i in range(5)]
+
+        import_ndjson(db, lines, mode="replace", batch_size=2)
+        assert sorted(db.get_all_mappings()) == [f"new_{i}" for i in range(5)]
+        assert db.get_all_array_mappings() == {}
+
+        import_ndjson(db, [], mode="replace")
+        assert db.get_all_mappings() == {}
+
+    def test_replace_keeps_old_rows_until_stream_is_read(self, tmp_path):
+        db = MappingDatabase(str(tmp_path / "mappings.db"))
+        _fill(db)
+
+        def lines():
+            for i in range(5):
+                yield json.dumps({"type": "mapping", "key": f"new_{i}", "mapping": {"v2_field": "x"}})
+            raise ConnectionError("client went away")
+
+        with pytest.raises(ConnectionError):
+            import_ndjson(db, lines(), mode="replace", batch_size=2)
+        assert sorted(MappingDatabase(str(tmp_path / "mappings.db")).get_all_mappings()) == \
+            [f"field_{i}" for i in range(5)]
+
+    def test_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            import_ndjson(MappingDatabase(str(tmp_path / "mappings.db")), [], mode="append")
@@ -0,0 +1,57 @@
+"""
+Tests for per-thread print() capture.
+"""
+
+import threading
+
+from output_capture import capture_output
+
+
+class TestCaptureOutput:
+    """Test that each thread only captures its own output."""
+
+    def test_captures_prints_in_block(self, capsys):
+        """Prints inside the block are captured, later ones reach stdout."""
+        with capture_output() as log:
+            print("inside")
+        print("outside")
+
+        assert log.getvalue() == "inside\n"
+        assert capsys.readouterr().out == "outside\n"
+
+    def test_threads_capture_separately(self, capsys):
+        """Concurrent captures neither see each other nor the main thread."""
+        barrier = threading.Barrier(3)
+        logs = {}
+
+        def work(name):
+            with capture_output() as log:
+                barrier.wait()
+                for i in range(50):
+                    print(f"{name} {i}")
+                barrier.wait()
+            logs[name] = log.getvalue()
+
+        threads = [threading.Thread(target=work, args=(name,)) for name in ("a", "b")]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        print("main")
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+
+        for name in ("a", "b"):
+            assert logs[name].splitlines() == [f"{name} {i}" for i in range(50)]
+        assert capsys.readouterr().out == "main\n"
+
+    def test_nested_capture_restores_outer(self):
+        """Leaving an inner capture resumes the outer one."""
+        with capture_output() as outer:
+            print("one")
+            with capture_output() as inner:
+                print("two")
+            print("three")
+
+        assert inner.getvalue() == "two\n"
+        assert outer.getvalue() == "one\nthree\n"
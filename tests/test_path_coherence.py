@@ -0,0 +1,93 @@
+"""
+Tests for PathCoherenceScorer.
+"""
+
+from path_coherence import PathCoherenceScorer, _PathTrie
+
+
+V1_FIELDS = [
+    'phases_with_tasks:each(phase)',
+    '=phase.name',
+    'phase.tasks:each(task)',
+    '=task.name',
+    '=task.description',
+    'phase.tasks:end',
+    'phases_with_tasks:end',
+]
+
+
+class TestPinnedMappings:
+    """Pinning a mapping refreshes the rankings of affected fields."""
+
+    def test_pin_boosts_sibling_candidates_under_same_prefix(self):
+        scorer = PathCoherenceScorer()
+        structure = scorer.parse_v1_structure(V1_FIELDS)
+        candidates = [
+            ('other.groups[].items[].description', 'value_match'),
+            ('project.phases[].services[].description', 'value_match'),
+        ]
+
+        before = scorer.rank_v2_candidates('=task.description', candidates, structure)
+        assert before[0]['coherence_score'] == before[1]['coherence_score']
+
+        refreshed = scorer.pin_mapping(
+            '=task.name', 'project.phases[].services[].name', structure
+        )
+
+        assert '=task.description' in refreshed
+        best = refreshed['=task.description'][0]
+        assert best['v2_path'] == 'project.phases[].services[].description'
+        assert best['coherence_score'] > before[0]['coherence_score']
+        assert scorer.get_ranking('=task.description') == refreshed['=task.description']
+
+    def test_pin_skips_fields_never_ranked(self):
+        scorer = PathCoherenceScorer()
+        structure = scorer.parse_v1_structure(V1_FIELDS)
+
+        refreshed = scorer.pin_mapping('=task.name', 'project.phases[].services[].name', structure)
+
+        assert refreshed == {}
+        assert scorer.pinned_mappings == {'=task.name': 'project.phases[].services[].name'}
+
+
+class TestBatchRanking:
+    """rank_all_v2_candidates() matches per-field ranking."""
+
+    CANDIDATES = [
+        ('project.pricing.phases[].services[].name', 'value_match'),
+        ('project.pricing.phases[].name', 'value_match'),
+        ('project.pricingx.items[].name', 'value_match'),
+        ('some_other_array[].random_field[].name', 'value_match'),
+        ('project.tasks[].description', 'value_match'),
+    ]
+
+    def test_same_rankings_as_one_field_at_a_time(self):
+        contexts = {('phase',): ['project', 'pricing', 'phases'],
+                    ('phase', 'task'): ['project', 'pricing', 'phases', 'services']}
+        field_candidates = {field: self.CANDIDATES for field in ('=phase.name', '=task.name', '=task.description')}
+
+        single = PathCoherenceScorer()
+        structure = single.parse_v1_structure(V1_FIELDS)
+        single.pinned_mappings['=task.name'] = 'project.pricing.phases[].services[].name'
+        expected = {
+            field: single.rank_v2_candidates(field, candidates, structure,
+                                             contexts[tuple(structure[field]['context_path'])])
+            for field, candidates in field_candidates.items()
+        }
+
+        batch = PathCoherenceScorer()
+        batch.pinned_mappings['=task.name'] = 'project.pricing.phases[].services[].name'
+        assert batch.rank_all_v2_candidates(field_candidates, structure, contexts) == expected
+
+    def test_batch_rankings_refresh_on_pin(self):
+        scorer = PathCoherenceScorer()
+        structure = scorer.parse_v1_structure(V1_FIELDS)
+        scorer.rank_all_v2_candidates({'=task.description': self.CANDIDATES}, structure)
+
+        refreshed = scorer.pin_mapping('=task.name', 'project.tasks[].name', structure)
+
+        assert refreshed['=task.description'][0]['v2_path'] == 'project.tasks[].description'
+
+    def test_trie_common_lengths(self):
+        trie = _PathTrie(['a.b.c', 'a.b.d.e', 'a.x', 'z'])
+        assert trie.common_lengths(['a', 'b', 'd']) == {'a.b.c': 2, 'a.b.d.e': 3, 'a.x': 1, 'z': 0}
@@ -0,0 +1,95 @@
+"""
+Tests for the progress publish/subscribe channel and its event stream.
+"""
+
+import json
+import threading
+
+from progress_channel import ProgressChannel, progress_stream
+from session_manager import SessionManager
+
+
+def _events(stream):
+    """Decoded data: events of an SSE stream"""
+    return [json.loads(chunk[len('data: '):]) for chunk in stream if chunk.startswith('data: ')]
+
+
+class TestProgressChannel:
+    """Publishes reach current subscribers; the latest is kept for new ones."""
+
+    def test_publish_and_subscribe(self):
+        channel = ProgressChannel()
+        channel.publish('s1', {'step': 0})
+        with channel.subscribe('s1') as updates:
+            channel.publish('s1', {'step': 1})
+            channel.publish('s2', {'step': 9})
+            assert updates.get_nowait() == {'step': 1}
+            assert updates.empty()
+        assert channel.subscriber_count('s1') == 0
+        assert channel.latest('s1') == {'step': 1}
+
+    def test_slow_subscriber_keeps_the_newest(self):
+        channel = ProgressChannel(queue_size=2)
+        with channel.subscribe('s1') as updates:
+            for step in range(5):
+                channel.publish('s1', {'step': step})
+            assert [updates.get_nowait()['step'] for _ in range(2)] == [3, 4]
+
+
+class TestProgressStream:
+    """The SSE stream sends changed progress until a terminal status."""
+
+    def test_stream_follows_published_progress(self):
+        channel = ProgressChannel()
+        progress = {'success': True, 'status': 'in_progress', 'iteration': 0}
+        channel.publish('s1', progress)
+        stream = progress_stream('s1', lambda session_id: progress, channel=channel, poll_interval=5)
+
+        assert next(stream).startswith('retry:')
+        assert json.loads(next(stream)[len('data: '):])['iteration'] == 0
+
+        def publish():
+            channel.publish('s1', dict(progress, iteration=1))
+            channel.publish('s1', dict(progress, iteration=1))  # Unchanged: not sent again
+            channel.publish('s1', dict(progress, iteration=2, status='complete'))
+
+        threading.Timer(0.05, publish).start()
+        assert [event['iteration'] for event in _events(stream)] == [1, 2]
+
+    def test_missing_session_times_out(self):
+        missing = {'success': False, 'error': 'Session not found'}
+        events = _events(progress_stream('nope', lambda session_id: missing, channel=ProgressChannel(),
+                                         poll_interval=0.01, missing_timeout=0.05))
+        assert events == [missing]
+
+    def test_progress_saved_by_another_process(self, tmp_path):
+        writer, reader = SessionManager(tmp_path), SessionManager(tmp_path)
+        writer.update_progress('s1', {'iteration': 1, 'status': 'comparing', 'message': 'Comparing'})
+
+        def finish():
+            writer.update_progress('s1', {'iteration': 2, 'status': 'complete', 'message': 'Done'})
+            writer.sessions['s1']['status'] = 'complete'
+            writer._save_sessions()
+
+        # A separate channel: nothing is published to this stream
+        stream = progress_stream('s1', reader.get_progress, channel=ProgressChannel(), poll_interval=0.01)
+        threading.Timer(0.05, finish).start()
+        events = _events(stream)
+        assert events[0]['message'] == 'Comparing'
+        assert events[-1]['status'] == 'complete'
+
+
+class TestSessionManagerPublishes:
+    """Saving progress publishes it to the process-wide channel."""
+
+    def test_update_progress_publishes(self, tmp_path):
+        from progress_channel import progress_channel
+
+        manager = SessionManager(tmp_path)
+        with progress_channel.subscribe('s1') as updates:
+            manager.update_progress('s1', {'iteration': 1, 'status': 'comparing', 'message': 'Comparing'})
+            manager.sessions['s1']['status'] = 'failed'
+            manager._save_sessions()
+
+            assert updates.get_nowait()['message'] == 'Comparing'
+            assert updates.get_nowait()['status'] == 'failed'
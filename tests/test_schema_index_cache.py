@@ -0,0 +1,97 @@
+"""
+Tests for the schema-fingerprint keyed field index cache.
+"""
+
+from data_structure_extractor import DataStructureExtractor
+from schema_index_cache import SchemaIndexCache, schema_fingerprint
+from semantic_matcher import SemanticMatcher
+
+
+def _structure(data):
+    return DataStructureExtractor().extract_structure(data, strip_prefix="")
+
+
+V2_DATA = {
+    "project": {
+        "project_name": "Network Refresh",
+        "customer_name": "Acme Corp",
+        "project_locations": [
+            {"location_name": "HQ", "city": "Austin"},
+            {"location_name": "DC", "city": "Dallas"},
+        ],
+    }
+}
+
+V1_DATA = {
+    "project_name": "Network Refresh",
+    "client_name": "Acme Corp",
+    "locations": [{"name": "HQ", "city": "Austin"}],
+}
+
+
+class TestSchemaFingerprint:
+    """The fingerprint depends on shape only."""
+
+    def test_ignores_sample_values_and_array_lengths(self):
+        other = {
+            "project": {
+                "project_name": "Other Project",
+                "customer_name": "Globex",
+                "project_locations": [{"location_name": "Lab", "city": "Reno"}],
+            }
+        }
+        assert schema_fingerprint(_structure(V2_DATA)) == schema_fingerprint(_structure(other))
+
+    def test_changes_with_paths_or_types(self):
+        renamed = {"project": {**V2_DATA["project"], "client_name": "Acme"}}
+        retyped = {"project": {**V2_DATA["project"], "project_name": 42}}
+
+        base = schema_fingerprint(_structure(V2_DATA))
+        assert schema_fingerprint(_structure(renamed)) != base
+        assert schema_fingerprint(_structure(retyped)) != base
+
+
+class TestSchemaIndexCache:
+    """Cached indexes round-trip through disk and give the same matches."""
+
+    def test_round_trip(self, tmp_path):
+        structure = _structure(V2_DATA)
+        fingerprint = schema_fingerprint(structure)
+        index = SemanticMatcher().build_field_index(structure)
+
+        SchemaIndexCache(tmp_path).save(fingerprint, index, {'city': ('city', ['city'])})
+        loaded_index, features = SchemaIndexCache(tmp_path).load(fingerprint)
+
+        assert loaded_index == index
+        assert features == {'city': ('city', ['city'])}
+
+    def test_missing_fingerprint_returns_none(self, tmp_path):
+        assert SchemaIndexCache(tmp_path).load('0' * 64) is None
+
+    def test_cached_matching_is_identical(self, tmp_path):
+        v1_structure = _structure(V1_DATA)
+        v2_structure = _structure(V2_DATA)
+
+        expected = SemanticMatcher().find_best_matches(v1_structure, v2_structure)
+
+        # First run builds and persists, second run (fresh process state) loads
+        SemanticMatcher(index_cache=SchemaIndexCache(tmp_path)).find_best_matches(v1_structure, v2_structure)
+        cached = SemanticMatcher(index_cache=SchemaIndexCache(tmp_path)).find_best_matches(v1_structure, v2_structure)
+
+        assert len(list(tmp_path.glob('*.idx'))) == 2
+        assert cached == expected
+
+    def test_array_counts_come_from_current_structure(self, tmp_path):
+        matcher = SemanticMatcher(index_cache=SchemaIndexCache(tmp_path))
+        matcher.build_field_index(_structure(V2_DATA))
+
+        three_locations = {"project": {**V2_DATA["project"], "project_locations": [
+            {"location_name": "A", "city": "X"},
+            {"location_name": "B", "city": "Y"},
+            {"location_name": "C", "city": "Z"},
+        ]}}
+        index = SemanticMatcher(index_cache=SchemaIndexCache(tmp_path)).build_field_index(
+            _structure(three_locations)
+        )
+
+        assert index["project.project_locations"].array_count == 3
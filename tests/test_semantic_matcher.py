@@ -0,0 +1,156 @@
+"""
+Tests for SemanticMatcher.
+
+Covers the process-pool mode, which must produce exactly the same
+output as the serial mode.
+"""
+
+import pytest
+from data_structure_extractor import DataStructureExtractor
+from semantic_matcher import SemanticMatcher
+
+
+@pytest.fixture
+def structures():
+    """A small v1/v2 schema pair with renamed fields and arrays."""
+    v1_data = {
+        "project_name": "Network Refresh",
+        "client_name": "Acme Corp",
+        "locations": [
+            {"name": "HQ", "address": "1 Main St", "city": "Austin"},
+            {"name": "DC", "address": "2 Side St", "city": "Dallas"},
+        ],
+        "phases": [
+            {"phase_name": "Design", "tasks": [{"task_name": "Survey", "hours": 4}]},
+        ],
+        "pricing": {"total_price": 1200.5, "hourly_rate": 150},
+    }
+    v2_data = {
+        "project": {
+            "project_name": "Network Refresh",
+            "customer_name": "Acme Corp",
+            "project_locations": [
+                {"location_name": "HQ", "address": "1 Main St", "city": "Austin"},
+            ],
+            "phases": [
+                {"name": "Design", "services": [{"service_name": "Survey", "quantity": 4}]},
+            ],
+        },
+        "project_pricing": {"total_cost": 1200.5, "rate": 150},
+    }
+    extractor = DataStructureExtractor()
+    return (
+        extractor.extract_structure(v1_data, strip_prefix=""),
+        extractor.extract_structure(v2_data, strip_prefix=""),
+    )
+
+
+def _as_tuples(matches):
+    return [(m.v1_path, m.v2_path, m.confidence, m.match_type, m.reasons) for m in matches]
+
+
+class TestParallelMatching:
+    """The process-pool mode must be a drop-in replacement for the serial mode."""
+
+    def test_find_best_matches_parallel_matches_serial(self, structures):
+        v1_structure, v2_structure = structures
+        matcher = SemanticMatcher()
+
+        serial = matcher.find_best_matches(v1_structure, v2_structure, workers=1)
+        parallel = matcher.find_best_matches(v1_structure, v2_structure, workers=3)
+
+        assert serial
+        assert _as_tuples(parallel) == _as_tuples(serial)
+
+    def test_match_arrays_parallel_matches_serial(self, structures):
+        v1_structure, v2_structure = structures
+        matcher = SemanticMatcher()
+
+        serial = matcher.match_arrays(v1_structure, v2_structure, min_confidence=0.3, workers=1)
+        parallel = matcher.match_arrays(v1_structure, v2_structure, min_confidence=0.3, workers=2)
+
+        assert serial
+        assert _as_tuples(parallel) == _as_tuples(serial)
+
+    def test_instance_default_workers(self, structures):
+        v1_structure, v2_structure = structures
+
+        serial = SemanticMatcher().find_best_matches(v1_structure, v2_structure)
+        parallel = SemanticMatcher(workers=2).find_best_matches(v1_structure, v2_structure)
+
+        assert _as_tuples(parallel) == _as_tuples(serial)
+
+
+@pytest.fixture
+def ambiguous_structures():
+    """V1 locations that could map to either of two identical V2 arrays."""
+    v1_data = {"locations": [{"name": "HQ", "city": "Austin"}], "budget": 1000}
+    v2_data = {
+        "project": {
+            "sites": [{"name": "HQ", "city": "Austin"}],
+            "offices": [{"name": "HQ", "city": "Austin"}],
+            "budget": 1000,
+        }
+    }
+    extractor = DataStructureExtractor()
+    return (
+        extractor.extract_structure(v1_data, strip_prefix=""),
+        extractor.extract_structure(v2_data, strip_prefix=""),
+    )
+
+
+class TestMatchState:
+    """Pinning a manual mapping re-ranks only the fields it affects."""
+
+    def test_initial_state_matches_find_best_matches(self, structures):
+        v1_structure, v2_structure = structures
+        matcher = SemanticMatcher()
+
+        state = matcher.build_match_state(v1_structure, v2_structure)
+
+        expected = matcher.find_best_matches(v1_structure, v2_structure)
+        assert _as_tuples(state.results()) == _as_tuples(expected)
+
+    def test_pin_pulls_siblings_into_same_parent(self, ambiguous_structures):
+        v1_structure, v2_structure = ambiguous_structures
+        matcher = SemanticMatcher()
+        state = matcher.build_match_state(v1_structure, v2_structure)
+        assert state.best["locations[0].city"].v2_path == "project.sites[0].city"
+
+        updated = matcher.pin_mapping(state, "locations[0].name", "project.offices[0].name")
+
+        assert updated[0].v1_path == "locations[0].name"
+        assert updated[0].match_type == "manual"
+        assert state.best["locations[0].city"].v2_path == "project.offices[0].city"
+        assert "locations[0].city" in {m.v1_path for m in updated}
+
+    def test_pinned_v2_path_is_not_suggested_elsewhere(self, ambiguous_structures):
+        v1_structure, v2_structure = ambiguous_structures
+        matcher = SemanticMatcher()
+        state = matcher.build_match_state(v1_structure, v2_structure)
+
+        matcher.pin_mapping(state, "locations[0].city", "project.sites[0].name")
+
+        others = [m for m in state.results() if m.v1_path != "locations[0].city"]
+        assert all(m.v2_path != "project.sites[0].name" for m in others)
+
+    def test_unaffected_fields_are_not_reranked(self, ambiguous_structures):
+        v1_structure, v2_structure = ambiguous_structures
+        matcher = SemanticMatcher()
+        state = matcher.build_match_state(v1_structure, v2_structure)
+        before = state.best["budget"]
+
+        matcher.pin_mapping(state, "locations[0].name", "project.offices[0].name")
+
+        assert state.best["budget"] is before
+
+    def test_unpin_restores_original_ranking(self, ambiguous_structures):
+        v1_structure, v2_structure = ambiguous_structures
+        matcher = SemanticMatcher()
+        state = matcher.build_match_state(v1_structure, v2_structure)
+        original = _as_tuples(state.results())
+
+        matcher.pin_mapping(state, "locations[0].name", "project.offices[0].name")
+        matcher.unpin_mapping(state, "locations[0].name")
+
+        assert _as_tuples(state.results()) == original
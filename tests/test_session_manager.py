@@ -0,0 +1,166 @@
+"""
+Tests for SessionManager's snapshot + event log storage.
+"""
+
+import json
+import threading
+
+import session_manager
+from session_manager import SessionLog, SessionManager
+
+
+def _tick(manager, session_id, iteration):
+    manager.update_progress(session_id, {
+        'iteration': iteration,
+        'status': 'comparing_documents',
+        'similarity': iteration / 100,
+        'message': f'Iteration {iteration}'
+    })
+
+
+class TestEventLog:
+    """Changes are appended as small events and replayed on read."""
+
+    def test_changes_are_visible_to_other_managers(self, tmp_path):
+        writer = SessionManager(tmp_path)
+        session_id = writer.create_session('v1', 'v2', '123', session_name='Test')
+        writer.update_session(session_id, [{'similarity': 0.5}], 0.5, 'v2b')
+        writer.add_user_feedback(session_id, 'Keep the tables')
+        _tick(writer, session_id, 1)
+
+        session = SessionManager(tmp_path).get_session(session_id)
+        assert session['v2_template_id'] == 'v2b'
+        assert session['iterations'] == [{'similarity': 0.5}]
+        assert session['user_feedback'][0]['feedback'] == 'Keep the tables'
+        assert SessionManager(tmp_path).get_progress(session_id)['message'] == 'Iteration 1'
+
+    def test_progress_ticks_only_log_what_changed(self, tmp_path):
+        manager = SessionManager(tmp_path)
+        session_id = manager.create_session('v1', 'v2', '123')
+        manager.update_session(session_id, [{'similarity': i / 100, 'notes': 'x' * 200} for i in range(50)],
+                               0.5, 'v2')
+        log = SessionLog(tmp_path / 'logs', session_id)
+
+        size = log.log_path.stat().st_size
+        _tick(manager, session_id, 1)
+        tick_size = log.log_path.stat().st_size - size
+        assert tick_size < 400
+
+        manager.update_session(session_id, [{'similarity': 0.6}], 0.6, 'v2')
+        last_event = json.loads(log.log_path.read_text().splitlines()[-1])
+        assert last_event['extend'] == {'iterations': [{'similarity': 0.6}]}
+
+    def test_in_place_changes_are_saved(self, tmp_path):
+        manager = SessionManager(tmp_path)
+        session_id = manager.create_session('v1', 'v2', '123')
+        manager.sessions[session_id]['status'] = 'complete'
+        del manager.sessions[session_id]['user_feedback']
+        manager._save_sessions()
+
+        session = SessionManager(tmp_path).get_session(session_id)
+        assert session['status'] == 'complete'
+        assert 'user_feedback' not in session
+
+    def test_concurrent_writers_keep_each_others_changes(self, tmp_path):
+        first, second = SessionManager(tmp_path), SessionManager(tmp_path)
+        session_id = first.create_session('v1', 'v2', '123')
+        first.get_session(session_id)
+        second.get_session(session_id)
+
+        _tick(first, session_id, 1)
+        second.add_user_feedback(session_id, 'More detail')
+        first.mark_completed(session_id)
+
+        session = SessionManager(tmp_path).get_session(session_id)
+        assert session['progress']['iteration'] == 1
+        assert session['user_feedback'][0]['feedback'] == 'More detail'
+        assert session['status'] == 'completed'
+
+    def test_threads_sharing_a_store_log_each_change_once(self, tmp_path):
+        manager = SessionManager(tmp_path)
+        session_id = manager.create_session('v1', 'v2', '123')
+        manager.sessions[session_id]['iterations'].extend({'iteration': i} for i in range(20))
+
+        threads = [threading.Thread(target=manager.sessions.flush) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert SessionManager(tmp_path).get_session(session_id)['iterations'] == [{'iteration': i} for i in range(20)]
+
+    def test_memory_is_bounded(self, tmp_path):
+        manager = SessionManager(tmp_path)
+        manager.sessions.max_sessions = 2
+        ids = [f'session_{i}' for i in range(4)]
+        for i, session_id in enumerate(ids):
+            manager.sessions[session_id] = {'project_id': str(i), 'status': 'active'}
+        assert list(manager.sessions._states) == ids[2:]
+
+        # Pending changes are persisted before a session is dropped
+        manager.sessions[ids[2]]['status'] = 'paused'
+        manager.sessions[ids[0]]
+        manager.sessions[ids[1]]
+        assert SessionManager(tmp_path).sessions[ids[2]]['status'] == 'paused'
+        assert manager.sessions[ids[3]]['project_id'] == '3'
+
+    def test_delete_and_unknown_ids(self, tmp_path):
+        manager = SessionManager(tmp_path)
+        session_id = manager.create_session('v1', 'v2', '123')
+        manager.delete_session(session_id)
+
+        assert SessionManager(tmp_path).get_session(session_id) is None
+        assert manager.get_progress('../active_sessions')['success'] is False
+
+
+class TestCompaction:
+    """Logs are folded into snapshots once they grow."""
+
+    def test_compacted_state_matches(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(session_manager, 'COMPACT_BYTES', 2000)
+        manager = SessionManager(tmp_path)
+        session_id = manager.create_session('v1', 'v2', '123')
+        for iteration in range(100):
+            _tick(manager, session_id, iteration)
+            manager.update_session(session_id, [{'iteration': iteration}], iteration / 100, 'v2')
+
+        log = SessionLog(tmp_path / 'logs', session_id)
+        assert log.log_path.stat().st_size <= 2000
+        assert json.loads(log.snapshot_path.read_text())['generation'] > 1
+
+        session = SessionManager(tmp_path).get_session(session_id)
+        assert session['iterations'] == [{'iteration': i} for i in range(100)]
+        assert session['progress']['iteration'] == 99
+        assert session == manager.get_session(session_id)
+
+    def test_interrupted_compaction_skips_the_folded_log(self, tmp_path):
+        manager = SessionManager(tmp_path)
+        session_id = manager.create_session('v1', 'v2', '123')
+        manager.update_session(session_id, [{'iteration': 1}], 0.1, 'v2')
+        log = SessionLog(tmp_path / 'logs', session_id)
+
+        # Snapshot written, log not yet restarted
+        state = log.read()
+        log.snapshot_path.write_text(json.dumps({'generation': 1, 'state': state}))
+        assert log.read()['iterations'] == [{'iteration': 1}]
+
+        log.compact()
+        assert log.read() == state
+        assert log.log_path.read_text() == '{"generation": 2}\n'
+
+
+class TestMigration:
+    """active_sessions.json is split into per-session snapshots once."""
+
+    def test_legacy_file_is_migrated(self, tmp_path):
+        legacy = {'session_1': {'session_name': 'Old', 'status': 'active', 'updated_at': '2024-01-01T00:00:00',
+                                'created_at': '2024-01-01T00:00:00', 'total_iterations': 2,
+                                'current_similarity': 0.8, 'v2_template_id': '9', 'iterations': [{}, {}],
+                                'user_feedback': []}}
+        (tmp_path / 'active_sessions.json').write_text(json.dumps(legacy))
+
+        manager = SessionManager(tmp_path)
+        assert manager.get_session('session_1') == legacy['session_1']
+        assert [s['session_id'] for s in manager.get_active_sessions()] == ['session_1']
+        assert not (tmp_path / 'active_sessions.json').exists()
+        assert (tmp_path / 'active_sessions.json.migrated').exists()
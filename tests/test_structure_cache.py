@@ -0,0 +1,61 @@
+"""
+Tests for the per-project extracted-structure cache.
+"""
+
+from data_structure_extractor import DataStructureExtractor
+from structure_cache import StructureCache
+
+
+def _structure(data):
+    return DataStructureExtractor().extract_structure(data, strip_prefix="")
+
+
+class TestStructureCache:
+    """Test TTL, LRU eviction and invalidation."""
+
+    def test_loader_runs_once_while_fresh(self):
+        """A cached structure is reused until refresh is requested."""
+        cache = StructureCache()
+        calls = []
+
+        def load():
+            calls.append(1)
+            return _structure({"project": {"name": "X"}})
+
+        first = cache.get_or_load(("123", "v2", True), load)
+        second = cache.get_or_load(("123", "v2", True), load)
+        assert first is second
+        assert len(calls) == 1
+
+        cache.get_or_load(("123", "v2", True), load, refresh=True)
+        assert len(calls) == 2
+
+    def test_entries_expire_after_ttl(self):
+        """Expired structures are treated as missing."""
+        cache = StructureCache(ttl_seconds=-1)
+        cache.put(("123", "v1", True), _structure({"a": 1}))
+        assert cache.get(("123", "v1", True)) is None
+
+    def test_least_recently_used_is_evicted(self):
+        """Only max_entries structures are kept."""
+        cache = StructureCache(max_entries=2)
+        cache.put(("1", "v1", True), _structure({"a": 1}))
+        cache.put(("2", "v1", True), _structure({"a": 1}))
+        cache.get(("1", "v1", True))
+        cache.put(("3", "v1", True), _structure({"a": 1}))
+
+        assert cache.get(("2", "v1", True)) is None
+        assert cache.get(("1", "v1", True)) is not None
+
+    def test_invalidate_drops_one_project(self):
+        """Invalidating a project removes all of its versions only."""
+        cache = StructureCache()
+        cache.put(("1", "v1", True), _structure({"a": 1}))
+        cache.put(("1", "v2", True), _structure({"a": 1}))
+        cache.put(("2", "v1", True), _structure({"a": 1}))
+
+        cache.invalidate("1")
+
+        assert cache.get(("1", "v1", True)) is None
+        assert cache.get(("1", "v2", True)) is None
+        assert cache.get(("2", "v1", True)) is not None
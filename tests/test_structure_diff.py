@@ -0,0 +1,124 @@
+"""
+Tests for subtree hashing and the hash-paired v1/v2 structure diff.
+"""
+
+from data_structure_extractor import DataStructureExtractor
+from semantic_matcher import SemanticMatcher
+from structure_diff import diff_structures
+
+
+def _structure(data, template_only=True):
+    return DataStructureExtractor(template_only=template_only).extract_structure(data, strip_prefix="")
+
+
+V1_DATA = {
+    "project_name": "Network Refresh",
+    "locations": [{"name": "HQ", "address": {"street": "1 Main St", "city": "Austin"}}],
+    "phases": [{"phase_name": "Design", "tasks": [{"task_name": "Survey", "hours": 4}]}],
+}
+
+V2_DATA = {
+    "project": {
+        "project_name": "Network Refresh",
+        # Moved and renamed, but the same shape
+        "project_locations": [{"name": "Main", "address": {"street": "9 Elm", "city": "Dallas"}}],
+        # Changed: tasks became services
+        "phases": [{"phase_name": "Design", "services": [{"service_name": "Survey", "hours": 4}]}],
+    }
+}
+
+
+class TestSubtreeHashes:
+    """Hashes depend on shape and relative names, not on position or values."""
+
+    def test_same_shape_hashes_equal(self):
+        v1 = _structure(V1_DATA)
+        v2 = _structure(V2_DATA)
+        v1_hashes = v1.subtree_hashes()
+        v2_hashes = v2.subtree_hashes()
+
+        assert v1_hashes[v1["locations"]["id"]] == v2_hashes[v2["project.project_locations"]["id"]]
+        assert v1_hashes[v1["phases"]["id"]] != v2_hashes[v2["project.phases"]["id"]]
+
+    def test_array_lengths_do_not_change_hash(self):
+        """Template and full extractions of the same shape agree."""
+        data = {"items": [{"a": 1, "b": "x"}, {"a": 2, "b": "y"}, {"a": 3, "b": "z"}]}
+        template = _structure(data)
+        full = _structure(data, template_only=False)
+        assert template.subtree_hashes()[template["items"]["id"]] == full.subtree_hashes()[full["items"]["id"]]
+
+    def test_hashes_reset_when_records_are_added(self):
+        table = _structure({"a": {"b": 1}})
+        before = table.subtree_hashes()
+        table.add("a.c", {"path": "a.c", "type": "string"}, table["a"]["id"])
+        assert table.subtree_hashes()[table["a"]["id"]] != before[table["a"]["id"]]
+
+
+class TestDiffStructures:
+    """Identical subtrees pair wholesale; the rest is residual."""
+
+    def test_moved_subtree_is_paired(self):
+        diff = diff_structures(_structure(V1_DATA), _structure(V2_DATA))
+
+        assert ("locations", "project.project_locations") in diff.subtree_pairs
+        assert diff.pairs["locations[0].address.city"] == "project.project_locations[0].address.city"
+        assert diff.moved == [("locations", "project.project_locations")]
+
+    def test_changed_fields_are_residual(self):
+        v1 = _structure(V1_DATA)
+        v2 = _structure(V2_DATA)
+        diff = diff_structures(v1, v2)
+
+        assert "phases[0].tasks" in diff.v1_residual
+        assert "project.phases[0].services" in diff.v2_residual
+        assert "locations[0].name" not in diff.v1_residual
+        # Every field is either paired or residual, never both
+        assert set(diff.pairs) | set(diff.v1_residual) == set(v1)
+        assert not set(diff.pairs) & set(diff.v1_residual)
+        assert set(diff.pairs.values()) | set(diff.v2_residual) == set(v2)
+
+    def test_changed_paths_include_ancestors(self):
+        diff = diff_structures(_structure(V1_DATA), _structure(V2_DATA))
+
+        assert "phases" in diff.v1_changed
+        assert "phases[0].tasks[0].task_name" in diff.v1_changed
+        assert "project" in diff.v2_changed
+        assert "project.project_locations" in diff.v2_changed  # Moved
+        assert "locations[0].address" not in diff.v1_changed
+
+    def test_ambiguous_subtrees_are_left_to_the_matcher(self):
+        v1 = _structure({"locations": [{"name": "HQ", "city": "Austin"}]})
+        v2 = _structure({"sites": [{"name": "HQ", "city": "Austin"}],
+                         "offices": [{"name": "HQ", "city": "Austin"}]})
+        diff = diff_structures(v1, v2)
+
+        assert diff.subtree_pairs == []
+        assert diff.v1_residual == list(v1)
+
+    def test_identical_structures_have_no_residual(self):
+        diff = diff_structures(_structure(V1_DATA), _structure(V1_DATA))
+        assert diff.v1_residual == [] and diff.v2_residual == []
+        assert diff.v1_changed == set() and diff.moved == []
+
+
+class TestMatchWithDiff:
+    """Paired subtrees become 'identical' matches; only the residual is scored."""
+
+    def test_paired_fields_are_identical_matches(self):
+        v1 = _structure(V1_DATA)
+        v2 = _structure(V2_DATA)
+        diff, matches = SemanticMatcher().match_with_diff(v1, v2)
+        by_v1 = {m.v1_path: m for m in matches}
+
+        city = by_v1["locations[0].address.city"]
+        assert city.match_type == "identical"
+        assert city.confidence == 1.0
+        assert city.v2_path == "project.project_locations[0].address.city"
+
+        # Residual fields are only matched against residual v2 fields
+        for match in matches:
+            if match.match_type != "identical":
+                assert match.v1_path in diff.v1_residual
+                assert match.v2_path in diff.v2_residual
+
+        assert by_v1["phases[0].tasks[0].hours"].v2_path == "project.phases[0].services[0].hours"
@@ -0,0 +1,74 @@
+"""
+Tests for the compact prefix-interned structure encoding.
+"""
+
+import json
+
+from data_structure_extractor import DataStructureExtractor
+from structure_encoding import decode_structure, encode_structure
+
+
+DATA = {
+    "project": {
+        "project_name": "Network Refresh",
+        "project_pricing": {
+            "phases": [
+                {"name": "Design", "services": [{"name": "Survey", "hours": 4}]},
+                {"name": "Build", "services": [{"name": "Install", "hours": 12}]},
+            ]
+        },
+        "notes": "n" * 200,
+    }
+}
+
+
+def _structure(**options):
+    return DataStructureExtractor(**options).extract_structure(DATA, strip_prefix="")
+
+
+class TestStructureEncoding:
+    """Test encoding round trips and size."""
+
+    def test_whole_table_round_trip(self):
+        """Decoding restores paths, records and parent/child links."""
+        for options in ({}, {"template_only": False}, {"union": True}):
+            structure = _structure(**options)
+            payload = json.loads(json.dumps(encode_structure(structure.values(), sample_budget=1000)))
+
+            decoded = decode_structure(payload)
+
+            assert decoded.paths == structure.paths
+            assert json.loads(json.dumps(decoded)) == json.loads(json.dumps(structure))
+
+    def test_paths_are_stored_as_suffixes(self):
+        """Rows carry only what a field adds to its parent's path."""
+        structure = _structure()
+        payload = encode_structure(structure.values())
+
+        suffixes = [row[1] for row in payload["rows"]]
+        assert ".project_name" in suffixes
+        assert "[0].hours" in suffixes
+        assert not any(s.startswith("project.project_pricing") for s in suffixes)
+
+    def test_samples_are_truncated_to_budget(self):
+        """Long string samples are cut to the budget."""
+        structure = _structure()
+        decoded = decode_structure(encode_structure(structure.values(), sample_budget=10))
+        assert decoded["project.notes"]["sample_value"] == "n" * 10 + "…"
+
+    def test_partial_payload_keeps_ids_and_children(self):
+        """Subtree payloads resolve parents outside the payload and keep child_ids."""
+        structure = _structure()
+        records = structure.child_records("project.project_pricing.phases")
+
+        payload = encode_structure(records, partial=True, parent_paths=lambda record_id: structure.paths[record_id])
+        decoded = decode_structure(json.loads(json.dumps(payload)), parent_paths=lambda record_id: structure.paths[record_id])
+
+        assert decoded == {record["path"]: dict(record) for record in records}
+
+    def test_compact_payload_is_smaller(self):
+        """The encoding is much smaller than the plain table."""
+        structure = _structure(template_only=False)
+        plain = json.dumps(structure)
+        compact = json.dumps(encode_structure(structure.values()), separators=(",", ":"))
+        assert len(compact) < len(plain) / 2
@@ -0,0 +1,194 @@
+"""
+Tests for the canonical value index and its cache.
+"""
+
+import json
+from datetime import date
+
+import pytest
+
+from document_analyzer import DocumentAnalyzer
+from value_index import ValueIndex, ValueIndexCache, canonical_value
+
+PREFIX = "data.attributes.content."
+
+
+def _payload(content):
+    return {"data": {"attributes": {"content": content}}}
+
+
+V1 = _payload({
+    "project_name": "Network  Refresh",
+    "total": "$1,234.00",
+    "start_date": "03/05/2024",
+    "tags": ["Priority", "Onsite"],
+    "locations": [{"name": "HQ Campus", "zip": "00123"}],
+})
+
+V2 = _payload({
+    "project": {
+        "name": "network refresh",
+        "pricing": {"total": 1234},
+        "starts_on": "2024-03-05",
+        "labels": ["priority"],
+        "sites": [{"site_name": "HQ Campus", "postal_code": 123}],
+    }
+})
+
+
+class TestCanonicalValue:
+    """Formatting differences fold to the same key."""
+
+    def test_numbers_and_currency(self):
+        assert canonical_value(1234) == canonical_value("1234.00") == canonical_value("$1,234") == 1234
+        assert canonical_value("(1,200.50)") == -1200.5
+        assert canonical_value(0.1 + 0.2) == canonical_value("0.3")
+
+    def test_dates(self):
+        expected = date(2024, 3, 5)
+        for text in ("2024-03-05", "03/05/2024", "March 5, 2024", "2024-03-05T10:00:00Z"):
+            assert canonical_value(text) == expected
+
+    def test_text_is_case_and_whitespace_folded(self):
+        assert canonical_value("  Acme \n Corp ") == canonical_value("ACME CORP") == "acme corp"
+
+    def test_codes_stay_text(self):
+        """Leading zeros and long digit runs are identifiers, not amounts."""
+        assert canonical_value("00123") == "00123"
+        assert canonical_value("1234567890123456789") == "1234567890123456789"
+
+    def test_unindexable_values(self):
+        assert canonical_value(None) is None
+        assert canonical_value(True) is None
+        assert canonical_value("   ") is None
+
+
+class TestValueIndex:
+    """Loaded and streamed payloads index the same way."""
+
+    def test_lookup_by_any_form(self):
+        index = ValueIndex.from_data(V1, strip_prefix=PREFIX)
+        assert index.lookup(1234) == ["total"]
+        assert index.lookup("March 5, 2024") == ["start_date"]
+        assert index.values[canonical_value(1234)] == "$1,234.00"
+
+    def test_scalar_array_items_use_array_path(self):
+        index = ValueIndex.from_data(V1, strip_prefix=PREFIX)
+        assert index.lookup("priority") == ["tags"]
+        assert index.lookup("hq campus") == ["locations.name"]
+
+    def test_bytes_match_loaded(self):
+        loaded = ValueIndex.from_data(V1, strip_prefix=PREFIX)
+        streamed = ValueIndex.from_payload(json.dumps(V1).encode("utf-8"), strip_prefix=PREFIX)
+        assert streamed.paths == loaded.paths
+        assert streamed.values == loaded.values
+
+
+class TestSuffixIndex:
+    """Field names find their values through dotted path suffixes."""
+
+    def test_every_dotted_suffix_is_indexed(self):
+        index = ValueIndex.from_data({"project": {"client": {"name": "Acme"}}})
+        suffixes = index.suffix_index()
+        for suffix in ("name", "client.name", "project.client.name"):
+            assert suffixes[suffix] == {"acme": ["project.client.name"]}
+        assert "ent.name" not in suffixes
+
+
+class TestValueIndexCache:
+    """Indexes are built once per (project, version, payload hash)."""
+
+    def test_same_payload_is_built_once(self):
+        cache = ValueIndexCache()
+        first = cache.get_or_build("1", "v1", V1)
+        # An equal payload (e.g. re-fetched) hits the cache
+        second = cache.get_or_build("1", "v1", json.loads(json.dumps(V1)))
+        assert first is second
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_changed_payload_is_rebuilt(self):
+        cache = ValueIndexCache()
+        first = cache.get_or_build("1", "v1", V1)
+        second = cache.get_or_build("1", "v1", _payload({"project_name": "Other"}))
+        assert first is not second
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ValueIndexCache(max_entries=1)
+        first = cache.get_or_build("1", "v1", V1)
+        cache.get_or_build("1", "v2", V2)
+        assert cache.get_or_build("1", "v1", V1) is not first
+
+
+class TestDocumentAnalyzerMatching:
+    """match_fields_to_values() compares canonical values."""
+
+    def test_formatted_output_values_match(self):
+        mappings = DocumentAnalyzer().match_fields_to_values(
+            v1_fields=["total", "start_date", "project_name"],
+            output_values={"$1,234.00", "March 5, 2024", "NETWORK REFRESH"},
+            v1_merge_data=V1,
+            v2_merge_data=V2,
+        )
+        by_field = {m["v1_field"]: m["v2_field"] for m in mappings}
+        assert by_field == {
+            "total": "project.pricing.total",
+            "start_date": "project.starts_on",
+            "project_name": "project.name",
+        }
+
+    def test_nested_fields_match_by_name(self):
+        mappings = DocumentAnalyzer().match_fields_to_values(
+            v1_fields=["name", "zip", "locations.name", "ations.name"],
+            output_values={"HQ Campus"},
+            v1_merge_data=V1,
+            v2_merge_data=V2,
+        )
+        assert [(m["v1_field"], m["v2_field"], m["v1_paths"]) for m in mappings] == [
+            ("name", "project.sites.site_name", ["locations.name"]),
+            ("locations.name", "project.sites.site_name", ["locations.name"]),
+        ]
+
+
+W_DOCUMENT = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+              '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+              '<w:body>{}</w:body></w:document>')
+
+
+def _paragraph(*runs):
+    return "<w:p>" + "".join(f"<w:r><w:t>{run}</w:t></w:r>" for run in runs) + "</w:p>"
+
+
+class TestExtractTextValues:
+    """extract_text_values() streams the document and joins split runs."""
+
+    def test_runs_are_joined_per_paragraph(self, temp_docx):
+        docx = temp_docx(W_DOCUMENT.format(_paragraph("Total: ", "$12,", "345") + _paragraph("Acme Corp")))
+        values = DocumentAnalyzer().extract_text_values(str(docx))
+
+        assert "Total: $12,345" in values
+        assert 12345 in values
+        assert "Acme Corp" in values
+
+    def test_table_cell_paragraphs_are_joined(self, temp_docx):
+        cell = "<w:tbl><w:tr><w:tc>" + _paragraph("Service") + _paragraph("20-3") + "</w:tc></w:tr></w:tbl>"
+        values = DocumentAnalyzer().extract_text_values(str(temp_docx(W_DOCUMENT.format(cell))))
+
+        assert "Service 20-3" in values
+        assert "Service" in values
+
+
+class TestLearnerMatching:
+    """MappingLearner matches values through the shared indexes."""
+
+    def test_find_matching_values_uses_canonical_values(self):
+        pytest.importorskip("requests")
+        from learn_mappings import MappingLearner
+
+        learner = MappingLearner(fetcher=None)
+        learner.load_value_indexes("42", json.dumps(V1).encode("utf-8"), V2)
+        matches = learner.find_matching_values()
+
+        assert matches["$1,234.00"]["v2_paths"] == ["project.pricing.total"]
+        assert matches["03/05/2024"]["v2_paths"] == ["project.starts_on"]
+        assert matches["Priority"]["v1_paths"] == ["tags"]
+        assert "00123" not in matches  # A postal code with leading zeros is not 123
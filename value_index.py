@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Value Index
+===========
+
+Canonical value -> field paths index over one merge data payload.
+
+Value-based mapping discovery asks "where else does this value appear?".
+The same payload answers that question for MappingLearner.learn_mappings(),
+the /api/upload-for-learning endpoint (twice) and
+DocumentAnalyzer.match_fields_to_values(), so the index is built once per
+(project, version, payload hash) and shared through ValueIndexCache.
+
+Values are keyed by a canonical form, so formatting differences between v1,
+v2 and rendered documents don't hide a match:
+
+    1234, 1234.0, "1234.00", "$1,234"      -> 1234
+    "2024-03-05", "03/05/2024",
+    "March 5, 2024"                        -> datetime.date(2024, 3, 5)
+    "  Acme   Corp ", "ACME CORP"          -> 'acme corp'
+
+Scalar array items (e.g. a list of tag strings) are indexed under the
+array's path.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+from json_stream import CHUNK_SIZE, iter_events
+
+# Optional sign, optional currency symbol, digits with well-formed thousands
+# separators (or none), optional fraction. Parentheses mean negative.
+NUMBER_TEXT = re.compile(r'^(\()?([-+])?\s*[$€£]?\s*(\d{1,3}(?:,\d{3})+|\d+)(\.\d+)?\s*(?:USD|EUR|GBP)?(\))?$')
+DATE_TEXT = re.compile(r'^(\d{4}-\d{2}-\d{2})(?:[T ][\d:.]+(?:Z|[+-]\d{2}:?\d{2})?)?$'
+                       r'|^\d{1,2}/\d{1,2}/\d{4}$'
+                       r'|^[A-Za-z]{3,9}\.? \d{1,2}, \d{4}$'
+                       r'|^\d{1,2} [A-Za-z]{3,9} \d{4}$')
+DATE_FORMATS = ('%m/%d/%Y', '%B %d, %Y', '%b %d, %Y', '%b. %d, %Y', '%d %B %Y', '%d %b %Y')
+
+# Digit strings longer than this are identifiers, not amounts
+MAX_NUMBER_DIGITS = 15
+
+
+def canonical_value(value: Any) -> Optional[Hashable]:
+    """
+    Canonical form of a scalar merge data (or document) value.
+
+    Returns:
+        int/float for numbers and numeric text, datetime.date for dates,
+        a case- and whitespace-folded str for other text, or None for values
+        that can't identify a field (None, booleans, empty text)
+    """
+    if value is None or isinstance(value, bool):
+        return None
+
+    if isinstance(value, (int, float)):
+        return _canonical_number(value)
+
+    if not isinstance(value, str):
+        return None
+
+    text = ' '.join(value.split())
+    if not text:
+        return None
+
+    first = text[0]
+    if first.isdigit() or first in '-+($€£':
+        number = NUMBER_TEXT.match(text)
+        if number:
+            opened, sign, digits, fraction, closed = number.group(1, 2, 3, 4, 5)
+            digits = digits.replace(',', '')
+            # Leading zeros ('00123') and very long digit runs are codes, not amounts
+            if bool(opened) == bool(closed) and len(digits) <= MAX_NUMBER_DIGITS and \
+                    (digits == '0' or not digits.startswith('0')):
+                amount = float(digits + (fraction or '')) if fraction else int(digits)
+                if sign == '-' or opened:
+                    amount = -amount
+                return _canonical_number(amount)
+
+    if DATE_TEXT.match(text):
+        parsed = _parse_date(text)
+        if parsed is not None:
+            return parsed
+
+    return text.casefold()
+
+
+def _canonical_number(number: Union[int, float]) -> Optional[Union[int, float]]:
+    """Integral floats become ints; other floats are rounded past float noise"""
+    if isinstance(number, float):
+        if number != number or number in (float('inf'), float('-inf')):
+            return None
+        if number.is_integer():
+            return int(number)
+        return round(number, 6)
+    return number
+
+
+def _parse_date(text: str) -> Optional[date]:
+    """Parse the date formats DATE_TEXT admits"""
+    if text[4:5] == '-':
+        try:
+            return date.fromisoformat(text[:10])
+        except ValueError:
+            return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+class ValueIndex:
+    """
+    Canonical value -> paths for one payload.
+
+    paths holds the paths per canonical value (in document order) and values
+    the first raw value seen for each canonical value, for display.
+    """
+
+    def __init__(self):
+        self.paths: Dict[Hashable, List[str]] = {}
+        self.values: Dict[Hashable, Any] = {}
+        # (type, raw value) -> canonical value while building; payloads repeat values a lot
+        self._canonical: Dict[Tuple[type, Any], Optional[Hashable]] = {}
+        self._suffixes: Optional[Dict[str, Dict[Hashable, List[str]]]] = None
+
+    def add(self, value: Any, path: str):
+        """Index one scalar value at path"""
+        memo_key = (type(value), value)
+        try:
+            key = self._canonical[memo_key]
+        except KeyError:
+            key = self._canonical[memo_key] = canonical_value(value)
+        if key is None:
+            return
+        paths = self.paths.get(key)
+        if paths is None:
+            self.paths[key] = [path]
+            self.values[key] = value
+        else:
+            paths.append(path)
+
+    def lookup(self, value: Any) -> List[str]:
+        """Paths holding a value equal to value after canonicalization"""
+        key = canonical_value(value)
+        return self.paths.get(key, []) if key is not None else []
+
+    def suffix_index(self) -> Dict[str, Dict[Hashable, List[str]]]:
+        """
+        Dotted path suffix -> {canonical value: paths ending in that suffix}.
+
+        'project.client.name' is filed under 'project.client.name',
+        'client.name' and 'name', so a field name finds its values without
+        scanning every path. Values keep index order. Built on first use.
+        """
+        if self._suffixes is None:
+            suffixes: Dict[str, Dict[Hashable, List[str]]] = {}
+            for key, paths in self.paths.items():
+                for path in paths:
+                    start = 0
+                    while True:
+                        suffixes.setdefault(path[start:], {}).setdefault(key, []).append(path)
+                        dot = path.find('.', start)
+                        if dot == -1:
+                            break
+                        start = dot + 1
+            self._suffixes = suffixes
+        return self._suffixes
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.paths
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @classmethod
+    def from_data(cls, data: Any, prefix: str = "", strip_prefix: str = None) -> 'ValueIndex':
+        """
+        Index a loaded payload.
+
+        Args:
+            data: Parsed merge data
+            prefix: Starting prefix for paths
+            strip_prefix: Optional prefix to strip from paths (e.g., "data.attributes.content.")
+        """
+        index = cls()
+
+        def extract(obj, path):
+            if isinstance(obj, dict):
+                for key, value in obj.items():
+                    current_path = f"{path}.{key}" if path else key
+                    if isinstance(value, (dict, list)):
+                        extract(value, current_path)
+                    else:
+                        index.add(value, _strip(current_path, strip_prefix))
+            elif isinstance(obj, list):
+                # Array items keep the array's path
+                for item in obj:
+                    if isinstance(item, (dict, list)):
+                        extract(item, path)
+                    elif path:
+                        index.add(item, _strip(path, strip_prefix))
+
+        extract(data, prefix)
+        index._canonical.clear()
+        return index
+
+    @classmethod
+    def from_events(cls, events: Iterable[Tuple[str, Any]], prefix: str = "",
+                    strip_prefix: str = None) -> 'ValueIndex':
+        """
+        Index a payload from JSON parse events (json_stream.iter_events()).
+
+        Args:
+            events: (event, value) tuples
+            prefix: Starting prefix for paths
+            strip_prefix: Optional prefix to strip from paths
+        """
+        index = cls()
+        stack = []  # (is_map, path) for each open container
+        key = None
+
+        for event, value in events:
+            if event == 'map_key':
+                key = value
+                continue
+
+            if event == 'end_map' or event == 'end_array':
+                stack.pop()
+                continue
+
+            is_container = event == 'start_map' or event == 'start_array'
+
+            if not stack:
+                if is_container:
+                    stack.append((event == 'start_map', prefix))
+                continue
+
+            is_map, path = stack[-1]
+            current_path = (f"{path}.{key}" if path else key) if is_map else path
+
+            if is_container:
+                stack.append((event == 'start_map', current_path))
+            elif current_path:
+                index.add(value, _strip(current_path, strip_prefix))
+
+        index._canonical.clear()
+        return index
+
+    @classmethod
+    def from_payload(cls, payload: Union[bytes, Mapping], strip_prefix: str = None) -> 'ValueIndex':
+        """Index raw response bytes (parsed as a stream) or an already-loaded payload"""
+        if isinstance(payload, (bytes, bytearray)):
+            view = memoryview(payload)
+            chunks = (view[i:i + CHUNK_SIZE] for i in range(0, len(view), CHUNK_SIZE))
+            return cls.from_events(iter_events(chunks), strip_prefix=strip_prefix)
+        return cls.from_data(payload, strip_prefix=strip_prefix)
+
+
+def _strip(path: str, strip_prefix: Optional[str]) -> str:
+    if strip_prefix and path.startswith(strip_prefix):
+        return path[len(strip_prefix):]
+    return path
+
+
+def payload_hash(payload: Union[bytes, Mapping]) -> str:
+    """
+    Content hash of a payload: of the raw bytes as received, or of the
+    sorted compact JSON form of an already-loaded payload.
+    """
+    if not isinstance(payload, (bytes, bytearray)):
+        payload = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class ValueIndexCache:
+    """
+    LRU cache of ValueIndexes keyed by (project_id, version, payload hash).
+
+    Keys include the payload hash, so an index is never served for data that
+    has changed since it was built; no TTL is needed.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        """
+        Args:
+            max_entries: Maximum number of indexes kept in memory
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> ValueIndex
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, project_id: Optional[str], version: str, payload: Union[bytes, Mapping],
+                     strip_prefix: str = "data.attributes.content.") -> ValueIndex:
+        """
+        Return the index for a payload, building it on a miss.
+
+        Args:
+            project_id: ScopeStack project ID (None if unknown)
+            version: 'v1' or 'v2'
+            payload: Raw response bytes or loaded merge data
+            strip_prefix: Prefix to strip from paths
+        """
+        key = (str(project_id), version, strip_prefix, payload_hash(payload))
+
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return index
+            self.misses += 1
+
+        # Built outside the lock so other projects aren't blocked
+        index = ValueIndex.from_payload(payload, strip_prefix=strip_prefix)
+
+        with self._lock:
+            self._entries[key] = index
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def clear(self):
+        """Drop every cached index"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide cache shared by every learning path
+value_index_cache = ValueIndexCache()